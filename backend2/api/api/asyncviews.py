@@ -0,0 +1,100 @@
+"""
+Support for the async views served under ASGI.
+
+DRF views are sync only, so the async endpoints are plain Django
+``async def`` views. ``async_api_view`` gives them the parts of DRF they
+rely on: Clerk/session authentication, JSON request bodies and responses
+shaped and rendered like DRF's, so clients cannot tell the two apart.
+"""
+import io
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+
+from api.parsers import ORJSONParser
+from api.renderers import dumps
+from users.authentication import ClerkAuthentication
+
+
+def json_response(data, status=200):
+    """A response rendered as the DRF views render theirs."""
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def request_data(request):
+    """The body as DRF's ``request.data`` would parse it: JSON or form fields."""
+    if request.content_type == "application/json":
+        context = {"encoding": request.encoding or settings.DEFAULT_CHARSET}
+        return ORJSONParser().parse(io.BytesIO(request.body or b"{}"), parser_context=context)
+    return request.POST
+
+
+async def authenticate(request, session=True):
+    """The signed-in user: Clerk bearer token first, then (with ``session``)
+    the session, as in DEFAULT_AUTHENTICATION_CLASSES. None for anonymous
+    requests."""
+    result = await ClerkAuthentication().aauthenticate(request)
+    if result is not None:
+        return result[0]
+    if not session:
+        return None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_api_view(methods, authenticated=False, session=True, throttle_scope=None, throttles=()):
+    """
+    ``@api_view`` for ``async def`` views. With ``authenticated`` the user is
+    resolved and set on ``request.user`` first (IsAuthenticated); pass
+    ``session=False`` for views that only accept Clerk tokens. ``throttles``
+    are DRF throttle classes, checked as DRF would with ``throttle_scope``.
+    The parsed body is on ``request.data``. Errors come back as DRF would
+    send them: ``{"detail": ...}``, 403 for missing or bad credentials
+    since ClerkAuthentication sends no WWW-Authenticate, and 429 with
+    Retry-After.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if authenticated:
+                    user = await authenticate(request, session)
+                    if user is None:
+                        raise exceptions.NotAuthenticated()
+                    request.user = user
+                request.data = request_data(request)
+                if throttles:
+                    await sync_to_async(check_throttles)(request, wrapper, throttles)
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                status = exc.status_code
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    status = 403
+                detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+                response = json_response(detail, status=status)
+                if getattr(exc, "wait", None):
+                    response["Retry-After"] = "%d" % exc.wait
+                return response
+        wrapper.throttle_scope = throttle_scope
+        return wrapper
+    return decorator
+
+
+def check_throttles(request, view, throttles):
+    """APIView.check_throttles(): raise Throttled with the longest wait."""
+    waits = []
+    for throttle_class in throttles:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            waits.append(throttle.wait())
+    if waits:
+        waits = [wait for wait in waits if wait is not None]
+        raise exceptions.Throttled(max(waits) if waits else None)
@@ -0,0 +1,60 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks run against a throwaway copy of the database (the same one the
+test runner would create) so they never touch real data.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def throwaway_database(keepdb=False):
+    """Create the test database, point the default connection at it, and
+    drop it again afterwards. The test environment (``testserver`` host,
+    in-memory email) is active inside the block so the test client works."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+@contextmanager
+def stopwatch():
+    """Yield a dict whose ``seconds`` key is filled in when the block exits."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float("inf")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean/max in milliseconds, rounded so result files diff
+    cleanly."""
+    values = sorted(seconds)
+    summary = {f"p{p}_ms": round(percentile(values, p) * 1000, 2) for p in (50, 95, 99)}
+    summary["mean_ms"] = round(sum(values) / len(values) * 1000, 2) if values else 0.0
+    summary["max_ms"] = round(values[-1] * 1000, 2) if values else 0.0
+    return summary
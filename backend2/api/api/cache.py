@@ -0,0 +1,310 @@
+"""
+Cached responses for public read-only endpoints.
+
+An entry holds the rendered JSON body and its compressed encodings, so a
+hit costs no queries, no rendering and no compression. Entries belong to
+groups named after the data they show ("freelancers", "professions").
+invalidate() gives a group a new generation. Keys include the
+generations of their groups, so old entries are never read again and
+expire on their own. Signal handlers invalidate on model saves. Bulk
+``update()`` calls skip signals; RESPONSE_CACHE_SECONDS bounds how stale
+those can get. The browsable API is never cached.
+
+cached_sections() caches parts of one response separately, under the
+same generations, for endpoints that combine data from several groups.
+
+Misses do not stampede: cache_response() computes a missing entry once
+per process (Flights) and once across workers (a lock taken with
+``add``), and refreshes entries early with XFetch before they expire.
+"""
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .compression import encode_all
+from .metrics import record_cache
+from .renderers import dumps
+
+logger = logging.getLogger(__name__)
+
+# How often a request waiting on another worker's lock checks for its entry.
+POLL_SECONDS = 0.05
+# Headers DRF sets on the first response that hits must repeat.
+CACHED_HEADERS = ("Vary", "Allow")
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+def generation_key(group):
+    return f"response-gen:{group}"
+
+
+def invalidate(*groups):
+    response_cache().delete_many([generation_key(group) for group in groups])
+
+
+def generations(cache, groups):
+    """The current generation of each group, in order."""
+    keys = [generation_key(group) for group in groups]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # add() so that racing requests agree on one generation.
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [str(found[key]) for key in keys]
+
+
+def digest(*parts):
+    return hashlib.sha1(":".join(parts).encode()).hexdigest()
+
+
+def response_key(groups, request):
+    # The absolute URI: bodies contain absolute links built from the host.
+    url = request.build_absolute_uri()
+    return f"response:{'+'.join(groups)}:{digest(url, *generations(response_cache(), groups))}"
+
+
+class Flight:
+    """One in-process computation of a cache entry that others can wait for."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.entry = None
+
+    @staticmethod
+    def timeout():
+        # The leader may first wait out another worker's lock.
+        return 2 * settings.RESPONSE_CACHE_LOCK_SECONDS
+
+    def wait(self):
+        """The entry, or None if the leader stored none in time."""
+        return self.entry if self.done.wait(self.timeout()) else None
+
+
+class Flights:
+    """Per-process singleflight: the first request to miss a key computes
+    it, identical requests arriving meanwhile wait for its entry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def join(self, key):
+        """``(flight, leading)``; the caller computes the entry when leading."""
+        with self.lock:
+            flight = self.flights.get(key)
+            # A flight that never landed (its response was not rendered)
+            # is not waited on forever.
+            if flight is not None and time.monotonic() - flight.started < flight.timeout():
+                return flight, False
+            flight = self.flights[key] = Flight()
+            return flight, True
+
+    def land(self, key, flight, entry=None):
+        """Hand ``entry`` (None when there is none) to the waiting requests."""
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        flight.entry = entry
+        flight.done.set()
+
+
+flights = Flights()
+
+
+def lock_key(key):
+    return f"lock:{key}"
+
+
+def wait_for_entry(cache, key):
+    """Another worker holds the key's lock: poll until it stores the entry,
+    or gives up the lock without one."""
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        found = cache.get_many([key, lock_key(key)])
+        if key in found or lock_key(key) not in found:
+            return found.get(key)
+    return None
+
+
+def refresh_early(entry):
+    """
+    XFetch ("optimal probabilistic cache stampede prevention"): recompute
+    before expiry with a chance that grows as expiry nears, sooner for
+    entries that took longer to compute, so that one request refreshes the
+    entry instead of every request at once after it expires.
+    """
+    beta = settings.RESPONSE_CACHE_BETA
+    if not beta:
+        return False
+    # 1 - random() is in (0, 1], so the log is defined and <= 0.
+    return time.time() - entry["delta"] * beta * math.log(1.0 - random.random()) >= entry["expires"]
+
+
+def cached_response(entry):
+    response = HttpResponse(entry["body"], content_type=entry["content_type"])
+    for name, value in entry.get("headers", {}).items():
+        response[name] = value
+    response.precompressed = entry["encoded"]
+    return response
+
+
+def cache_response(*groups):
+    """
+    Cache a DRF view method's 200 responses to GET requests in ``groups``.
+    Only for views whose output does not depend on who is asking;
+    authentication, permissions and throttles still run on every request.
+
+    A missing entry is computed once: identical requests in the same
+    process wait for the first one, and a lock in the cache keeps other
+    workers to reading its result. Entries are refreshed shortly before
+    they expire by one request, which holds the lock; the others are
+    still served the current entry.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.accepted_renderer.format != "json":
+                return method(view, request, *args, **kwargs)
+            cache = response_cache()
+            try:
+                key = response_key(groups, request)
+                entry = cache.get(key)
+                refresh = entry is not None and refresh_early(entry) and cache.add(
+                    lock_key(key), 1, settings.RESPONSE_CACHE_LOCK_SECONDS
+                )
+            except Exception:
+                logger.warning("Response cache unavailable", exc_info=True)
+                return method(view, request, *args, **kwargs)
+            if entry is not None and not refresh:
+                record_cache("response", True)
+                return cached_response(entry)
+
+            flight, locked = None, refresh
+            if not refresh:
+                flight, leading = flights.join(key)
+                if not leading:
+                    entry = flight.wait()
+                    record_cache("response", entry is not None)
+                    if entry is not None:
+                        return cached_response(entry)
+                    # The leader failed or is stuck: compute, without storing.
+                    return method(view, request, *args, **kwargs)
+                try:
+                    locked = cache.add(lock_key(key), 1, settings.RESPONSE_CACHE_LOCK_SECONDS)
+                    entry = None if locked else wait_for_entry(cache, key)
+                except Exception:
+                    logger.warning("Response cache unavailable", exc_info=True)
+                if entry is not None:
+                    flights.land(key, flight, entry)
+                    record_cache("response", True)
+                    return cached_response(entry)
+
+            record_cache("response", False)
+            started = time.monotonic()
+            try:
+                response = method(view, request, *args, **kwargs)
+            except BaseException:
+                release(key, flight, locked)
+                raise
+            if response.status_code == 200:
+                response.add_post_render_callback(partial(store, key, started, flight, locked))
+            else:
+                release(key, flight, locked)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_sections(request, sections):
+    """
+    Rendered JSON for several independently cached parts of one response.
+    ``sections`` maps names to ``(groups, build)``. ``build(request)``
+    returns a section's data. Each section is cached under its own groups'
+    generations, so a change only rebuilds the sections showing it. Returns
+    ``{name: (json bytes, sha1 of them)}`` in the order of ``sections``,
+    with two cache round trips when every section is cached.
+    """
+    cache = response_cache()
+    host = request.build_absolute_uri("/")
+    try:
+        groups = sorted({group for section_groups, _ in sections.values() for group in section_groups})
+        current = dict(zip(groups, generations(cache, groups)))
+        keys = {
+            name: "section:" + digest(name, host, *(current[group] for group in section_groups))
+            for name, (section_groups, _) in sections.items()
+        }
+        entries = cache.get_many(keys.values())
+    except Exception:
+        logger.warning("Response cache unavailable", exc_info=True)
+        keys, entries = {}, {}
+
+    result, fills = {}, {}
+    for name, (_, build) in sections.items():
+        entry = entries.get(keys.get(name))
+        record_cache("section", entry is not None)
+        if entry is None:
+            body = dumps(build(request))
+            entry = (body, hashlib.sha1(body).hexdigest())
+            if name in keys:
+                fills[keys[name]] = entry
+        result[name] = entry
+    if fills:
+        try:
+            cache.set_many(fills, settings.RESPONSE_CACHE_SECONDS)
+        except Exception:
+            logger.warning("Response cache unavailable", exc_info=True)
+    return result
+
+
+def cached_encodings(etag, body):
+    """encode_all(body), cached by the body's ETag."""
+    try:
+        return response_cache().get_or_set(f"encoded:{etag}", lambda: encode_all(body), settings.RESPONSE_CACHE_SECONDS)
+    except Exception:
+        logger.warning("Response cache unavailable", exc_info=True)
+        return {}
+
+
+def release(key, flight, locked, entry=None):
+    if flight is not None:
+        flights.land(key, flight, entry)
+    if locked:
+        try:
+            response_cache().delete(lock_key(key))
+        except Exception:
+            logger.warning("Response cache unavailable", exc_info=True)
+
+
+def store(key, started, flight, locked, response):
+    """Post-render: keep the body and its encodings, which the
+    compression middleware also uses for this first response."""
+    response.precompressed = encode_all(response.content)
+    entry = {
+        "content_type": response["Content-Type"],
+        "headers": {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+        "body": response.content,
+        "encoded": response.precompressed,
+        # For refresh_early(): how long the entry took, and when it expires.
+        "delta": time.monotonic() - started,
+        "expires": time.time() + settings.RESPONSE_CACHE_SECONDS,
+    }
+    try:
+        response_cache().set(key, entry, settings.RESPONSE_CACHE_SECONDS)
+    except Exception:
+        logger.warning("Response cache unavailable", exc_info=True)
+    release(key, flight, locked, entry)
@@ -0,0 +1,120 @@
+"""
+Response compression.
+
+CompressionMiddleware encodes text and JSON responses of at least
+COMPRESSION_MIN_BYTES with the best coding the client accepts: brotli
+when the optional ``brotli`` package is installed, else gzip. Smaller
+bodies fit in a packet or two, so compressing them saves the client
+nothing. A response may carry its encodings ready-made in
+``response.precompressed`` (see api/cache.py); the middleware then only
+picks one. Encodings for storage use higher levels than per-request
+ones, since they are paid for once.
+"""
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = re.compile(r"^(text/|application/(json|javascript|xml)|image/svg\+xml)")
+
+# (per request, stored)
+GZIP_LEVELS = (6, 9)
+BROTLI_QUALITIES = (4, 9)
+
+
+def codings():
+    """Available content codings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def encode(body, coding, stored=False):
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITIES[stored])
+    # mtime=0 keeps the output identical between processes.
+    return gzip.compress(body, compresslevel=GZIP_LEVELS[stored], mtime=0)
+
+
+def encode_all(body):
+    """Every available encoding of ``body`` worth sending, for storage."""
+    if len(body) < settings.COMPRESSION_MIN_BYTES:
+        return {}
+    return {coding: encode(body, coding, stored=True) for coding in codings()}
+
+
+def choose_coding(accept_encoding, available):
+    """
+    The coding in ``available`` with the highest q-value in the
+    Accept-Encoding header, ties going to the earlier one; None when the
+    client accepts none of them.
+    """
+    qvalues = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        qvalues[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = qvalues.get(coding, qvalues.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """Like Django's GZipMiddleware, with brotli and precompressed bodies."""
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not COMPRESSIBLE.match(response.get("Content-Type", ""))
+            or "no-transform" in response.get("Cache-Control", "")
+            or len(response.content) < settings.COMPRESSION_MIN_BYTES
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        precompressed = getattr(response, "precompressed", None) or {}
+        coding = choose_coding(request.headers.get("Accept-Encoding", ""), precompressed or codings())
+        if coding is None:
+            return response
+
+        body = precompressed.get(coding) or encode(response.content, coding)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = coding
+        # The compressed bytes differ, so a strong ETag no longer applies.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
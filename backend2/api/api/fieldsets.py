@@ -0,0 +1,105 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?expand=`` on read endpoints.
+
+``fields=id,name,rating`` limits each item to those keys. ``expand=name``
+shows an expandable field (``Meta.expandable_fields``: name to serializer
+class) as a nested object instead of an id. It is shown even when not in
+``fields``. Both take comma-separated names of the endpoint's top-level
+fields; unknown names are a 400. Nested serializers and writes are not
+affected.
+
+shown_queryset() then makes the query match: it loads only the columns the
+shown fields read, and only the select_related/prefetch_related relations
+they use. A field that reads something other than its ``source`` (a
+SerializerMethodField, say) declares it in ``Meta.field_sources``:
+field name to the model attributes it reads (empty when it runs its own
+query). Without that entry nothing is pruned, so it is never wrong.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import exceptions, serializers
+
+
+def split(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def fieldset(request):
+    """``(fields, expand)`` asked for: sets of names; ``fields`` is None
+    when the response is not limited."""
+    params = request.query_params
+    return split(params.get("fields", "")) or None, split(params.get("expand", ""))
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin: as the endpoint's top-level serializer it honours
+    ``?fields=`` and ``?expand=``."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method not in ("GET", "HEAD") or not self.is_top_level():
+            return fields
+        wanted, expand = fieldset(request)
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        errors = {}
+        if wanted is not None and wanted - set(fields):
+            errors["fields"] = [f"Unknown field: {name}" for name in sorted(wanted - set(fields))]
+        if expand - set(expandable):
+            errors["expand"] = [f"Cannot expand: {name}" for name in sorted(expand - set(expandable))]
+        if errors:
+            raise exceptions.ValidationError(errors)
+        for name in expand:
+            fields[name] = expandable[name](read_only=True)
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted or name in expand}
+        return fields
+
+    def is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+
+def select_related_paths(tree, prefix=""):
+    for name, subtree in tree.items():
+        if subtree:
+            yield from select_related_paths(subtree, f"{prefix}{name}__")
+        else:
+            yield prefix + name
+
+
+def shown_queryset(queryset, serializer):
+    """``queryset`` cut down to what ``serializer``'s shown fields read."""
+    fields = serializer.fields
+    request = serializer.context.get("request")
+    if request is None or request.method not in ("GET", "HEAD") or fieldset(request)[0] is None:
+        return queryset
+
+    meta = queryset.model._meta
+    sources = getattr(serializer.Meta, "field_sources", {})
+    columns, relations = {meta.pk.name}, set()
+    for name, field in fields.items():
+        if name in sources:
+            attrs = sources[name]
+        elif field.source == "*":
+            return queryset
+        else:
+            attrs = field.source_attrs[:1]
+        for attr in attrs:
+            try:
+                model_field = meta.get_field(attr)
+            except FieldDoesNotExist:
+                return queryset
+            (columns if model_field.concrete else relations).add(attr)
+
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        keep = [path for path in select_related_paths(related) if path.split("__")[0] in columns]
+        queryset = queryset.select_related(None).select_related(*keep)
+    lookups = queryset._prefetch_related_lookups
+    if lookups:
+        keep = [
+            lookup for lookup in lookups
+            if getattr(lookup, "prefetch_to", lookup).split("__")[0] in columns | relations
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*keep)
+    return queryset.only(*columns)
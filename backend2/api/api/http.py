@@ -0,0 +1,24 @@
+"""
+Outbound HTTP for async views.
+
+One ``httpx.AsyncClient`` per event loop, so an ASGI worker keeps its
+connections to Clerk and Safaricom open across requests. httpx is imported
+on first use; sync code keeps using ``requests``.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def async_client():
+    """The shared AsyncClient for the running event loop."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(timeout=settings.OUTBOUND_HTTP_TIMEOUT)
+    return client
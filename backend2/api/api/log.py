@@ -0,0 +1,122 @@
+"""
+Logging helpers: non-blocking JSON output, per-logger sampling and
+redaction of secrets and phone numbers.
+
+``BackgroundHandler`` is a QueueHandler: the request thread only redacts
+the message and puts the record on a queue; a QueueListener thread formats
+it as one JSON line and writes it to stderr. Wired up in settings.LOGGING.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+REDACTIONS = (
+    # Authorization headers and bare JWTs
+    (re.compile(r"(?i)\b(bearer|basic)\s+[A-Za-z0-9._~+/=-]+"), r"\1 [REDACTED]"),
+    (re.compile(r"\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)?"), "[REDACTED_JWT]"),
+    # Secrets passed as key=value or "key": "value"
+    (
+        re.compile(r"""(?i)(["']?(?:password|passkey|secret|token|access_token|api_key)["']?\s*[:=]\s*["']?)[^"'\s,&}]+"""),
+        r"\1[REDACTED]",
+    ),
+    # Kenyan phone numbers (2547xxxxxxxx, +254 712 345 678, 0712-345-678...),
+    # last three digits kept
+    (re.compile(r"(?<!\d)(?:\+?254[ -]?|0)[17]\d{2}[ -]?\d{3}[ -]?(\d{3})(?!\d)"), r"[PHONE]***\1"),
+)
+
+# LogRecord attributes that are not "extra" fields.
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def redact(value):
+    text = str(value)
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG/INFO records for the configured loggers
+    (and their children). Warnings and errors always pass.
+
+    ``rates`` maps logger names to a rate between 0 and 1, e.g.
+    ``{"users.authentication": 0.01}``.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with any ``extra=`` fields included."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Redact in the caller, write from a background thread. Records are
+    prepared (message merged, traceback rendered, PII removed) before they
+    are queued so nothing mutable crosses threads.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the writer thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and isinstance(value, str):
+                setattr(record, key, redact(value))
+        return record
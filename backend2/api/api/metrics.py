@@ -0,0 +1,275 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Metrics live in a per-process registry. With ``METRICS_DIR`` set (needed
+when running several worker processes) each process also writes its
+values to ``METRICS_DIR/<pid>.json`` at most every
+``METRICS_FLUSH_SECONDS``. The ``/metrics`` endpoint then sums the files
+of every process, including workers that have since exited, so counters
+never go backwards.
+
+Labels are kept low-cardinality: routes are URL patterns (not paths),
+statuses are classes ("2xx"), and outbound calls are named by service and
+operation.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, key, value):
+        self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, (), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def merge(self, key, value):
+        state = self.values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+        state[0] = [a + b for a, b in zip(state[0], value[0])]
+        state[1] += value[1]
+
+    def samples(self):
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", key, (("le", le),), cumulative
+            yield f"{self.name}_sum", key, (), total
+            yield f"{self.name}_count", key, (), cumulative
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def snapshot(self):
+        snapshot = {}
+        for name, metric in self.metrics.items():
+            with metric.lock:
+                snapshot[name] = [[list(key), value] for key, value in metric.values.items()]
+        return snapshot
+
+    def flush(self, force=False):
+        """Write this process's values to METRICS_DIR (file-backed mode)."""
+        directory = getattr(settings, "METRICS_DIR", None)
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < settings.METRICS_FLUSH_SECONDS):
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, os.path.join(directory, f"{os.getpid()}.json"))
+
+    def collect(self):
+        """Metrics to export: this process's, or every process's in
+        file-backed mode."""
+        directory = getattr(settings, "METRICS_DIR", None)
+        if not directory:
+            return self.metrics.values()
+
+        self.flush(force=True)
+        merged = {
+            name: type(metric)(name, metric.help, metric.labels)
+            for name, metric in self.metrics.items()
+        }
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Histogram):
+                merged[name].buckets = metric.buckets
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in snapshot.items():
+                if name in merged:
+                    for key, value in values:
+                        merged[name].merge(tuple(key), value)
+        return merged.values()
+
+    def render(self):
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample, key, extra, value in metric.samples():
+                pairs = list(zip(metric.labels, key)) + list(extra)
+                if pairs:
+                    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                    lines.append(f"{sample}{{{labels}}} {value}")
+                else:
+                    lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status class.",
+    ("route", "method", "status"),
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("route", "method"),
+)
+http_db_time = registry.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request, by route.", ("route",),
+)
+http_db_queries = registry.histogram(
+    "http_request_db_queries", "SQL queries per request, by route.", ("route",),
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+cache_requests = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"),
+)
+outbound_latency = registry.histogram(
+    "outbound_request_duration_seconds",
+    "Latency of calls to external services (Safaricom, Clerk).",
+    ("service", "operation", "outcome"),
+)
+
+
+def record_cache(cache_name, hit):
+    cache_requests.inc(cache=cache_name, result="hit" if hit else "miss")
+
+
+@contextmanager
+def observe_outbound(service, operation):
+    """Time an external call; the outcome label is "ok" or "error"."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        outbound_latency.observe(
+            time.perf_counter() - start, service=service, operation=operation, outcome=outcome
+        )
+
+
+def route_label(request):
+    """The URL pattern name the request resolved to, never the raw path."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status class and SQL time for every request. Must sit
+    above QueryBudgetMiddleware, whose query totals it reads.
+    """
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, elapsed):
+        route = route_label(request)
+        http_requests.inc(route=route, method=request.method, status=f"{response.status_code // 100}xx")
+        http_latency.observe(elapsed, route=route, method=request.method)
+        queries = getattr(request, "query_stats", None)
+        if queries is not None:
+            http_db_time.observe(queries.seconds, route=route)
+            http_db_queries.observe(queries.count, route=route)
+        registry.flush()
+
+
+def metrics_view(request):
+    """The metrics, for requests with ``Authorization: Bearer
+    <METRICS_TOKEN>``. Without a token only DEBUG serves them."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import record_cache
+from .queries import record_queries
+from .routers import reads_from_replica
+
+query_logger = logging.getLogger("api.queries")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def client_key(request):
+    """
+    A stable identity for read-your-writes pinning, available before DRF
+    authenticates: the Clerk user id from the bearer token (read without
+    verification; it only affects routing), else the session, else the IP.
+    """
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        try:
+            segment = auth[7:].split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+            return f"sub:{claims['sub']}"
+        except (IndexError, KeyError, TypeError, ValueError):
+            return "auth:" + hashlib.sha1(auth.encode()).hexdigest()
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session:
+        return "session:" + hashlib.sha1(session.encode()).hexdigest()
+    return "ip:" + request.META.get("REMOTE_ADDR", "")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route safe requests to the replica unless the client wrote within the
+    last READ_YOUR_WRITES_SECONDS; record a pin after unsafe requests.
+    Does nothing unless a "replica" database is configured.
+    """
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = "replica" in settings.DATABASES
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        pin_key = "db-pin:" + client_key(request)
+        if request.method in SAFE_METHODS:
+            pinned = cache.get(pin_key)
+            record_cache("db_pin", pinned)
+            with reads_from_replica(not pinned):
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        if response.status_code < 400:
+            cache.set(pin_key, True, settings.READ_YOUR_WRITES_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        pin_key = "db-pin:" + client_key(request)
+        if request.method in SAFE_METHODS:
+            pinned = await cache.aget(pin_key)
+            record_cache("db_pin", pinned)
+            # A context variable, so it reaches the ORM's sync threads too.
+            with reads_from_replica(not pinned):
+                return await self.get_response(request)
+
+        response = await self.get_response(request)
+        if response.status_code < 400:
+            await cache.aset(pin_key, True, settings.READ_YOUR_WRITES_SECONDS)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL each request runs. In DEBUG the totals are returned as
+    X-DB-Queries / X-DB-Time-ms / X-DB-Duplicates headers; requests over
+    any QUERY_BUDGET limit are logged with their most repeated statements.
+    The totals are left on ``request.query_stats`` for MetricsMiddleware.
+    """
+
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget = getattr(settings, "QUERY_BUDGET", {})
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as queries:
+            response = self.get_response(request)
+        return self.check(request, response, queries)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs on the request's sync thread, and
+        # connections are per thread, so the recorder is installed there.
+        recording = record_queries()
+        queries = await sync_to_async(recording.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.__exit__)(None, None, None)
+        return self.check(request, response, queries)
+
+    def check(self, request, response, queries):
+        request.query_stats = queries
+
+        time_ms = queries.seconds * 1000
+        if settings.DEBUG:
+            response["X-DB-Queries"] = str(queries.count)
+            response["X-DB-Time-ms"] = f"{time_ms:.1f}"
+            response["X-DB-Duplicates"] = str(queries.duplicate_count)
+
+        over = (
+            queries.count > self.budget.get("MAX_QUERIES", float("inf"))
+            or time_ms > self.budget.get("MAX_TIME_MS", float("inf"))
+            or queries.duplicate_count > self.budget.get("MAX_DUPLICATES", float("inf"))
+        )
+        if over:
+            worst = sorted(queries.duplicates.items(), key=lambda item: -item[1])[:3]
+            query_logger.warning(
+                "Query budget exceeded: %s %s ran %d queries in %.1fms (%d duplicates)%s",
+                request.method,
+                request.path,
+                queries.count,
+                time_ms,
+                queries.duplicate_count,
+                "".join(f"\n  {n}x {fp}" for fp, n in worst),
+            )
+        return response
@@ -0,0 +1,33 @@
+"""
+JSON parsing with orjson: ORJSONParser is a drop-in for DRF's JSONParser.
+Bodies declared in a charset other than UTF-8, and every body when orjson
+is not installed, go to the stdlib parser.
+"""
+import codecs
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from api.renderers import ORJSONRenderer, orjson
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        if orjson is None or not self.strict or not self.is_utf8(parser_context.get("encoding")):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+    def is_utf8(self, charset):
+        # Request passes the body's charset, else DEFAULT_CHARSET.
+        if not charset:
+            return True
+        try:
+            return codecs.lookup(charset).name == "utf-8"
+        except LookupError:
+            return False
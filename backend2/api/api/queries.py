@@ -0,0 +1,61 @@
+"""
+Per-request SQL accounting: query count, total time and repeated
+statements (the usual sign of an N+1), collected with Django's
+``execute_wrapper`` on every configured database.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_IN_LIST_RE = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalise a statement so the same query with different parameters
+    (or IN-list lengths) maps to one fingerprint."""
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    sql = _LITERAL_RE.sub("?", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """``{fingerprint: times run}`` for statements run more than once."""
+        return {fp: n for fp, n in self.fingerprints.items() if n > 1}
+
+    @property
+    def duplicate_count(self):
+        """Executions beyond the first of each repeated statement."""
+        return sum(n - 1 for n in self.duplicates.values())
+
+
+@contextmanager
+def record_queries():
+    """Yield a QueryRecorder that sees every query run on this thread's
+    connections inside the block."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
@@ -0,0 +1,40 @@
+"""
+JSON rendering with orjson.
+
+ORJSONRenderer is a drop-in for DRF's JSONRenderer and renders the same
+bytes. Whatever orjson cannot encode itself (Decimal, lazy strings,
+querysets) goes through DRF's encoder, and so do datetimes, dates and
+times, so they keep DRF's format ("Z" for UTC) rather than orjson's.
+orjson is optional. Without it, and for output it does not produce
+(``; indent=`` requests, non-str dict keys, integers over 64 bits), the
+stdlib renderer is used. One difference remains: NaN and infinity render
+as null instead of raising.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson only writes compact UTF-8, i.e. COMPACT_JSON and UNICODE_JSON.
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer: keep the output a strict JavaScript subset.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+def dumps(data):
+    """``data`` rendered as ORJSONRenderer renders it, for views outside DRF."""
+    return ORJSONRenderer().render(data)
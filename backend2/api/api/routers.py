@@ -0,0 +1,50 @@
+"""
+Primary/replica database routing.
+
+Reads go to the ``replica`` alias only while ``reads_from_replica()`` is
+active, which ReplicaRoutingMiddleware turns on for safe (GET/HEAD/OPTIONS)
+requests from clients that have not written recently. Everything else,
+including management commands and background workers, uses the primary.
+Once a request writes, the rest of it reads from the primary too.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+REPLICA = "replica"
+PRIMARY = "default"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def reads_from_replica(enabled=True):
+    token = _replica_reads.set(enabled and REPLICA in connections.settings)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_primary():
+    """Send the remaining reads of the current context to the primary."""
+    _replica_reads.set(False)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not connections[PRIMARY].in_atomic_block:
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        use_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -51,6 +51,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.compression.CompressionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -84,21 +88,184 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres switches to PostgreSQL with persistent connections, or
+# a psycopg connection pool when DB_POOL is on. Setting DB_REPLICA_HOST
+# (Postgres) or DB_REPLICA_NAME (a second SQLite file) adds a "replica"
+# alias that api.routers.PrimaryReplicaRouter sends GET traffic to.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = config('DB_POOL', default=True, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='mygigs'),
+            'USER': config('DB_USER', default='mygigs'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # The pool keeps connections open itself; without it, keep
+            # each worker's connection for CONN_MAX_AGE seconds.
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': config('DB_POOL_MIN', default=2, cast=int),
+                    'max_size': config('DB_POOL_MAX', default=10, cast=int),
+                    'timeout': 10,
+                },
+            } if DB_POOL else {},
+        }
     }
+    if config('DB_REPLICA_HOST', default=''):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': config('DB_REPLICA_HOST'),
+            'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+    # WAL, tuned pragmas, IMMEDIATE transactions and a busy timeout for
+    # small deployments that stay on SQLite (see api/sqlite.py).
+    SQLITE_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",      # durable at checkpoints; safe with WAL
+        "PRAGMA cache_size=-65536",       # 64 MiB page cache per connection
+        "PRAGMA mmap_size=268435456",     # 256 MiB memory-mapped reads
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA wal_autocheckpoint=1000",
+    )
+    SQLITE_PRODUCTION_OPTIONS = {
+        "init_command": ";".join(SQLITE_PRAGMAS),
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 30,  # busy timeout, seconds
+    }
+    if config('SQLITE_PRODUCTION', default=False, cast=bool):
+        DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    if config('DB_REPLICA_NAME', default=''):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / config('DB_REPLICA_NAME'),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+if 'replica' in DATABASES:
+    DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# Requests over any of these limits are logged by QueryBudgetMiddleware.
+QUERY_BUDGET = {
+    'MAX_QUERIES': config('QUERY_BUDGET_MAX_QUERIES', default=25, cast=int),
+    'MAX_TIME_MS': config('QUERY_BUDGET_MAX_TIME_MS', default=250, cast=int),
+    'MAX_DUPLICATES': config('QUERY_BUDGET_MAX_DUPLICATES', default=5, cast=int),
+}
+
+# After a client writes, its reads stay on the primary this long so it sees
+# its own changes despite replica lag. Needs a cache shared by all workers.
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=10, cast=int)
+
+# Prometheus metrics at /metrics. With several worker processes set
+# METRICS_DIR to a directory shared by them (emptied on deploy) so the
+# endpoint reports every worker, not just the one that served the scrape.
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=float)
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>". Without a token
+# /metrics is a 404 unless DEBUG is on.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Application logs go out as redacted JSON lines from a background thread
+# (api.log.BackgroundHandler). LOG_SAMPLING keeps only a fraction of the
+# DEBUG/INFO records of busy loggers; warnings and errors are never dropped.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_SAMPLING = {
+    'users.authentication': config('LOG_SAMPLE_AUTH', default=0.01, cast=float),
 }
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {'()': 'api.log.SamplingFilter', 'rates': LOG_SAMPLING},
+    },
+    'handlers': {
+        'structured': {'()': 'api.log.BackgroundHandler', 'filters': ['sampling']},
+    },
+    'loggers': {
+        name: {'handlers': ['structured'], 'level': LOG_LEVEL, 'propagate': False}
+        for name in ('api', 'mygigs', 'users')
+    },
+}
+
+# Cold-start target for a new worker (interpreter + settings + URLconf),
+# checked by `manage.py bench_startup`. Modules listed here are only needed
+# by a few endpoints and must stay out of the boot path.
+STARTUP_BUDGET_MS = config('STARTUP_BUDGET_MS', default=800, cast=float)
+STARTUP_LAZY_MODULES = ('svix', 'jose', 'httpx')
+
+# Serve the I/O-bound endpoints (STK push, whoami/me, the Clerk webhook) from
+# async views. api/asgi.py turns this on; under WSGI the DRF views are used.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+# Throttle buckets live in this cache; point it at Redis/memcached so all
+# workers share them (the default local-memory cache is per process).
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+# Timeout in seconds for the shared async HTTP client (api/http.py).
+OUTBOUND_HTTP_TIMEOUT = config('OUTBOUND_HTTP_TIMEOUT', default=10, cast=float)
+# Text/JSON responses of at least this many bytes are sent gzip or brotli
+# encoded (api/compression.py).
+COMPRESSION_MIN_BYTES = config('COMPRESSION_MIN_BYTES', default=1024, cast=int)
+# Public catalog responses are cached with their compressed encodings
+# (api/cache.py). As with throttles, share this cache between workers.
+RESPONSE_CACHE = config('RESPONSE_CACHE', default='default')
+RESPONSE_CACHE_SECONDS = config('RESPONSE_CACHE_SECONDS', default=60, cast=int)
+# Longest a missing entry is locked for one worker to compute, and so the
+# longest other requests wait for it before computing it themselves.
+RESPONSE_CACHE_LOCK_SECONDS = config('RESPONSE_CACHE_LOCK_SECONDS', default=10, cast=float)
+# How early entries are refreshed before they expire (XFetch beta; 0
+# refreshes only after expiry).
+RESPONSE_CACHE_BETA = config('RESPONSE_CACHE_BETA', default=1.0, cast=float)
+# Browse freelancers from an in-memory copy in each worker (needs numpy;
+# mygigs/catalog_engine.py), reloaded from the database this often.
+CATALOG_ENGINE = config('CATALOG_ENGINE', default=False, cast=bool)
+CATALOG_ENGINE_REBUILD_SECONDS = config('CATALOG_ENGINE_REBUILD_SECONDS', default=300, cast=int)
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "users.authentication.ClerkAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
+    # orjson-backed drop-ins for DRF's JSON renderer and parser (api/renderers.py).
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
+    # Token buckets, "<scope>.<kind>": "<tokens>/<period>" (api/throttling.py).
+    "DEFAULT_THROTTLE_CLASSES": ["api.throttling.ClerkUserThrottle"],
+    # Proxies in front of the app that append to X-Forwarded-For; per-IP
+    # throttles use the address the last of them saw. 0 (the default)
+    # ignores the header and uses REMOTE_ADDR, since clients can send any
+    # X-Forwarded-For they like. Behind one nginx, set NUM_PROXIES=1.
+    "NUM_PROXIES": config('NUM_PROXIES', default=0, cast=int),
+    "DEFAULT_THROTTLE_RATES": {
+        "default.user": "600/min",
+        "search.ip": "60/min",
+        "stk_push.ip": "30/hour",
+        "stk_push.phone": "5/hour",
+        "auth.ip": "30/min",
+    },
 }# 
 
 
@@ -141,6 +308,12 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How media files leave the app (see mygigs/media.py): unset streams them
+# from Django with sendfile/Range support, "nginx" hands off with
+# X-Accel-Redirect to MEDIA_ACCEL_PREFIX, "apache" uses X-Sendfile.
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default=None)
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 # DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
 # CLOUDINARY_STORAGE = {
@@ -154,14 +327,24 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CLERK_DOMAIN = "wired-ferret-99.clerk.accounts.dev"
+# Load tests point this at a local JWKS (see api.testing.LocalJWKS).
+CLERK_JWKS_URL = config('CLERK_JWKS_URL', default=f"https://{CLERK_DOMAIN}/.well-known/jwks.json")
+
+# Integration secrets default to empty so workers boot without them; the
+# M-Pesa and Clerk views check for them and answer 503 when they are unset.
+MPESA_CONFIG = {
+    'CONSUMER_KEY': config('MPESA_CONSUMER_KEY', default=''),
+    'CONSUMER_SECRET': config('MPESA_CONSUMER_SECRET', default=''),
+    'SHORTCODE': config('MPESA_SHORTCODE', default=''),
+    'PASSKEY': config('MPESA_PASSKEY', default=''),
+    'CALLBACK_URL': config('MPESA_CALLBACK_URL', default=''),
+    'ENV': config('MPESA_ENV', default='sandbox'),
+    'CLERK_WEBHOOK_SECRET': config('CLERK_WEBHOOK_SECRET', default=''),
+    'CLERK_SECRET_KEY': config('CLERK_SECRET_KEY', default=''),
+}
 
-MPESA_CONFIG = {                                                              
-    'CONSUMER_KEY': config('MPESA_CONSUMER_KEY'),                            
-    'CONSUMER_SECRET': config('MPESA_CONSUMER_SECRET'),                      
-    'SHORTCODE': config('MPESA_SHORTCODE'),                                  
-    'PASSKEY': config('MPESA_PASSKEY'),                                      
-    'CALLBACK_URL': config('MPESA_CALLBACK_URL'),                            
-    'ENV': config('MPESA_ENV', default='sandbox'),  
-    'CLERK_WEBHOOK_SECRET': config('CLERK_WEBHOOK_SECRET'),   
-    'CLERK_SECRET_KEY': config('CLERK_SECRET_KEY'),                     
-}
\ No newline at end of file
+# Image derivatives (mygigs/derivatives.py): widths rendered for profession
+# images, document preview width, and size of the rendering process pool.
+IMAGE_DERIVATIVE_WIDTHS = (160, 480, 960)
+DOCUMENT_PREVIEW_WIDTH = 320
+DERIVATIVE_WORKERS = config('DERIVATIVE_WORKERS', default=2, cast=int)
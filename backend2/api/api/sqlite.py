@@ -0,0 +1,77 @@
+"""
+SQLite production profile and write serialization.
+
+SQLite allows one writer at a time. Under concurrent review, vote and
+payment-callback writes the default setup fails with "database is locked":
+rollback-journal readers block the writer, and deferred transactions that
+upgrade to writing cannot be rescued by the busy timeout. The profile in
+settings (SQLITE_PRODUCTION_OPTIONS) uses WAL (readers never block the
+writer), starts write transactions with BEGIN IMMEDIATE and waits on the
+busy timeout instead of failing.
+
+``serialized_write`` additionally queues hot write paths on a lock, within
+the process and, through ``flock`` on a lock file next to the database,
+across worker processes. Writers then wait their turn in order instead of
+spinning in SQLite's busy handler. Where there is no ``fcntl`` (Windows)
+only the in-process lock applies. On other databases it is a plain
+``transaction.atomic()``.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_thread_lock = threading.Lock()
+
+
+def _is_sqlite(alias):
+    return connections[alias].vendor == "sqlite"
+
+
+def lock_path(alias):
+    """The lock file for a database file; None for in-memory databases."""
+    name = str(connections[alias].settings_dict["NAME"])
+    if name == ":memory:" or "mode=memory" in name or not os.path.exists(name):
+        return None
+    return f"{name}.write-lock"
+
+
+@contextmanager
+def _process_lock(path):
+    if fcntl is None or path is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def serialized_write(using=None):
+    """An atomic block that, on SQLite, waits for its turn to write."""
+    alias = using or DEFAULT_DB_ALIAS
+    if not _is_sqlite(alias) or connections[alias].in_atomic_block:
+        with transaction.atomic(using=alias):
+            yield
+        return
+    with _thread_lock, _process_lock(lock_path(alias)), transaction.atomic(using=alias):
+        yield
+
+
+def serialized(func):
+    """Decorator form of ``serialized_write`` for view methods."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with serialized_write():
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,102 @@
+"""Test helpers: query budgets and locally signed Clerk tokens."""
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .queries import record_queries
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the block runs more than ``limit`` queries. Unlike
+    ``assertNumQueries`` it does not break when a change removes queries,
+    and the failure lists the statements that repeated.
+    """
+    with record_queries() as queries:
+        yield queries
+    if queries.count > limit:
+        repeated = "\n".join(
+            f"  {n}x {fp}" for fp, n in sorted(queries.duplicates.items(), key=lambda i: -i[1])
+        )
+        raise AssertionError(
+            f"{queries.count} queries executed, {limit} allowed"
+            + (f"; repeated statements:\n{repeated}" if repeated else "")
+        )
+
+
+class QueryBudgetMixin:
+    """TestCase mixin adding ``self.assertMaxQueries(n)``."""
+
+    def assertMaxQueries(self, limit):
+        return assert_max_queries(limit)
+
+
+class LocalJWKS:
+    """
+    An RSA key pair standing in for Clerk's, for tests, benchmarks and load
+    tests. ``token()`` signs Clerk-style session JWTs; point
+    ``CLERK_JWKS_URL`` at ``serve()``'s URL for ClerkAuthentication to accept
+    them. Generating a key in pure Python takes seconds, so keys are cached
+    in the temp directory per size.
+    """
+
+    kid = "local-test-key"
+
+    def __init__(self, bits=2048):
+        import rsa
+        from jose import jwk
+
+        path = os.path.join(tempfile.gettempdir(), f"mygigs-local-jwks-{bits}.pem")
+        try:
+            with open(path, "rb") as f:
+                private = rsa.PrivateKey.load_pkcs1(f.read())
+        except (OSError, ValueError):
+            _, private = rsa.newkeys(bits)
+            with open(path, "wb") as f:
+                f.write(private.save_pkcs1())
+        public = rsa.PublicKey(private.n, private.e)
+        self.private_pem = private.save_pkcs1().decode()
+        self.public_jwk = dict(jwk.construct(public.save_pkcs1().decode(), "RS256").to_dict(), kid=self.kid, use="sig")
+
+    def jwks(self):
+        return {"keys": [self.public_jwk]}
+
+    def token(self, sub, lifetime=3600, **claims):
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {"sub": sub, "iat": now, "nbf": now, "exp": now + lifetime, **claims}
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+    def serve(self, host="127.0.0.1", port=0, latency=0.0):
+        """Serve the JWKS over HTTP from a daemon thread; returns
+        ``(url, server)``. Call ``server.shutdown()`` when done. ``latency``
+        (seconds) delays each response, to stand in for a remote Clerk."""
+        body = json.dumps(self.jwks()).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like Clerk; without TCP_NODELAY the separate header
+            # and body writes hit delayed ACKs (~40ms per request).
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if latency:
+                    time.sleep(latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://{host}:{server.server_port}/.well-known/jwks.json", server
@@ -0,0 +1,229 @@
+"""
+Token-bucket throttles.
+
+Buckets are kept with GCRA: one number per bucket, the time at which it
+will be full again (its "theoretical arrival time", TAT). Each request
+moves the TAT one interval later. The request is refused when that would
+put the TAT more than a full bucket ahead of now. In the shared cache
+(THROTTLE_CACHE, Redis or memcached in production) that is a single
+atomic ``incr`` per request. If the cache is unreachable, each process
+falls back to its own buckets instead of failing open or closed.
+
+Rates live in REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] as
+``"<scope>.<kind>": "<tokens>/<period>"``. ``scope`` is the view's
+``throttle_scope`` ("default" if unset). ``kind`` is what is counted: ip,
+user (the Clerk user) or phone. A bucket holds ``tokens`` and refills
+over ``period``. A scope without its own rate for a kind uses the
+"default.<kind>" rate (in its own buckets); with neither it is not
+throttled.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"30/min"`` -> ``(30, 60)``: bucket size and refill period in seconds."""
+    tokens, period = rate.split("/")
+    return int(tokens), PERIODS[period[0]]
+
+
+class LocalBuckets:
+    """In-process GCRA buckets behind a lock; the fallback store."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tats = {}
+
+    def take(self, key, now, interval, burst):
+        with self.lock:
+            tat = max(self.tats.get(key, now), now) + interval
+            if tat - now > burst:
+                return tat - now - burst
+            self.tats[key] = tat
+            if len(self.tats) > 100000:
+                # Forget buckets that are full again.
+                self.tats = {k: t for k, t in self.tats.items() if t > now}
+            return 0
+
+    def peek(self, key, now, interval, burst):
+        with self.lock:
+            return max(max(self.tats.get(key, now), now) + interval - now - burst, 0)
+
+
+class TokenBuckets:
+    """
+    GCRA buckets in a Django cache. Times are integer milliseconds so the
+    TAT can be moved with ``incr``.
+    """
+
+    def __init__(self):
+        self.local = LocalBuckets()
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def take(self, key, tokens, period):
+        """Take a token. Returns 0 when allowed, else the seconds until one
+        is available."""
+        now, interval, burst = self.units(tokens, period)
+        try:
+            wait = self.take_shared(key, now, interval, burst)
+        except Exception:
+            logger.warning("Throttle cache unavailable; using per-process buckets", exc_info=True)
+            wait = self.local.take(key, now, interval, burst)
+        return wait / 1000
+
+    def peek(self, key, tokens, period):
+        """Like take() without using the token."""
+        now, interval, burst = self.units(tokens, period)
+        try:
+            tat = self.cache.get(key)
+        except Exception:
+            return self.local.peek(key, now, interval, burst) / 1000
+        return max(max(tat or now, now) + interval - now - burst, 0) / 1000
+
+    def units(self, tokens, period):
+        interval = period * 1000 // tokens
+        return int(time.time() * 1000), interval, interval * tokens
+
+    def take_shared(self, key, now, interval, burst):
+        cache = self.cache
+        # A full bucket's key may expire; after twice the refill time it
+        # certainly is full, so no bucket lingers in the cache beyond that.
+        timeout = 2 * burst // 1000 + 1
+        try:
+            tat = cache.incr(key, interval)
+        except ValueError:
+            # No bucket yet; if another request creates it first, join it.
+            if cache.add(key, now + interval, timeout):
+                return 0
+            tat = cache.incr(key, interval)
+        if tat - interval < now:
+            # The bucket had refilled completely; restart it from now.
+            # Racing requests here can each get a token: lenient, never strict.
+            cache.set(key, now + interval, timeout)
+            return 0
+        if tat - now > burst:
+            # Refused: give the token back and keep the bucket alive while
+            # its client keeps hammering it.
+            cache.decr(key, interval)
+            cache.touch(key, timeout)
+            return tat - now - burst
+        return 0
+
+
+buckets = TokenBuckets()
+
+
+def rate_for(scope, kind):
+    if not settings.THROTTLE_ENABLED:
+        return None
+    rates = api_settings.DEFAULT_THROTTLE_RATES
+    rate = rates.get(f"{scope}.{kind}") or rates.get(f"default.{kind}")
+    return parse_rate(rate) if rate else None
+
+
+def bucket_key(scope, kind, ident):
+    # Hashed, so phone numbers and addresses are not stored in the cache.
+    return "throttle:" + hashlib.sha1(f"{scope}.{kind}:{ident}".encode()).hexdigest()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses set ``kind`` and implement get_ident_for()."""
+
+    kind = None
+
+    def get_ident_for(self, request, view):
+        """What to count the request against; None to let it through."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.delay = 0
+        scope = getattr(view, "throttle_scope", None) or "default"
+        rate = rate_for(scope, self.kind)
+        if rate is None:
+            return True
+        ident = self.get_ident_for(request, view)
+        if ident is None:
+            return True
+        self.delay = buckets.take(bucket_key(scope, self.kind, ident), *rate)
+        return not self.delay
+
+    def wait(self):
+        return self.delay or None
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Per client IP: REMOTE_ADDR, or X-Forwarded-For as far as
+    REST_FRAMEWORK["NUM_PROXIES"] trusted proxies appended to it."""
+
+    kind = "ip"
+
+    def get_ident_for(self, request, view):
+        return self.get_ident(request)
+
+
+class ClerkUserThrottle(TokenBucketThrottle):
+    """Per signed-in user; anonymous requests are not counted."""
+
+    kind = "user"
+
+    def get_ident_for(self, request, view):
+        user = getattr(request, "user", None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+class PhoneThrottle(TokenBucketThrottle):
+    """Per phone number in the request body, so one handset cannot be
+    spammed with payment prompts from many addresses."""
+
+    kind = "phone"
+
+    def get_ident_for(self, request, view):
+        digits = "".join(c for c in str(request.data.get("phone_number") or "") if c.isdigit())
+        if not digits:
+            return None
+        # 0712345678, 712345678 and 254712345678 are the same handset.
+        return "254" + digits[-9:] if len(digits) >= 9 else digits
+
+
+class SearchThrottle(IPThrottle):
+    """Per IP, counting only free-text searches (the expensive queries)."""
+
+    def allow_request(self, request, view):
+        if not request.query_params.get("search"):
+            self.delay = 0
+            return True
+        return super().allow_request(request, view)
+
+
+# DRF runs throttles after authentication, so bad Clerk tokens never reach
+# them; ClerkAuthentication calls these itself. Only rejected tokens are
+# counted ("auth.ip"), so signed-in users are never slowed down.
+
+def check_auth_failures(request):
+    """Raise Throttled while this IP's bucket of rejected tokens is empty."""
+    rate = rate_for("auth", "ip")
+    if rate:
+        wait = buckets.peek(bucket_key("auth", "ip", BaseThrottle().get_ident(request)), *rate)
+        if wait:
+            raise exceptions.Throttled(wait)
+
+
+def record_auth_failure(request):
+    rate = rate_for("auth", "ip")
+    if rate:
+        buckets.take(bucket_key("auth", "ip", BaseThrottle().get_ident(request)), *rate)
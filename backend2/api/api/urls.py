@@ -15,13 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf.urls.static import static
 from django.conf import settings
+from mygigs.media import serve_public_media
+from api.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('mygigs.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(r'^media/(?P<path>(?:professions|avatars|freelancers|derivatives/images)/.+)$', serve_public_media, name='public-media'),
 ]
 if settings.DEBUG:
+    # Dev only: anything serve_public_media refuses (documents) is still
+    # reachable at its plain media URL.
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
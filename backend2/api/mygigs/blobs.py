@@ -0,0 +1,122 @@
+"""
+Content-addressed storage for FreelancerDocument files.
+
+Every distinct file is stored once under
+``freelancer_documents/blobs/<aa>/<sha256><ext>`` as a DocumentBlob, and
+documents point at it. Uploading a file we already hold only bumps the
+blob's ``ref_count``; deleting a document decrements it and removes the blob
+when nothing references it any more. ``gc_document_blobs`` sweeps whatever
+slips through (crashed uploads, counter drift).
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db.models import F
+
+from api.sqlite import serialized_write
+
+from .models import DocumentBlob
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Computes the SHA-256 of each uploaded file while Django streams it to
+    the next handler, so the file never has to be read back to be hashed.
+    Digests are kept in ``digests`` by form field name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = self._digest.hexdigest()
+        return None
+
+
+def file_sha256(fileobj):
+    digest = hashlib.sha256()
+    for chunk in fileobj.chunks():
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _acquire(sha256, size, filename, write):
+    """
+    Return the blob for ``sha256`` with its ref_count incremented, calling
+    ``write(name)`` (which returns the name stored) to store the content
+    only if the blob is new or its file is missing. The row stays locked
+    until the file is in place, so a concurrent delete_blob cannot remove
+    it underneath us.
+    """
+    name = DocumentBlob(sha256=sha256).storage_name(filename)
+    with serialized_write():
+        blob, created = DocumentBlob.objects.select_for_update().get_or_create(
+            sha256=sha256, defaults={"file": name, "size": size}
+        )
+        if created or not default_storage.exists(blob.file.name):
+            stored = write(blob.file.name)
+            if stored != blob.file.name:
+                blob.file.name = stored
+                blob.save(update_fields=["file"])
+        DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        blob.refresh_from_db(fields=["ref_count"])
+    return blob
+
+
+def store_uploaded_file(uploaded, sha256=None):
+    """Store a Django UploadedFile, reusing an identical blob if we have one."""
+    sha256 = sha256 or file_sha256(uploaded)
+
+    def write(name):
+        return default_storage.save(name, uploaded)
+
+    return _acquire(sha256, uploaded.size, uploaded.name, write)
+
+
+def store_local_file(path, sha256, filename):
+    """Move a fully written local file (e.g. a finished chunked upload) into
+    blob storage, or discard it if the content is already stored."""
+    size = os.path.getsize(path)
+
+    def write(name):
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return name
+
+    blob = _acquire(sha256, size, filename, write)
+    if os.path.exists(path):
+        os.remove(path)
+    return blob
+
+
+def release_blob(blob_id):
+    """Drop one reference; delete the blob and its file once unreferenced."""
+    with serialized_write():
+        DocumentBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F("ref_count") - 1)
+        blob = DocumentBlob.objects.filter(pk=blob_id, ref_count__lte=0).first()
+        if blob is not None:
+            delete_blob(blob)
+
+
+def delete_blob(blob):
+    """Delete an unreferenced blob and its file, re-checking under the row
+    lock that no upload has taken a new reference meanwhile."""
+    with serialized_write():
+        blob = DocumentBlob.objects.select_for_update().filter(pk=blob.pk).first()
+        if blob is None or blob.ref_count > 0 or blob.documents.exists():
+            return
+        blob.delete()
+        default_storage.delete(blob.file.name)
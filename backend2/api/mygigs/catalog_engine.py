@@ -0,0 +1,230 @@
+"""
+Opt-in in-memory freelancer catalog for browsing (CATALOG_ENGINE).
+
+Each worker keeps the active freelancers as NumPy column arrays, already
+in list order (-rating, -completed_jobs, id). FreelancerViewSet.list then
+applies its filters as array masks instead of SQL, and loads only the
+page's rows, by id, in one query.
+
+Saves and deletes are logged in the response cache by record_change()
+(connected in signals.py); before its next search a worker re-reads just
+the logged freelancers. Profession changes, gaps in the log and
+CATALOG_ENGINE_REBUILD_SECONDS (for bulk ``update()`` calls, which send
+no signals) reload everything. Without numpy, or for parameters it cannot
+answer the way SQL would, search() returns None and the list queries the
+database as usual.
+"""
+import json
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from api.cache import response_cache
+
+from .models import Freelancer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog-engine:version"
+# A logged change to every freelancer (ids start at 1).
+ALL = 0
+# More changes than this since a worker's snapshot: reload instead.
+MAX_CHANGES = 500
+# The list's case-insensitive exact-match filters.
+CATEGORIES = ("county", "constituency", "ward")
+COLUMNS = (
+    "id", "rating", "completed_jobs", "years_experience", "profession_id", *CATEGORIES,
+    "name", "skills", "profession__name",
+)
+# Joins the rows' searchable texts; searches containing it go to SQL.
+SEPARATOR = "\x00"
+
+
+def change_key(version):
+    return f"catalog-engine:change:{version}"
+
+
+def record_change(freelancer_id=ALL):
+    """Log a change to one freelancer (ALL: to any) for every worker."""
+    cache = response_cache()
+    try:
+        cache.add(VERSION_KEY, 0, None)
+        version = cache.incr(VERSION_KEY)
+        cache.set(change_key(version), freelancer_id, settings.CATALOG_ENGINE_REBUILD_SECONDS)
+    except Exception:
+        logger.warning("Catalog engine change log unavailable", exc_info=True)
+
+
+def active_rows(queryset=None):
+    """``{id: row}`` of the active freelancers: what a snapshot is built from."""
+    queryset = Freelancer.objects.all() if queryset is None else queryset
+    rows = {}
+    for values in queryset.filter(is_active=True).values_list(*COLUMNS):
+        pk, rating, completed_jobs, years_experience, profession_id, *categories, name, skills, profession = values
+        # What search matches, as the list's icontains lookups see it:
+        # skills as their JSON text.
+        text = SEPARATOR.join([name, json.dumps(skills), profession or ""]).lower()
+        rows[pk] = (
+            pk, float(rating), completed_jobs, years_experience, profession_id or 0,
+            *(value.lower() for value in categories), text,
+        )
+    return rows
+
+
+class Snapshot:
+    """Active freelancers as columns in list order."""
+
+    def __init__(self, rows, version, loaded):
+        self.rows = rows
+        self.version = version
+        self.loaded = loaded
+
+        columns = list(zip(*rows.values())) or [()] * (len(CATEGORIES) + 6)
+        count = len(rows)
+        ids = np.fromiter(columns[0], np.int64, count)
+        rating = np.fromiter(columns[1], np.float64, count)
+        completed_jobs = np.fromiter(columns[2], np.int64, count)
+        order = np.lexsort((ids, -completed_jobs, -rating))
+        self.ids = ids[order]
+        self.rating = rating[order]
+        self.years_experience = np.fromiter(columns[3], np.int64, count)[order]
+        self.profession = np.fromiter(columns[4], np.int64, count)[order]
+
+        # Text columns as integer codes: {name: (value -> code, codes)}.
+        self.categories = {}
+        for i, name in enumerate(CATEGORIES, start=5):
+            index = {}
+            codes = np.fromiter((index.setdefault(value, len(index)) for value in columns[i]), np.int32, count)
+            self.categories[name] = (index, codes[order])
+
+        texts = [columns[-1][i] for i in order.tolist()]
+        self.text = SEPARATOR.join(texts)
+        lengths = np.fromiter(map(len, texts), np.int64, count) + len(SEPARATOR)
+        self.starts = np.cumsum(lengths) - lengths
+
+    def matching(self, term):
+        """Mask of the rows whose text contains ``term``."""
+        mask = np.zeros(len(self.ids), bool)
+        positions = [match.start() for match in re.finditer(re.escape(term), self.text)]
+        if positions:
+            mask[np.searchsorted(self.starts, positions, side="right") - 1] = True
+        return mask
+
+    def search(self, params):
+        """Ids matching FreelancerViewSet's filters in ``params``, in list
+        order; None when they are not numbers SQL would accept."""
+        mask = np.ones(len(self.ids), bool)
+        try:
+            if params.get("profession"):
+                profession = int(params["profession"])
+                if profession < 1:
+                    return None
+                mask &= self.profession == profession
+            if params.get("min_rating"):
+                mask &= self.rating >= float(params["min_rating"])
+            if params.get("min_experience"):
+                mask &= self.years_experience >= int(params["min_experience"])
+        except ValueError:
+            return None
+        for name, (index, codes) in self.categories.items():
+            if params.get(name):
+                code = index.get(params[name].lower())
+                mask &= (codes == code) if code is not None else False
+        search = params.get("search")
+        if search:
+            if SEPARATOR in search:
+                return None
+            mask &= self.matching(search.lower())
+        return self.ids[mask]
+
+
+class CatalogEngine:
+    """One worker's snapshot, kept up to date with the change log."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def search(self, params):
+        """Ids of the active freelancers matching the list's ``params``, in
+        list order; None when the database should answer."""
+        if np is None or not settings.CATALOG_ENGINE:
+            return None
+        try:
+            version = response_cache().get(VERSION_KEY, 0)
+        except Exception:
+            logger.warning("Catalog engine change log unavailable", exc_info=True)
+            version = None
+        snapshot = self.snapshot
+        if not self.current(snapshot, version):
+            with self.lock:
+                snapshot = self.snapshot
+                if not self.current(snapshot, version):
+                    snapshot = self.snapshot = self.refresh(snapshot, version)
+        return snapshot.search(params)
+
+    def current(self, snapshot, version):
+        return (
+            snapshot is not None
+            and version in (None, snapshot.version)
+            and time.monotonic() - snapshot.loaded < settings.CATALOG_ENGINE_REBUILD_SECONDS
+        )
+
+    def refresh(self, snapshot, version):
+        if version is None:
+            # No change log: only reloads keep the snapshot fresh.
+            version = snapshot.version if snapshot is not None else 0
+        if (
+            snapshot is None
+            or time.monotonic() - snapshot.loaded >= settings.CATALOG_ENGINE_REBUILD_SECONDS
+            or not 0 <= version - snapshot.version <= MAX_CHANGES
+        ):
+            return self.load(version)
+        try:
+            changes = response_cache().get_many([change_key(v) for v in range(snapshot.version + 1, version + 1)])
+        except Exception:
+            logger.warning("Catalog engine change log unavailable", exc_info=True)
+            return self.load(version)
+        if len(changes) < version - snapshot.version or ALL in changes.values():
+            return self.load(version)
+        changed = set(changes.values())
+        rows = {pk: row for pk, row in snapshot.rows.items() if pk not in changed}
+        rows.update(active_rows(Freelancer.objects.filter(id__in=changed)))
+        return Snapshot(rows, version, snapshot.loaded)
+
+    def load(self, version):
+        # ``version`` was read before the rows, so changes made meanwhile
+        # are at worst re-read later.
+        return Snapshot(active_rows(), version, time.monotonic())
+
+
+engine = CatalogEngine()
+
+
+class Hits:
+    """Matching ids as a sequence for the list's paginator: a slice loads
+    its rows with ``load(ids)`` (``{id: row}``), in one query."""
+
+    def __init__(self, ids, load):
+        self.ids = ids
+        self.load = load
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        ids = self.ids[index].tolist()
+        rows = self.load(ids)
+        # Freelancers deactivated since the snapshot are left out.
+        return [rows[pk] for pk in ids if pk in rows]
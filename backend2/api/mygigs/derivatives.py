@@ -0,0 +1,118 @@
+"""
+Derived images: resized WebP/JPEG variants of profession images and JPEG
+previews of freelancer documents.
+
+Rendering runs in a process pool (``mygigs.imaging``) scheduled after the
+upload commits. Files are named by the source's SHA-256, so identical
+sources share variants and a variant never needs invalidating:
+
+* ``derivatives/images/<aa>/<sha>-<width>.<webp|jpg>`` (public)
+* ``derivatives/previews/<aa>/<sha>-preview.jpg`` (served by the document
+  view after its ownership check)
+"""
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from . import imaging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WIDTHS = getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (160, 480, 960))
+PREVIEW_WIDTH = getattr(settings, "DOCUMENT_PREVIEW_WIDTH", 320)
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # "spawn" keeps the children free of the parent's threads and DB
+        # connections; they only import mygigs.imaging.
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, "DERIVATIVE_WORKERS", 2),
+            mp_context=get_context("spawn"),
+        )
+    return _pool
+
+
+def schedule(fn, *args):
+    """Run ``fn`` in the pool, or inline when DERIVATIVES_EAGER is set."""
+    if getattr(settings, "DERIVATIVES_EAGER", False):
+        return fn(*args)
+    future = get_pool().submit(fn, *args)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Derivative rendering failed", exc_info=future.exception())
+
+
+def storage_sha256(name):
+    digest = hashlib.sha256()
+    with default_storage.open(name, "rb") as f:
+        for chunk in f.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_variant_base(sha256):
+    return f"derivatives/images/{sha256[:2]}/{sha256}"
+
+
+def image_variant_name(sha256, width, ext):
+    return f"{image_variant_base(sha256)}-{width}.{ext}"
+
+
+def preview_name(sha256):
+    return f"derivatives/previews/{sha256[:2]}/{sha256}-preview.jpg"
+
+
+# Derivative names are content-addressed, so once a file exists it is never
+# replaced; only positive answers are worth remembering.
+_known = set()
+
+
+def exists(name):
+    if name in _known:
+        return True
+    if default_storage.exists(name):
+        _known.add(name)
+        return True
+    return False
+
+
+def schedule_image_variants(name, sha256):
+    return schedule(
+        imaging.render_image_variants,
+        default_storage.path(name),
+        default_storage.path(image_variant_base(sha256)),
+        IMAGE_WIDTHS,
+    )
+
+
+def schedule_preview(name, sha256):
+    return schedule(
+        imaging.render_preview,
+        default_storage.path(name),
+        default_storage.path(preview_name(sha256)),
+        PREVIEW_WIDTH,
+    )
+
+
+def image_variant_urls(sha256):
+    """``{"webp": {160: url, ...}, "jpg": {...}}`` for the variants that
+    have been rendered so far."""
+    variants = {}
+    for ext in imaging.IMAGE_FORMATS:
+        for width in IMAGE_WIDTHS:
+            name = image_variant_name(sha256, width, ext)
+            if exists(name):
+                variants.setdefault(ext, {})[width] = default_storage.url(name)
+    return variants
@@ -0,0 +1,87 @@
+"""
+Image work that runs in the derivative process pool.
+
+This module must stay free of Django imports: the pool starts fresh
+interpreters that only import this file and Pillow.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+IMAGE_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+def _save_atomic(image, path, fmt, **options):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, fmt, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def render_image_variants(src, dest_base, widths, quality=80):
+    """
+    Write ``<dest_base>-<width>.<ext>`` for every width and format.
+    Images are never upscaled; variants that already exist are skipped.
+    Returns the paths written.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    with Image.open(src) as original:
+        original = ImageOps.exif_transpose(original)
+        for width in widths:
+            todo = [
+                (ext, fmt) for ext, fmt in IMAGE_FORMATS.items()
+                if not os.path.exists(f"{dest_base}-{width}.{ext}")
+            ]
+            if not todo:
+                continue
+            image = original.copy()
+            image.thumbnail((width, width * 10), Image.LANCZOS)
+            for ext, fmt in todo:
+                out = image.convert("RGB") if fmt == "JPEG" else image
+                path = f"{dest_base}-{width}.{ext}"
+                _save_atomic(out, path, fmt, quality=quality)
+                written.append(path)
+    return written
+
+
+def render_preview(src, dest, width):
+    """
+    Write a JPEG preview of a document: a thumbnail for images, the first
+    page for PDFs (needs poppler's ``pdftoppm``). Returns ``dest``, or None
+    if the file type cannot be previewed.
+    """
+    if os.path.exists(dest):
+        return dest
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+    if src.lower().endswith(".pdf"):
+        if not shutil.which("pdftoppm"):
+            return None
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(dest)) as tmp:
+            prefix = os.path.join(tmp, "page")
+            subprocess.run(
+                ["pdftoppm", "-f", "1", "-l", "1", "-singlefile",
+                 "-scale-to", str(width), "-jpeg", src, prefix],
+                check=True, capture_output=True, timeout=60,
+            )
+            os.replace(prefix + ".jpg", dest)
+        return dest
+
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(src) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, width * 10), Image.LANCZOS)
+            _save_atomic(image.convert("RGB"), dest, "JPEG", quality=75)
+    except UnidentifiedImageError:
+        return None
+    return dest
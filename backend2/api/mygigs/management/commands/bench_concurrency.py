@@ -0,0 +1,50 @@
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from .bench_http_load import ASGI_SERVER, GUNICORN_SERVER
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency at a fixed worker count: runs bench_http_load against "
+        "sync gunicorn (WSGI, DRF views) and then gunicorn's ASGI worker (async "
+        "views) with the same number of worker processes, while the local "
+        "JWKS answers with Clerk-like latency, and prints the difference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--jwks-latency-ms", type=float, default=100.0)
+        parser.add_argument("--scenarios", default="whoami")
+        parser.add_argument("--duration", type=float, default=15.0)
+        parser.add_argument("--freelancers", type=int, default=500)
+        parser.add_argument("--output-dir", default=".", help="Where the two results files are written.")
+
+    def handle(self, *args, **options):
+        common = {
+            "workers": options["workers"],
+            "concurrency": options["concurrency"],
+            "jwks_latency_ms": options["jwks_latency_ms"],
+            "scenarios": options["scenarios"],
+            "duration": options["duration"],
+            "freelancers": options["freelancers"],
+            "reviews_per_freelancer": 5.0,
+            # gunicorn's sync worker closes every connection, and its asgi
+            # worker stalls on keep-alive connections once Django has
+            # cancelled its disconnect listener; measure both without.
+            "keepalive": False,
+            "stdout": self.stdout,
+        }
+        os.makedirs(options["output_dir"], exist_ok=True)
+        wsgi_results = os.path.join(options["output_dir"], "concurrency-wsgi.json")
+        asgi_results = os.path.join(options["output_dir"], "concurrency-asgi.json")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"WSGI, {options['workers']} sync worker(s)"))
+        call_command("bench_http_load", server_command=GUNICORN_SERVER, output=wsgi_results, **common)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nASGI, {options['workers']} asyncio worker(s)"))
+        call_command(
+            "bench_http_load", server_command=ASGI_SERVER, output=asgi_results, compare=wsgi_results, **common
+        )
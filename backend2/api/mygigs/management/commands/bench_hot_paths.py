@@ -0,0 +1,351 @@
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.test import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import throwaway_database
+from api.compression import encode
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from api.testing import LocalJWKS
+from api.throttling import SearchThrottle
+from mygigs import catalog_engine
+from mygigs.models import Review
+from mygigs.serializers import FreelancerDetailSerializer, FreelancerListSerializer, ReviewSerializer
+from mygigs.views.catalog import FreelancerViewSet
+from users.authentication import ClerkAuthentication
+
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "baseline.json"
+SEED = 1
+
+FILTER_COMBINATIONS = [
+    {},
+    {"county": "Nairobi"},
+    {"profession": "3", "county": "Kiambu", "min_rating": "4"},
+    {"search": "wiring", "min_experience": "5"},
+    {"profession": "1", "constituency": "Westlands", "ward": "Parklands/Highridge", "min_rating": "3.5"},
+]
+
+
+class Benchmarks:
+    """The cases. Each ``case_*`` method does its setup and returns
+    ``(callable, operations per call)``."""
+
+    def __init__(self):
+        self.factory = APIRequestFactory()
+
+    def list_queryset(self):
+        return FreelancerViewSet.queryset.order_by("id")
+
+    def case_freelancer_list_serializer_1k(self):
+        rows = list(self.list_queryset()[:1000])
+        return lambda: FreelancerListSerializer(rows, many=True).data, len(rows)
+
+    def case_freelancer_list_serializer_10k(self):
+        rows = list(self.list_queryset()[:10000])
+        return lambda: FreelancerListSerializer(rows, many=True).data, len(rows)
+
+    def case_freelancer_list_rows_1k(self):
+        # The .values() fast path the list endpoints use.
+        rows = list(FreelancerListSerializer.values(self.list_queryset())[:1000])
+        return lambda: FreelancerListSerializer(rows, many=True).data, len(rows)
+
+    def case_freelancer_list_rows_10k(self):
+        rows = list(FreelancerListSerializer.values(self.list_queryset())[:10000])
+        return lambda: FreelancerListSerializer(rows, many=True).data, len(rows)
+
+    def case_freelancer_list_page_100_instances(self):
+        # Query and serialize a 100-row page, as before the fast path.
+        queryset = self.list_queryset()
+        return lambda: FreelancerListSerializer(list(queryset[:100]), many=True).data, 1
+
+    def case_freelancer_list_page_100_rows(self):
+        queryset = FreelancerListSerializer.values(self.list_queryset())
+        return lambda: FreelancerListSerializer(list(queryset[:100]), many=True).data, 1
+
+    def case_freelancer_detail_serializer_1k(self):
+        # get_reviews queries per freelancer, as on the detail page.
+        rows = list(self.list_queryset()[:1000])
+        return lambda: FreelancerDetailSerializer(rows, many=True).data, len(rows)
+
+    def case_review_serializer_nested_1k(self):
+        reviews = list(
+            Review.objects.filter(replies__isnull=False).distinct().order_by("id")
+            .prefetch_related(Prefetch("replies"))[:1000]
+        )
+        return lambda: ReviewSerializer(reviews, many=True).data, len(reviews)
+
+    def list_page(self, size):
+        """A /api/freelancers/ response body as the view hands it to the renderer."""
+        rows = FreelancerListSerializer(list(self.list_queryset()[:size]), many=True).data
+        return {"count": 10000, "next": "http://testserver/api/freelancers/?page=2", "previous": None, "results": rows}
+
+    def render_case(self, renderer, size):
+        data = self.list_page(size)
+        renderer = renderer()
+        return lambda: renderer.render(data), 1
+
+    def case_render_list_12_drf_json(self):
+        return self.render_case(JSONRenderer, 12)
+
+    def case_render_list_12_orjson(self):
+        return self.render_case(ORJSONRenderer, 12)
+
+    def case_render_list_100_drf_json(self):
+        return self.render_case(JSONRenderer, 100)
+
+    def case_render_list_100_orjson(self):
+        return self.render_case(ORJSONRenderer, 100)
+
+    def case_gzip_list_100(self):
+        # What a cache hit saves: compressing a list page per request.
+        body = ORJSONRenderer().render(self.list_page(100))
+        return lambda: encode(body, "gzip"), 1
+
+    def parse_case(self, parser):
+        body = JSONRenderer().render(self.list_page(100))
+        parser = parser()
+        return lambda: parser.parse(io.BytesIO(body), parser_context={"encoding": "utf-8"}), 1
+
+    def case_parse_list_100_drf_json(self):
+        return self.parse_case(JSONParser)
+
+    def case_parse_list_100_orjson(self):
+        return self.parse_case(ORJSONParser)
+
+    def case_clerk_authentication(self):
+        jwks = LocalJWKS()
+        url, self.jwks_server = jwks.serve()
+        self.settings = override_settings(CLERK_JWKS_URL=url)
+        self.settings.enable()
+        token = jwks.token(f"user_syn{SEED}_0", role="freelancer")
+        auth = ClerkAuthentication()
+        request = Request(self.factory.get("/api/freelancers/me/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+
+        def run():
+            user, _ = auth.authenticate(request)
+            assert user is not None
+        return run, 1
+
+    def case_freelancer_queryset_sql(self):
+        requests = []
+        for params in FILTER_COMBINATIONS:
+            view = FreelancerViewSet()
+            view.action = "list"
+            view.format_kwarg = None
+            view.request = Request(self.factory.get("/api/freelancers/", params))
+            requests.append(view)
+
+        def run():
+            for view in requests:
+                str(view.get_queryset().query)
+        return run, len(requests)
+
+    def browse_requests(self):
+        return [Request(self.factory.get("/api/freelancers/", params)) for params in FILTER_COMBINATIONS]
+
+    def case_freelancer_browse_sql(self):
+        # Filter, count and first page of ids for each combination.
+        views = []
+        for request in self.browse_requests():
+            view = FreelancerViewSet()
+            view.action = "list"
+            view.format_kwarg = None
+            view.request = request
+            views.append(view)
+
+        def run():
+            for view in views:
+                queryset = view.get_queryset()
+                queryset.count()
+                list(queryset.values_list("id", flat=True)[:12])
+        return run, len(views)
+
+    def case_freelancer_browse_engine(self):
+        # The same from a loaded snapshot; change-log reads included.
+        self.settings = override_settings(CATALOG_ENGINE=True)
+        self.settings.enable()
+        params = [request.query_params for request in self.browse_requests()]
+        catalog_engine.engine.snapshot = None
+        catalog_engine.engine.search({})
+
+        def run():
+            for query in params:
+                ids = catalog_engine.engine.search(query)
+                len(ids)
+                ids[:12].tolist()
+        return run, len(params)
+
+    def case_catalog_engine_load(self):
+        return lambda: catalog_engine.engine.load(0), 1
+
+    def case_throttle_check(self):
+        # The per-request cost of a token-bucket check against the default
+        # cache: 1000 clients, none of them refused.
+        rates = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={"search.ip": "1000000/min"})
+        self.settings = override_settings(REST_FRAMEWORK=rates)
+        self.settings.enable()
+        view = FreelancerViewSet()
+        requests = [
+            Request(self.factory.get("/api/freelancers/", {"search": "wiring"}, REMOTE_ADDR=f"10.0.{i // 256}.{i % 256}"))
+            for i in range(1000)
+        ]
+
+        def run():
+            for request in requests:
+                assert SearchThrottle().allow_request(request, view)
+        return run, len(requests)
+
+    def teardown(self):
+        if hasattr(self, "settings"):
+            self.settings.disable()
+            del self.settings
+        if hasattr(self, "jwks_server"):
+            self.jwks_server.shutdown()
+            del self.jwks_server
+
+    @classmethod
+    def names(cls):
+        names = [name[len("case_"):] for name in dir(cls) if name.startswith("case_")]
+        if catalog_engine.np is None:
+            names = [name for name in names if "engine" not in name]
+        return names
+
+
+def measure(func, min_rounds, min_time):
+    """Per-call times: one warm-up call, then at least ``min_rounds``
+    calls and at least ``min_time`` seconds. The garbage collector runs
+    between calls rather than during them, so earlier cases' garbage does
+    not skew later ones."""
+    func()
+    times = []
+    started = time.perf_counter()
+    try:
+        while len(times) < min_rounds or time.perf_counter() - started < min_time:
+            gc.collect()
+            gc.disable()
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+            gc.enable()
+    finally:
+        gc.enable()
+    return times
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmarks for hot paths: list/detail/review serializers, "
+        "JSON rendering and parsing (DRF's stdlib classes against orjson), "
+        "gzip of a list page, "
+        "ClerkAuthentication against a local JWKS, FreelancerViewSet "
+        "queryset building, and browsing with SQL against the catalog "
+        "engine (needs numpy). Runs on a throwaway database seeded with "
+        "generate_synthetic_data and compares the fastest round with a stored "
+        "baseline (--save-baseline to record one). Baselines are only "
+        "comparable on the machine that recorded them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", help="Run cases whose name contains this string.")
+        parser.add_argument("--min-rounds", type=int, default=5)
+        parser.add_argument("--min-time", type=float, default=1.0, help="Seconds per case.")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--save-baseline", action="store_true")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Fail if a case's fastest round is this much slower than the baseline (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        names = [n for n in Benchmarks.names() if not options["only"] or options["only"] in n]
+        if not names:
+            raise CommandError(f"No cases match; available: {', '.join(Benchmarks.names())}")
+
+        results = {}
+        with throwaway_database():
+            call_command(
+                "generate_synthetic_data", seed=SEED, freelancers=10000, clients=2000,
+                reviews_per_freelancer=3, jobs=0, testimonials=0, transactions=0,
+                clerk_users=10, stdout=io.StringIO(),
+            )
+            benchmarks = Benchmarks()
+            for name in names:
+                func, ops = getattr(benchmarks, f"case_{name}")()
+                try:
+                    times = measure(func, options["min_rounds"], options["min_time"])
+                finally:
+                    benchmarks.teardown()
+                results[name] = self.stats(times, ops)
+
+        baseline = self.load_baseline(options["baseline"])
+        regressions = self.report(results, baseline.get("benchmarks", {}), options["threshold"])
+
+        if options["save_baseline"]:
+            merged = dict(baseline.get("benchmarks", {}), **results)
+            os.makedirs(os.path.dirname(options["baseline"]), exist_ok=True)
+            with open(options["baseline"], "w") as f:
+                json.dump({"machine": self.machine(), "benchmarks": merged}, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+        elif regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) regressed more than {options['threshold']:.0%}: "
+                + ", ".join(regressions)
+            )
+
+    def stats(self, times, ops):
+        median = statistics.median(times)
+        return {
+            "rounds": len(times),
+            "ops_per_round": ops,
+            "min_ms": round(min(times) * 1000, 3),
+            "median_ms": round(median * 1000, 3),
+            "mean_ms": round(statistics.fmean(times) * 1000, 3),
+            "stddev_ms": round(statistics.stdev(times) * 1000, 3) if len(times) > 1 else 0.0,
+            "per_op_us": round(median / ops * 1e6, 2),
+        }
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def report(self, results, baseline, threshold):
+        regressions = []
+        self.stdout.write(
+            f"{'case':<38}{'min ms':>10}{'median ms':>12}{'per op us':>12}{'rounds':>8}{'vs baseline':>14}"
+        )
+        for name, r in results.items():
+            change = ""
+            if name in baseline:
+                ratio = r["min_ms"] / baseline[name]["min_ms"] - 1
+                change = f"{ratio:+.1%}"
+                if ratio > threshold:
+                    regressions.append(name)
+                    change += " !"
+            self.stdout.write(
+                f"{name:<38}{r['min_ms']:>10.2f}{r['median_ms']:>12.2f}{r['per_op_us']:>12.1f}{r['rounds']:>8}{change:>14}"
+            )
+        return regressions
+
+    def machine(self):
+        return {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+        }
@@ -0,0 +1,396 @@
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import latency_summary, rate
+from api.testing import LocalJWKS
+
+# runserver writes headers and body in separate packets, which with delayed
+# ACKs adds ~40ms to every response; prefer gunicorn when it is installed.
+GUNICORN_SERVER = "{python} -m gunicorn api.wsgi --workers {workers} --bind {addr}"
+RUNSERVER = "{python} manage.py runserver --noreload --skip-checks {addr}"
+DEFAULT_SERVER = GUNICORN_SERVER if importlib.util.find_spec("gunicorn") else RUNSERVER
+# api.asgi turns on ASYNC_VIEWS; gunicorn ships an asyncio ASGI worker.
+ASGI_SERVER = "{python} -m gunicorn api.asgi --worker-class asgi --workers {workers} --bind {addr}"
+
+# name: (weight, needs a Clerk token)
+SCENARIOS = {
+    "freelancers_list": (10, False),
+    "freelancers_filtered": (20, False),
+    "freelancer_detail": (20, False),
+    "freelancer_reviews": (15, False),
+    "professions": (10, False),
+    "featured": (10, False),
+    "check_status": (5, False),
+    "me": (10, True),
+    "whoami": (5, True),
+}
+
+
+class Fixtures:
+    """Ids and filter values to build requests from, read through the API
+    so any seeded server can be targeted."""
+
+    def __init__(self, get, seed, transactions, clerk_users):
+        self.professions = [p["id"] for p in get("/api/professions/").get("results", [])]
+        self.freelancers, self.counties, self.skills = [], set(), set()
+        for page in range(1, 6):
+            data = get("/api/freelancers/?" + urlencode({"page": page}))
+            for freelancer in data.get("results", []):
+                self.freelancers.append(freelancer["id"])
+                self.counties.add(freelancer.get("county") or "")
+                self.skills.update(freelancer.get("skills") or [])
+            if not data.get("next"):
+                break
+        if not self.freelancers:
+            raise CommandError("The server returned no freelancers; seed the database first.")
+        self.counties = sorted(c for c in self.counties if c)
+        self.skills = sorted(self.skills)
+        # Named as generate_synthetic_data names them.
+        self.checkout_ids = [f"ws_CO_SYN{seed}_{i}" for i in range(transactions)]
+        self.clerk_ids = [f"user_syn{seed}_{i}" for i in range(clerk_users)]
+
+
+def build_request(name, rng, fixtures):
+    if name == "freelancers_list":
+        return f"/api/freelancers/?page={rng.randint(1, 3)}"
+    if name == "freelancers_filtered":
+        params = {}
+        if fixtures.professions and rng.random() < 0.6:
+            params["profession"] = rng.choice(fixtures.professions)
+        if fixtures.counties and rng.random() < 0.5:
+            params["county"] = rng.choice(fixtures.counties)
+        if rng.random() < 0.3:
+            params["min_rating"] = rng.choice([3, 3.5, 4, 4.5])
+        if rng.random() < 0.2:
+            params["min_experience"] = rng.choice([1, 3, 5, 10])
+        if fixtures.skills and rng.random() < 0.2:
+            params["search"] = rng.choice(fixtures.skills).split()[0]
+        return "/api/freelancers/?" + urlencode(params)
+    if name == "freelancer_detail":
+        return f"/api/freelancers/{rng.choice(fixtures.freelancers)}/"
+    if name == "freelancer_reviews":
+        return f"/api/freelancers/{rng.choice(fixtures.freelancers)}/reviews/"
+    if name == "professions":
+        return "/api/professions/"
+    if name == "featured":
+        return "/api/freelancers/featured/"
+    if name == "check_status":
+        checkout_id = rng.choice(fixtures.checkout_ids) if fixtures.checkout_ids else "ws_CO_missing"
+        return f"/api/check-status/{checkout_id}/"
+    if name == "me":
+        return "/api/freelancers/me/"
+    if name == "whoami":
+        return "/api/whoami/"
+    raise ValueError(name)
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, index, target, scenarios, fixtures, tokens, seed, warmup_until, deadline, keepalive=True):
+        super().__init__(daemon=True)
+        self.keepalive = keepalive
+        self.rng = random.Random(f"{seed}:worker:{index}")
+        self.target = target
+        self.names = [name for name in scenarios]
+        self.weights = [SCENARIOS[name][0] for name in scenarios]
+        self.fixtures = fixtures
+        self.tokens = tokens
+        self.warmup_until = warmup_until
+        self.deadline = deadline
+        self.samples = {name: [] for name in scenarios}
+        self.statuses = {name: {} for name in scenarios}
+        self.conn = None
+
+    def connect(self):
+        parts = urlsplit(self.target)
+        cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.conn = cls(parts.hostname, parts.port, timeout=30)
+
+    def request(self, path, headers):
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.connect()
+            try:
+                self.conn.request("GET", path, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                if not self.keepalive or response.getheader("Connection", "").lower() == "close":
+                    self.conn.close()
+                    self.conn = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    return 0
+
+    def run(self):
+        while True:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            headers = {"Accept": "application/json"}
+            if not self.keepalive:
+                headers["Connection"] = "close"
+            if SCENARIOS[name][1]:
+                headers["Authorization"] = f"Bearer {self.rng.choice(self.tokens)}"
+            path = build_request(name, self.rng, self.fixtures)
+            start = time.perf_counter()
+            status = self.request(path, headers)
+            elapsed = time.perf_counter() - start
+            if start >= self.warmup_until:
+                self.samples[name].append(elapsed)
+                self.statuses[name][str(status)] = self.statuses[name].get(str(status), 0) + 1
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP load test of the public API. Without --url it seeds a scratch "
+        "SQLite database with generate_synthetic_data, starts a server on it "
+        "(--server-command) with a local JWKS standing in for Clerk, and runs "
+        "the scenario mix against it. Writes RPS and p50/p95/p99 per "
+        "scenario to a JSON file; --compare prints the change from an "
+        "earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Target an already running, already seeded server instead.")
+        parser.add_argument("--server-command", default=DEFAULT_SERVER,
+                            help="Command starting the server; {python}, {addr} and {workers} are filled in.")
+        parser.add_argument("--asgi", action="store_const", dest="server_command", const=ASGI_SERVER,
+                            help="Serve the app over ASGI (gunicorn's asgi worker) with the async views.")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--throttle", action="store_true",
+                            help="Keep throttling on in the scratch server (all clients share one IP, so expect 429s).")
+        parser.add_argument("--jwks-latency-ms", type=float, default=0.0,
+                            help="Delay each JWKS response, standing in for a remote Clerk.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--freelancers", type=int, default=2000)
+        parser.add_argument("--reviews-per-freelancer", type=float, default=20.0)
+        parser.add_argument("--transactions", type=int, default=1000)
+        parser.add_argument("--clerk-users", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--no-keepalive", dest="keepalive", action="store_false",
+                            help="One connection per request (gunicorn's sync worker never keeps connections open).")
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--warmup", type=float, default=3.0)
+        parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument("--output", default="loadtest-results.json")
+        parser.add_argument("--compare", help="Earlier results file to compare against.")
+
+    def handle(self, *args, **options):
+        scenarios = list(SCENARIOS)
+        if options["scenarios"]:
+            scenarios = [name.strip() for name in options["scenarios"].split(",")]
+            unknown = set(scenarios) - set(SCENARIOS)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        jwks = LocalJWKS()
+        tokens = [
+            jwks.token(f"user_syn{options['seed']}_{i}", lifetime=24 * 3600, role="freelancer")
+            for i in range(options["clerk_users"])
+        ]
+        if not tokens:
+            scenarios = [name for name in scenarios if not SCENARIOS[name][1]]
+
+        if options["url"]:
+            self.run_load(options["url"].rstrip("/"), scenarios, tokens, options)
+            return
+
+        if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Automatic seeding only supports SQLite; seed your database and pass --url.")
+
+        jwks_url, jwks_server = jwks.serve(latency=options["jwks_latency_ms"] / 1000)
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ, SQLITE_NAME=os.path.join(tmp, "loadtest.sqlite3"), CLERK_JWKS_URL=jwks_url,
+                THROTTLE_ENABLED=str(options["throttle"]),
+            )
+            self.seed(env, options)
+            addr = f"127.0.0.1:{options['port']}"
+            command = options["server_command"].format(
+                python=shlex.quote(sys.executable), addr=addr, workers=options["workers"]
+            )
+            server = subprocess.Popen(
+                shlex.split(command), cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                target = f"http://{addr}"
+                self.wait_for(target, server)
+                self.run_load(target, scenarios, tokens, options)
+            finally:
+                server.terminate()
+                server.wait(10)
+                jwks_server.shutdown()
+
+    def seed(self, env, options):
+        manage = [sys.executable, "manage.py"]
+        self.stdout.write("Seeding scratch database...")
+        for command in (
+            ["migrate", "--noinput", "-v", "0"],
+            [
+                "generate_synthetic_data",
+                "--seed", str(options["seed"]),
+                "--freelancers", str(options["freelancers"]),
+                "--reviews-per-freelancer", str(options["reviews_per_freelancer"]),
+                "--transactions", str(options["transactions"]),
+                "--clerk-users", str(options["clerk_users"]),
+            ],
+        ):
+            result = subprocess.run(manage + command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f"{' '.join(command[:1])} failed:\n{result.stderr}")
+
+    def wait_for(self, target, server, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with status {server.returncode}")
+            try:
+                self.get_json(target, "/api/professions/")
+                return
+            except (OSError, http.client.HTTPException, ValueError):
+                time.sleep(0.2)
+        raise CommandError(f"Server did not answer within {timeout}s")
+
+    def get_json(self, target, path):
+        parts = urlsplit(target)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        try:
+            conn.request("GET", path, headers={"Accept": "application/json"})
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                raise ValueError(f"GET {path} returned {response.status}")
+            return json.loads(body)
+        finally:
+            conn.close()
+
+    def run_load(self, target, scenarios, tokens, options):
+        fixtures = Fixtures(
+            lambda path: self.get_json(target, path),
+            options["seed"], options["transactions"], options["clerk_users"],
+        )
+        start = time.perf_counter()
+        warmup_until = start + options["warmup"]
+        deadline = warmup_until + options["duration"]
+        workers = [
+            Worker(i, target, scenarios, fixtures, tokens, options["seed"], warmup_until, deadline, options["keepalive"])
+            for i in range(options["concurrency"])
+        ]
+        self.stdout.write(
+            f"Running {options['concurrency']} clients for {options['duration']:.0f}s "
+            f"(+{options['warmup']:.0f}s warm-up) against {target}..."
+        )
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        results = self.summarize(workers, scenarios, options["duration"])
+        results["meta"] = {
+            "target": options["url"] or "local",
+            "server_command": None if options["url"] else options["server_command"],
+            "workers": None if options["url"] else options["workers"],
+            "jwks_latency_ms": options["jwks_latency_ms"],
+            "seed": options["seed"],
+            "freelancers": options["freelancers"],
+            "concurrency": options["concurrency"],
+            "keepalive": options["keepalive"],
+            "duration_s": options["duration"],
+            "warmup_s": options["warmup"],
+            "scenarios": scenarios,
+            "git_commit": self.git_commit(),
+            "python": platform.python_version(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+        self.report(results)
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self.compare(json.load(f), results)
+        self.stdout.write(f"Results written to {options['output']}")
+
+    def summarize(self, workers, scenarios, duration):
+        results = {"scenarios": {}}
+        everything, total_errors = [], 0
+        for name in scenarios:
+            samples = [s for worker in workers for s in worker.samples[name]]
+            statuses = {}
+            for worker in workers:
+                for code, count in worker.statuses[name].items():
+                    statuses[code] = statuses.get(code, 0) + count
+            errors = sum(count for code, count in statuses.items() if not code.startswith(("2", "3")))
+            results["scenarios"][name] = {
+                "requests": len(samples),
+                "errors": errors,
+                "rps": round(rate(len(samples), duration), 1),
+                "status": statuses,
+                **latency_summary(samples),
+            }
+            everything += samples
+            total_errors += errors
+        results["overall"] = {
+            "requests": len(everything),
+            "errors": total_errors,
+            "rps": round(rate(len(everything), duration), 1),
+            **latency_summary(everything),
+        }
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<22}{'reqs':>8}{'errors':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+        rows = sorted(results["scenarios"].items()) + [("overall", results["overall"])]
+        for name, r in rows:
+            self.stdout.write(
+                f"{name:<22}{r['requests']:>8}{r['errors']:>8}{r['rps']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+            )
+
+    def compare(self, before, after):
+        def change(old, new):
+            return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+        self.stdout.write(f"\n{'scenario':<22}{'rps':>22}{'p95 ms':>24}")
+        rows = sorted(after["scenarios"].items()) + [("overall", after["overall"])]
+        for name, new in rows:
+            old = before["overall"] if name == "overall" else before.get("scenarios", {}).get(name)
+            if not old:
+                continue
+            self.stdout.write(
+                f"{name:<22}{old['rps']:>8.1f} -> {new['rps']:<7.1f}{change(old['rps'], new['rps']):>5}"
+                f"{old['p95_ms']:>10.1f} -> {new['p95_ms']:<7.1f}{change(old['p95_ms'], new['p95_ms']):>5}"
+            )
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,140 @@
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from api.sqlite import serialized_write
+from mygigs.models import Freelancer, Review, ReviewHelpful
+
+SQLITE_PRODUCTION_OPTIONS = getattr(settings, "SQLITE_PRODUCTION_OPTIONS", {})
+
+PROFILES = {
+    # Django's defaults: rollback journal, deferred transactions, 5s timeout.
+    "default": {"options": {}, "write": transaction.atomic},
+    "tuned": {"options": SQLITE_PRODUCTION_OPTIONS, "write": transaction.atomic},
+    "tuned+queue": {"options": SQLITE_PRODUCTION_OPTIONS, "write": serialized_write},
+}
+
+
+def use_database(path, options):
+    """Point the default connection of this process at ``path``."""
+    connections.close_all()
+    connections["default"].settings_dict.update(NAME=path, OPTIONS=dict(options))
+
+
+def writer(path, profile, user_ids, review_count, stop, results):
+    # A helpful vote, as ReviewViewSet.mark_helpful writes it.
+    use_database(path, profile["options"])
+    done = locked = 0
+    for i in itertools.count():
+        if time.time() >= stop:
+            break
+        # A new (review, user) pair each time, so every vote writes.
+        review_id = i % review_count + 1
+        user_id = user_ids[i // review_count % len(user_ids)]
+        try:
+            with profile["write"]():
+                helpful, created = ReviewHelpful.objects.get_or_create(review_id=review_id, user_id=user_id)
+                if created:
+                    Review.objects.filter(pk=review_id).update(helpful_count=F("helpful_count") + 1)
+            done += 1
+        except OperationalError:
+            locked += 1
+    connections.close_all()
+    results.put({"writes": done, "reads": 0, "locked": locked})
+
+
+def reader(path, profile, stop, results):
+    use_database(path, profile["options"])
+    done = locked = 0
+    while time.time() < stop:
+        try:
+            list(Review.objects.order_by("-helpful_count").values_list("id", "helpful_count")[:20])
+            done += 1
+        except OperationalError:
+            locked += 1
+    connections.close_all()
+    results.put({"writes": 0, "reads": done, "locked": locked})
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent write throughput on SQLite with Django's default "
+        "settings, the production profile (SQLITE_PRODUCTION_OPTIONS), and the "
+        "profile plus api.sqlite.serialized_write. Writers and readers are "
+        "separate processes using the ORM, like gunicorn workers. Uses a "
+        "scratch database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--reviews", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # The lock is an flock between processes; fork keeps the settings.
+        context = multiprocessing.get_context("fork")
+        original = dict(connections["default"].settings_dict)
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.sqlite3")
+            user_ids = self.create_template(template, options)
+            for name, profile in PROFILES.items():
+                path = os.path.join(tmp, f"{name}.sqlite3")
+                shutil.copy(template, path)
+                result = self.run_profile(context, path, profile, user_ids, options)
+                self.stdout.write(
+                    f"{name:12} {result['writes'] / options['seconds']:8.0f} writes/s "
+                    f"{result['reads'] / options['seconds']:8.0f} reads/s "
+                    f"{result['locked']:6d} 'database is locked' errors"
+                )
+        connections.close_all()
+        connections["default"].settings_dict.update(original)
+
+    def create_template(self, path, options):
+        use_database(path, {})
+        call_command("migrate", verbosity=0, interactive=False)
+        freelancer = Freelancer.objects.create(name="Bench", county="Nairobi")
+        client = User.objects.create(username="bench-client")
+        Review.objects.bulk_create(
+            Review(freelancer=freelancer, client=client, client_name="Client", client_avatar="CL",
+                   rating=5, content="x" * 200)
+            for _ in range(options["reviews"])
+        )
+        users = User.objects.bulk_create(User(username=f"bench-{i}") for i in range(options["writers"] * 50))
+        user_ids = [user.pk for user in users]
+        connections.close_all()
+        return user_ids
+
+    def run_profile(self, context, path, profile, user_ids, options):
+        stop = time.time() + options["seconds"]
+        results = context.Queue()
+        share = len(user_ids) // options["writers"]
+        processes = [
+            context.Process(target=writer, args=(
+                path, profile, user_ids[i * share:(i + 1) * share], options["reviews"], stop, results,
+            ))
+            for i in range(options["writers"])
+        ]
+        processes += [
+            context.Process(target=reader, args=(path, profile, stop, results))
+            for _ in range(options["readers"])
+        ]
+        for process in processes:
+            process.start()
+        counts = {"writes": 0, "reads": 0, "locked": 0}
+        for _ in processes:
+            for key, value in results.get().items():
+                counts[key] += value
+        for process in processes:
+            process.join()
+        return counts
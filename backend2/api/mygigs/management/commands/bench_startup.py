@@ -0,0 +1,112 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: what a new worker does before it can serve.
+BOOT_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api.settings")
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+booted = time.perf_counter()
+first_request = None
+path = sys.argv[1]
+if path:
+    from django.test import RequestFactory
+    request = RequestFactory().get(path)
+    environ = dict(request.environ, SERVER_NAME="localhost", HTTP_HOST="localhost")
+    status = []
+    body = application(environ, lambda s, h, e=None: status.append(s))
+    b"".join(body)
+    first_request = (time.perf_counter() - booted) * 1000
+    if not status[0].startswith(("2", "3")):
+        print(f"{path} returned {status[0]}", file=sys.stderr)
+print(json.dumps({
+    "boot_ms": (booted - start) * 1000,
+    "first_request_ms": first_request,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start: a fresh interpreter importing settings, "
+        "the WSGI app and the URLconf (and optionally serving one request). "
+        "Fails when the median exceeds STARTUP_BUDGET_MS or when a module in "
+        "STARTUP_LAZY_MODULES was imported at boot. --profile lists the "
+        "slowest imports (python -X importtime)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--budget-ms", type=float, default=settings.STARTUP_BUDGET_MS)
+        parser.add_argument("--first-request", default="", metavar="PATH",
+                            help="Also time one request to PATH, e.g. /api/professions/.")
+        parser.add_argument("--profile", action="store_true")
+        parser.add_argument("--top", type=int, default=15)
+
+    def handle(self, *args, **options):
+        runs = [self.boot(options["first_request"]) for _ in range(options["runs"])]
+        process_ms = statistics.median(run["process_ms"] for run in runs)
+        boot_ms = statistics.median(run["boot_ms"] for run in runs)
+        self.stdout.write(f"cold start (process): median {process_ms:.0f}ms over {len(runs)} runs")
+        self.stdout.write(f"django boot (settings, apps, URLconf): median {boot_ms:.0f}ms")
+        if options["first_request"]:
+            first = statistics.median(run["first_request_ms"] for run in runs)
+            self.stdout.write(f"first request to {options['first_request']}: median {first:.0f}ms")
+
+        if options["profile"]:
+            self.profile(options["top"])
+
+        problems = []
+        eager = sorted(
+            name for name in settings.STARTUP_LAZY_MODULES
+            if any(module == name or module.startswith(name + ".") for module in runs[0]["modules"])
+        )
+        if eager:
+            problems.append(f"imported at boot but should be lazy: {', '.join(eager)}")
+        if process_ms > options["budget_ms"]:
+            problems.append(f"cold start {process_ms:.0f}ms is over the {options['budget_ms']:.0f}ms budget")
+        if problems:
+            raise CommandError("; ".join(problems))
+        self.stdout.write(self.style.SUCCESS(f"Within the {options['budget_ms']:.0f}ms budget"))
+
+    def boot(self, path, extra_args=()):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="")
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *extra_args, "-c", BOOT_SCRIPT, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.returncode:
+            raise CommandError(f"Boot failed:\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        data["process_ms"] = elapsed
+        data["stderr"] = result.stderr
+        return data
+
+    def profile(self, top):
+        """Cumulative import time of the top-level imports, slowest first."""
+        stderr = self.boot("", extra_args=("-X", "importtime"))["stderr"]
+        rows = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # One space, then two more per nesting level.
+            if len(name) - len(name.lstrip()) == 1:
+                rows.append((int(cumulative), name.strip()))
+        self.stdout.write("\nslowest top-level imports:")
+        for cumulative, name in sorted(rows, reverse=True)[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f}ms  {name}")
@@ -0,0 +1,44 @@
+from concurrent.futures import Future, wait
+
+from django.core.management.base import BaseCommand
+
+from mygigs import derivatives
+from mygigs.models import DocumentBlob, Profession
+
+
+class Command(BaseCommand):
+    help = (
+        "Render missing profession image variants and document previews "
+        "(for files uploaded before the pipeline existed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skip-professions", action="store_true")
+        parser.add_argument("--skip-documents", action="store_true")
+
+    def handle(self, *args, **options):
+        jobs = []
+        unreadable = 0
+        if not options["skip_professions"]:
+            for profession in Profession.objects.exclude(image="").exclude(image=None):
+                try:
+                    sha256 = derivatives.storage_sha256(profession.image.name)
+                except OSError as e:
+                    self.stderr.write(self.style.WARNING(
+                        f"Profession {profession.pk}: image {profession.image.name} could not be read: {e}"
+                    ))
+                    unreadable += 1
+                    continue
+                if sha256 != profession.image_sha256:
+                    Profession.objects.filter(pk=profession.pk).update(image_sha256=sha256)
+                jobs.append(derivatives.schedule_image_variants(profession.image.name, sha256))
+        if not options["skip_documents"]:
+            for blob in DocumentBlob.objects.filter(documents__isnull=False).distinct():
+                jobs.append(derivatives.schedule_preview(blob.file.name, blob.sha256))
+
+        futures = [job for job in jobs if isinstance(job, Future)]
+        wait(futures)
+        failed = unreadable + sum(1 for f in futures if f.exception() is not None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered derivatives for {len(jobs)} files ({failed} failed)."
+        ))
@@ -0,0 +1,71 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from mygigs.blobs import delete_blob
+from mygigs.models import DocumentBlob
+
+BLOB_DIR = "freelancer_documents/blobs"
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount DocumentBlob references, delete blobs nothing points at, "
+        "and remove blob files that have no DocumentBlob row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="Leave blobs and files younger than this alone (uploads in flight).",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+
+        # 1. Fix counter drift from crashes between file writes and DB updates.
+        fixed = 0
+        for blob in DocumentBlob.objects.annotate(refs=Count("documents")).iterator():
+            if blob.refs != blob.ref_count:
+                fixed += 1
+                if not dry_run:
+                    DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=blob.refs)
+
+        # 2. Unreferenced blobs.
+        orphans = DocumentBlob.objects.filter(
+            documents__isnull=True, created_at__lt=cutoff
+        )
+        deleted = 0
+        for blob in orphans.iterator():
+            deleted += 1
+            if not dry_run:
+                DocumentBlob.objects.filter(pk=blob.pk).update(ref_count=0)
+                delete_blob(blob)
+
+        # 3. Files on disk without a row.
+        known = set(DocumentBlob.objects.values_list("file", flat=True))
+        stray = 0
+        root = default_storage.path(BLOB_DIR)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, default_storage.location).replace(os.sep, "/")
+                if name in known:
+                    continue
+                mtime = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+                if mtime >= cutoff:
+                    continue
+                stray += 1
+                if not dry_run:
+                    os.remove(path)
+
+        prefix = "Would fix" if dry_run else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {fixed} ref counts, {deleted} unreferenced blobs, {stray} stray files."
+        ))
@@ -0,0 +1,418 @@
+import json
+import random
+import string
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Round
+
+from mygigs.models import (
+    Freelancer,
+    Job,
+    MpesaTransaction,
+    Profession,
+    Review,
+    ReviewHelpful,
+    ReviewReply,
+    Testimonial,
+    name_initials,
+)
+from users.models import ClerkProfile
+
+DEFAULT_LOCATIONS = settings.BASE_DIR.parent.parent / "frontend" / "src" / "data" / "kenya-complete-locations.json"
+EMAIL_DOMAIN = "synthetic.mygigs.test"
+
+PROFESSIONS = {
+    "Plumbing": ["Pipe fitting", "Leak repair", "Drain cleaning", "Water heaters", "Borehole pumps", "Bathroom installation"],
+    "Electrical": ["House wiring", "Solar installation", "Fault finding", "CCTV", "Meter connection", "Lighting"],
+    "Carpentry": ["Furniture", "Roofing", "Kitchen cabinets", "Doors & windows", "Wood finishing", "Flooring"],
+    "Masonry": ["Block work", "Plastering", "Tiling", "Foundations", "Paving", "Stone cladding"],
+    "Painting": ["Interior painting", "Exterior painting", "Spray painting", "Wallpaper", "Texture finishes"],
+    "Welding": ["Gates & grills", "Steel structures", "Arc welding", "Water tanks", "Fabrication"],
+    "Mechanics": ["Engine repair", "Diagnostics", "Brakes & suspension", "Motorbike repair", "Servicing"],
+    "Tailoring": ["Alterations", "Suits", "Kitenge designs", "School uniforms", "Curtains"],
+    "Hairdressing": ["Braiding", "Locs", "Barbering", "Weaves", "Bridal styling"],
+    "Cleaning": ["House cleaning", "Carpet cleaning", "Office cleaning", "Fumigation", "Post-construction cleaning"],
+    "Web Development": ["React", "Django", "WordPress", "E-commerce", "M-Pesa integration", "SEO"],
+    "Graphic Design": ["Logos", "Branding", "Posters", "Social media design", "Illustration"],
+    "Photography": ["Weddings", "Events", "Product photography", "Portraits", "Video editing"],
+    "Tutoring": ["Mathematics", "English", "Kiswahili", "Sciences", "KCSE revision", "Computer lessons"],
+    "Catering": ["Events catering", "Baking", "Nyama choma", "Meal prep", "Cakes"],
+    "Gardening": ["Landscaping", "Lawn care", "Tree pruning", "Irrigation", "Hedges"],
+    "Driving": ["Chauffeur", "Deliveries", "Matatu", "Truck driving", "Airport transfers"],
+    "Accounting": ["Bookkeeping", "KRA returns", "Payroll", "Audits", "QuickBooks"],
+}
+
+FIRST_NAMES = [
+    "Wanjiku", "Kamau", "Otieno", "Achieng", "Mwangi", "Njeri", "Kipchoge", "Chebet", "Omondi", "Akinyi",
+    "Mutua", "Mwende", "Kiprono", "Jepkosgei", "Wafula", "Nafula", "Odhiambo", "Atieno", "Karanja", "Wairimu",
+    "Barasa", "Nekesa", "Mohamed", "Amina", "Hassan", "Fatuma", "Kimani", "Nyambura", "Ochieng", "Adhiambo",
+    "Kibet", "Cherono", "Musyoka", "Mueni", "Njoroge", "Waithera", "Onyango", "Awino", "Ruto", "Jeptoo",
+    "Brian", "Faith", "Kevin", "Mercy", "Dennis", "Grace", "Collins", "Esther", "Victor", "Sharon",
+]
+LAST_NAMES = [
+    "Kamau", "Otieno", "Mwangi", "Ochieng", "Wanjala", "Kiprotich", "Mutiso", "Njoroge", "Odhiambo", "Kariuki",
+    "Wekesa", "Chege", "Omondi", "Koech", "Ndungu", "Onyango", "Kilonzo", "Gitau", "Simiyu", "Langat",
+    "Maina", "Owino", "Rotich", "Mugo", "Nyongesa", "Kiptoo", "Wambua", "Macharia", "Okoth", "Cheruiyot",
+]
+COMPANIES = [
+    "Acacia Builders", "Savanna Tech", "Rift Valley Motors", "Lakeside Homes", "Kilimani Interiors",
+    "Coastline Events", "Highland Farms", "Mombasa Logistics", "Nairobi Digital", "Umoja Hardware",
+    "Jua Kali Works", "Baraka Hotels", "Sunrise Academy", "Tsavo Transporters", "Green Valley Estates",
+]
+REVIEW_PHRASES = {
+    5: ["Excellent work, highly recommended.", "Very professional and finished on time.", "Best in the area, will hire again."],
+    4: ["Good job overall.", "Solid work, small delays.", "Reliable and fair pricing."],
+    3: ["Okay work but took longer than agreed.", "Average, had to follow up a few times."],
+    2: ["Not satisfied with the finish.", "Came late and left a mess."],
+    1: ["Did not complete the job.", "Would not recommend."],
+}
+REPLY_PHRASES = ["Thank you for the feedback!", "Asante sana, glad to help.", "Sorry about the delay, we'll do better."]
+RATING_WEIGHTS = {5: 45, 4: 30, 3: 13, 2: 7, 1: 5}
+AVAILABILITY = ["available"] * 6 + ["busy"] * 3 + ["unavailable"]
+JOB_TYPES = [choice for choice, _ in Job.JOB_TYPES]
+RESULT_CODES = [("0", "The service request is processed successfully.")] * 17 + [
+    ("1032", "Request cancelled by user."),
+    ("1037", "DS timeout user cannot be reached."),
+    ("1", "The balance is insufficient for the transaction."),
+]
+
+TIMESTAMPED_MODELS = (Freelancer, Review, ReviewReply, ReviewHelpful, Job, Testimonial, MpesaTransaction)
+
+
+@contextmanager
+def explicit_timestamps(models):
+    """Let bulk_create keep the generated created_at/updated_at values
+    instead of overwriting them with now()."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def initials(name):
+    return "".join(part[0] for part in name.split()[:2]).upper()
+
+
+def load_locations(path):
+    """Flatten the county > constituency > ward tree into weighted choices;
+    counties with more wards get proportionally more freelancers."""
+    try:
+        with open(path) as f:
+            counties = json.load(f)
+    except OSError as e:
+        raise CommandError(f"Cannot read locations file {path}: {e}")
+    wards = []
+    for county in counties:
+        for constituency in county.get("constituencies", []):
+            for ward in constituency.get("wards", []) or [""]:
+                wards.append((county["name"], county.get("code"), constituency["name"], ward))
+    if not wards:
+        raise CommandError(f"No wards found in {path}")
+    return wards
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with realistic synthetic data for load testing: "
+        "professions, freelancers across real Kenyan wards, client users, "
+        "reviews with replies and helpful votes, jobs, testimonials and M-Pesa "
+        "transactions. Output is identical for the same --seed. Use a "
+        "scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--freelancers", type=int, default=1000)
+        parser.add_argument("--clients", type=int, default=500)
+        parser.add_argument("--reviews-per-freelancer", type=float, default=20.0,
+                            help="Mean reviews per freelancer (long-tailed).")
+        parser.add_argument("--reply-rate", type=float, default=0.3)
+        parser.add_argument("--jobs", type=int, default=200)
+        parser.add_argument("--testimonials", type=int, default=50)
+        parser.add_argument("--transactions", type=int, default=1000)
+        parser.add_argument("--clerk-users", type=int, default=0,
+                            help="Give this many freelancers a Clerk login (clerk_id user_syn<seed>_<n>).")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--locations", default=str(DEFAULT_LOCATIONS))
+        parser.add_argument("--anchor", default="2025-12-01",
+                            help="Latest timestamp generated (YYYY-MM-DD); data spans the two years before it.")
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError("This database backend does not return ids from bulk inserts.")
+
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        self.anchor = datetime.strptime(options["anchor"], "%Y-%m-%d").replace(tzinfo=dt_timezone.utc)
+        self.wards = load_locations(options["locations"])
+        if Freelancer.objects.filter(email=self.freelancer_email(0)).exists():
+            raise CommandError(f"Data for seed {self.seed} already exists; use another --seed or a fresh database.")
+
+        started = time.perf_counter()
+        with explicit_timestamps(TIMESTAMPED_MODELS):
+            professions = self.step("professions", self.create_professions)
+            clients = self.step("clients", self.create_clients, options["clients"])
+            freelancers = self.step("freelancers", self.create_freelancers, options["freelancers"], professions)
+            self.step(
+                "reviews", self.create_reviews, freelancers, clients,
+                options["reviews_per_freelancer"], options["reply_rate"],
+            )
+            self.step("freelancer stats", self.update_stats, freelancers)
+            self.step("jobs", self.create_jobs, options["jobs"], professions)
+            self.step("testimonials", self.create_testimonials, options["testimonials"], clients)
+            self.step("transactions", self.create_transactions, options["transactions"])
+            self.step("clerk users", self.create_clerk_users, freelancers[:options["clerk_users"]])
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s"))
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        count = result if isinstance(result, int) else len(result)
+        self.stdout.write(f"{label}: {count} in {time.perf_counter() - started:.1f}s")
+        return result
+
+    def rng(self, name):
+        """An independent, seeded stream per step, so changing one step's
+        size does not reshuffle the data of the others."""
+        return random.Random(f"{self.seed}:{name}")
+
+    def timestamp(self, rng, after=None):
+        start = after or self.anchor - timedelta(days=730)
+        span = max((self.anchor - start).total_seconds(), 1)
+        return start + timedelta(seconds=rng.random() * span)
+
+    def freelancer_email(self, i):
+        return f"freelancer-{self.seed}-{i}@{EMAIL_DOMAIN}"
+
+    def insert(self, model, objs):
+        """bulk_create in batches and return the objects with their ids."""
+        created = []
+        for start in range(0, len(objs), self.batch_size):
+            with transaction.atomic():
+                created += model.objects.bulk_create(objs[start:start + self.batch_size])
+        return created
+
+    def create_professions(self):
+        existing = {p.name: p for p in Profession.objects.filter(name__in=PROFESSIONS)}
+        missing = [
+            Profession(
+                name=name,
+                slug=name.lower().replace(" ", "-"),
+                description=f"{name} services: {', '.join(skills[:3]).lower()} and more.",
+            )
+            for name, skills in PROFESSIONS.items()
+            if name not in existing
+        ]
+        Profession.objects.bulk_create(missing)
+        existing.update((p.name, p) for p in Profession.objects.filter(name__in=PROFESSIONS))
+        return [existing[name] for name in PROFESSIONS]
+
+    def create_clients(self, count):
+        rng = self.rng("clients")
+        users = []
+        for i in range(count):
+            users.append(User(
+                username=f"synthetic-{self.seed}-client-{i}",
+                email=f"client-{self.seed}-{i}@{EMAIL_DOMAIN}",
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password="!",
+                date_joined=self.timestamp(rng),
+            ))
+        return self.insert(User, users)
+
+    def create_freelancers(self, count, professions):
+        rng = self.rng("freelancers")
+        freelancers = []
+        for i in range(count):
+            profession = rng.choice(professions)
+            county, county_code, constituency, ward = rng.choice(self.wards)
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            years = min(int(rng.expovariate(1 / 6)), 40)
+            created_at = self.timestamp(rng)
+            freelancers.append(Freelancer(
+                profession=profession,
+                name=name,
+                email=self.freelancer_email(i),
+                phone=f"+2547{rng.randrange(10 ** 8):08d}",
+                avatar=initials(name),
+                avatar_initials=name_initials(name),
+                bio=f"{profession.name} professional based in {ward or constituency}, {county} "
+                    f"with {years} years of experience.",
+                county=county,
+                county_code=county_code,
+                constituency=constituency,
+                ward=ward,
+                hourly_rate=Decimal(rng.randrange(300, 5000, 50)),
+                years_experience=years,
+                skills=rng.sample(PROFESSIONS[profession.name], rng.randint(2, min(5, len(PROFESSIONS[profession.name])))),
+                completed_jobs=int(rng.expovariate(1 / 25)),
+                is_active=rng.random() < 0.95,
+                is_featured=rng.random() < 0.03,
+                availability=rng.choice(AVAILABILITY),
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+        return self.insert(Freelancer, freelancers)
+
+    def create_reviews(self, freelancers, clients, mean_reviews, reply_rate):
+        """Stream reviews in batches; each batch's replies and helpful votes
+        are created right after it so memory stays flat."""
+        if not clients:
+            return 0
+        rng = self.rng("reviews")
+        ratings, weights = zip(*RATING_WEIGHTS.items())
+        total = 0
+        batch = []
+
+        def flush():
+            nonlocal total
+            with transaction.atomic():
+                reviews = Review.objects.bulk_create(batch)
+                replies, votes = [], []
+                for review in reviews:
+                    if rng.random() < reply_rate:
+                        replies.append(ReviewReply(
+                            review_id=review.pk,
+                            content=rng.choice(REPLY_PHRASES),
+                            created_at=self.timestamp(rng, review.created_at),
+                        ))
+                    for voter in rng.sample(clients, min(review.helpful_count, len(clients))):
+                        votes.append(ReviewHelpful(
+                            review_id=review.pk, user_id=voter.pk, created_at=self.timestamp(rng, review.created_at),
+                        ))
+                ReviewReply.objects.bulk_create(replies, batch_size=self.batch_size)
+                ReviewHelpful.objects.bulk_create(votes, batch_size=self.batch_size)
+            total += len(batch)
+            batch.clear()
+
+        for freelancer in freelancers:
+            for _ in range(int(rng.expovariate(1 / mean_reviews)) if mean_reviews > 0 else 0):
+                client = rng.choice(clients)
+                rating = rng.choices(ratings, weights)[0]
+                name = f"{client.first_name} {client.last_name}"
+                batch.append(Review(
+                    freelancer_id=freelancer.pk,
+                    client_id=client.pk,
+                    client_name=name,
+                    client_avatar=initials(name),
+                    rating=rating,
+                    content=rng.choice(REVIEW_PHRASES[rating]),
+                    helpful_count=min(int(rng.expovariate(1.2)), 8),
+                    created_at=self.timestamp(rng, freelancer.created_at),
+                ))
+                if len(batch) >= self.batch_size:
+                    flush()
+        if batch:
+            flush()
+        return total
+
+    def update_stats(self, freelancers):
+        """Set the denormalized rating/review_count from the reviews, in one
+        UPDATE over the id range this run inserted (ids are contiguous since
+        the freelancers were inserted back to back)."""
+        reviews = Review.objects.filter(freelancer=OuterRef("pk")).values("freelancer")
+        return Freelancer.objects.filter(
+            pk__gte=freelancers[0].pk, pk__lte=freelancers[-1].pk,
+        ).update(
+            review_count=Coalesce(Subquery(reviews.annotate(n=Count("id")).values("n")), 0),
+            rating=Coalesce(Subquery(reviews.annotate(avg=Round(Avg("rating"), 2)).values("avg")), 0.0),
+        ) if freelancers else 0
+
+    def create_jobs(self, count, professions):
+        rng = self.rng("jobs")
+        jobs = []
+        for i in range(count):
+            profession = rng.choice(professions)
+            county, _, constituency, ward = rng.choice(self.wards)
+            low = rng.randrange(5, 200) * 1000
+            jobs.append(Job(
+                title=f"{rng.choice(PROFESSIONS[profession.name])} ({profession.name})",
+                company=rng.choice(COMPANIES),
+                location=f"{ward or constituency}, {county}",
+                type=rng.choice(JOB_TYPES),
+                budget=f"KSh {low:,} - {low * 2:,}",
+                skills=rng.sample(PROFESSIONS[profession.name], 2),
+                is_featured=rng.random() < 0.1,
+                created_at=self.timestamp(rng, self.anchor - timedelta(days=60)),
+            ))
+        return self.insert(Job, jobs)
+
+    def create_testimonials(self, count, clients):
+        rng = self.rng("testimonials")
+        testimonials = []
+        for client in rng.sample(clients, min(count, len(clients))):
+            rating = rng.choices([5, 4, 3], [70, 25, 5])[0]
+            name = f"{client.first_name} {client.last_name}"
+            testimonials.append(Testimonial(
+                user=client,
+                name=name,
+                content=rng.choice(REVIEW_PHRASES[rating]),
+                rating=rating,
+                avatar=initials(name),
+                is_approved=rng.random() < 0.8,
+                created_at=self.timestamp(rng, client.date_joined),
+            ))
+        return self.insert(Testimonial, testimonials)
+
+    def create_transactions(self, count):
+        rng = self.rng("transactions")
+        transactions = []
+        for i in range(count):
+            result_code, result_desc = rng.choice(RESULT_CODES)
+            created_at = self.timestamp(rng)
+            paid = result_code == "0"
+            transactions.append(MpesaTransaction(
+                merchant_request_id=f"SYN{self.seed}-{i}",
+                checkout_request_id=f"ws_CO_SYN{self.seed}_{i}",
+                phone_number=f"2547{rng.randrange(10 ** 8):08d}",
+                amount=Decimal(rng.choice([100, 250, 500, 1000, 1500, 2000])),
+                result_code=result_code,
+                result_desc=result_desc,
+                mpesa_receipt_number="".join(rng.choices(string.ascii_uppercase + string.digits, k=10)) if paid else None,
+                transaction_date=created_at + timedelta(seconds=rng.randint(5, 60)) if paid else None,
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+        return self.insert(MpesaTransaction, transactions)
+
+    def create_clerk_users(self, freelancers):
+        """Users and ClerkProfiles for freelancers, so authenticated
+        endpoints can be exercised with locally signed tokens."""
+        users = self.insert(User, [
+            User(
+                username=f"user_{self.clerk_id(i)}",
+                email=freelancer.email,
+                first_name=freelancer.name.split()[0],
+                last_name=freelancer.name.split()[-1],
+                password="!",
+                date_joined=freelancer.created_at,
+            )
+            for i, freelancer in enumerate(freelancers)
+        ])
+        self.insert(ClerkProfile, [
+            ClerkProfile(user=user, clerk_id=self.clerk_id(i), role="freelancer")
+            for i, user in enumerate(users)
+        ])
+        for freelancer, user in zip(freelancers, users):
+            freelancer.user = user
+        Freelancer.objects.bulk_update(freelancers, ["user"], batch_size=self.batch_size)
+        return len(users)
+
+    def clerk_id(self, i):
+        return f"user_syn{self.seed}_{i}"
@@ -0,0 +1,181 @@
+"""
+Serving media files without pushing them through Python.
+
+``serve_file`` checks nothing itself: callers do the permission checks and
+then hand the file to the front server when ``MEDIA_SENDFILE_BACKEND`` is
+set:
+
+* ``"nginx"``: ``X-Accel-Redirect: <MEDIA_ACCEL_PREFIX><name>``, with an
+  internal location such as::
+
+      location /protected-media/ {
+          internal;
+          alias /srv/mygigs/media/;
+      }
+
+* ``"apache"``: ``X-Sendfile: <absolute path>`` (mod_xsendfile).
+
+Without a front server the file is returned as a FileResponse, which WSGI
+servers with ``wsgi.file_wrapper`` (gunicorn, uWSGI) send with
+``os.sendfile``. Single-range ``Range`` requests and ``If-None-Match`` /
+``If-Modified-Since`` / ``If-Range`` are handled here in that case.
+"""
+import io
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Media directories anyone may read; everything else needs a protected view.
+PUBLIC_MEDIA_PREFIXES = ("professions/", "avatars/", "freelancers/", "derivatives/images/")
+
+
+class FileRange(io.RawIOBase):
+    """
+    A window onto ``[start, start + length)`` of an open file.
+
+    ``fileno()`` is the real descriptor and its position is kept in step
+    with ours, so servers that sendfile() from the current offset for
+    Content-Length bytes send exactly the range; everything else reads it
+    through ``read()``.
+    """
+
+    def __init__(self, f, start, length):
+        self._f = f
+        self._start = start
+        self._length = length
+        self._pos = 0
+        f.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._length
+        self._pos = max(0, min(offset, self._length))
+        self._f.seek(self._start + self._pos)
+        return self._pos
+
+    def read(self, size=-1):
+        remaining = self._length - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self._f.read(size)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def _parse_range(header, size):
+    """Return ``(start, end)`` for a satisfiable single byte range, None to
+    ignore the header, or False when it cannot be satisfied."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        start, end = max(size - suffix, 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def serve_file(request, name, as_attachment=False, filename=None):
+    """Send the stored file ``name`` (a storage-relative path)."""
+    path = default_storage.path(name)
+    content_type = mimetypes.guess_type(filename or name)[0] or "application/octet-stream"
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", None)
+
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == "nginx":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + name
+        else:
+            response["X-Sendfile"] = path
+        if as_attachment:
+            response["Content-Disposition"] = f'attachment; filename="{filename or os.path.basename(name)}"'
+        return response
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+
+    etag = quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.method in ("GET", "HEAD"):
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = _parse_range(range_header, stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    f = open(path, "rb")
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(f, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+            as_attachment=as_attachment,
+            filename=filename or os.path.basename(name),
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        response = FileResponse(
+            f,
+            content_type=content_type,
+            as_attachment=as_attachment,
+            filename=filename or os.path.basename(name),
+        )
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def serve_public_media(request, path):
+    """Serve files from the public media directories (profession images,
+    avatars). Documents are only available through their protected view."""
+    path = os.path.normpath(path).replace(os.sep, "/")
+    if path.startswith("..") or not path.startswith(PUBLIC_MEDIA_PREFIXES):
+        raise Http404("File not found")
+    return serve_file(request, path)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygigs', '0012_alter_freelancer_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('received', models.BigIntegerField(default=0)),
+                ('document_type', models.CharField(choices=[('id', 'National ID'), ('certificate', 'Certificate'), ('portfolio', 'Portfolio'), ('other', 'Other')], default='other', max_length=20)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('freelancer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='mygigs.freelancer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygigs', '0014_documentblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profession',
+            name='image_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+def name_initials(name):
+    # mygigs.models.name_initials as of this migration.
+    parts = name.split()
+    if len(parts) >= 2:
+        return f"{parts[0][0]}{parts[1][0]}".upper()
+    return name[:2].upper()
+
+
+def backfill_avatar_initials(apps, schema_editor):
+    Freelancer = apps.get_model('mygigs', 'Freelancer')
+    freelancers = Freelancer.objects.only('id', 'name').order_by('id')
+    batch = []
+    for freelancer in freelancers.iterator(chunk_size=2000):
+        freelancer.avatar_initials = name_initials(freelancer.name)
+        batch.append(freelancer)
+        if len(batch) == 2000:
+            Freelancer.objects.bulk_update(batch, ['avatar_initials'])
+            batch = []
+    Freelancer.objects.bulk_update(batch, ['avatar_initials'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mygigs', '0015_profession_image_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='freelancer',
+            name='avatar_initials',
+            field=models.CharField(blank=True, editable=False, max_length=8),
+        ),
+        migrations.RunPython(backfill_avatar_initials, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from time import timezone
+import os
+import uuid
 from django.db import models
 from django.contrib.auth.models import User   
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -57,6 +59,7 @@ class Profession(models.Model):
      slug = models.SlugField(unique=True, null=True)
      description = models.TextField(blank=True)
      image = models.ImageField(upload_to='professions/', blank=True, null=True)
+     image_sha256 = models.CharField(max_length=64, blank=True, editable=False)
      is_active = models.BooleanField(default=True)
      created_at = models.DateTimeField(auto_now_add=True)
      
@@ -65,15 +68,38 @@ class Profession(models.Model):
      
      def __str__(self):
          return self.name
+
+     @classmethod
+     def from_db(cls, db, field_names, values):
+         instance = super().from_db(db, field_names, values)
+         # The image as loaded, so saves that keep it are not rehashed
+         # (signals.render_profession_image).
+         if 'image' in field_names:
+             instance.loaded_image = values[field_names.index('image')] or ''
+         return instance
      
      @property
      def freelancer_count(self):
          return self.freelancers.filter(is_active=True).count()
      
      def image_tag(self):
-        return mark_safe('<img src="%s" width="80" />'% (self.image.url))
+        from .derivatives import exists, image_variant_name
+        url = self.image.url
+        if self.image_sha256:
+            thumb = image_variant_name(self.image_sha256, 160, "webp")
+            if exists(thumb):
+                url = settings.MEDIA_URL + thumb
+        return mark_safe('<img src="%s" width="80" />'% (url))
         
 
+def name_initials(name):
+    """Up to two letters for a freelancer's avatar placeholder."""
+    parts = name.split()
+    if len(parts) >= 2:
+        return f"{parts[0][0]}{parts[1][0]}".upper()
+    return name[:2].upper()
+
+
 class Freelancer(models.Model):
      """Freelancer profile with all details"""
      user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='freelancer_profile', null=True)
@@ -85,6 +111,9 @@ class Freelancer(models.Model):
      phone = models.CharField(max_length=20, blank=True)
     #  avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
      avatar= models.CharField(max_length=5, blank=True, null=True)
+     # name_initials(name), kept by save() so lists need not compute it.
+     # Upper-casing can lengthen a letter ("ß" -> "SS"), hence the room.
+     avatar_initials = models.CharField(max_length=8, blank=True, editable=False)
      bio = models.TextField(blank=True)
      
      # Location - hierarchical (County > Constituency > Ward)
@@ -122,6 +151,13 @@ class Freelancer(models.Model):
      
      def __str__(self):
          return f"{self.name} - {self.profession.name if self.profession else 'No Profession'}"
+
+     def save(self, *args, **kwargs):
+         self.avatar_initials = name_initials(self.name)
+         update_fields = kwargs.get("update_fields")
+         if update_fields is not None and "name" in update_fields:
+             kwargs["update_fields"] = {*update_fields, "avatar_initials"}
+         super().save(*args, **kwargs)
     #  def image_tag(self):
     #     return mark_safe('<img src="%s" width="80" />'% (self.avatar.url))
  
@@ -229,6 +265,27 @@ class MpesaTransaction(models.Model):
         return f"Transaction {self.mpesa_receipt_number or self.merchant_request_id}" 
 
 
+def blob_upload_to(instance, filename):
+    return instance.storage_name(filename)
+
+
+class DocumentBlob(models.Model):
+    """A stored document file, shared by every FreelancerDocument with the
+    same content. ``ref_count`` tracks how many documents point at it."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_upload_to)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def storage_name(self, filename=""):
+        ext = os.path.splitext(filename)[1].lower()
+        return f"freelancer_documents/blobs/{self.sha256[:2]}/{self.sha256}{ext}"
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} refs)"
+
+
 class FreelancerDocument(models.Model):
     DOCUMENT_TYPES = (
         ("id", "National ID"),
@@ -243,6 +300,13 @@ class FreelancerDocument(models.Model):
         related_name="documents"
     )
     file = models.FileField(upload_to="freelancer_documents/")
+    blob = models.ForeignKey(
+        DocumentBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="documents"
+    )
     document_type = models.CharField(
         max_length=20,
         choices=DOCUMENT_TYPES,
@@ -255,3 +319,37 @@ class FreelancerDocument(models.Model):
 
     def __str__(self):
         return f"{self.freelancer.name} - {self.document_type}"
+
+
+class DocumentUpload(models.Model):
+    """A resumable, chunked FreelancerDocument upload that is still in progress.
+
+    Chunks are written to ``part_name`` in media storage as they arrive; ``received`` is the
+    number of bytes stored so far. On completion the file is checked against
+    ``checksum`` (hex SHA-256) and turned into a FreelancerDocument.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    freelancer = models.ForeignKey(
+        "Freelancer",
+        on_delete=models.CASCADE,
+        related_name="uploads"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64)
+    received = models.BigIntegerField(default=0)
+    document_type = models.CharField(
+        max_length=20,
+        choices=FreelancerDocument.DOCUMENT_TYPES,
+        default="other"
+    )
+    title = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_name(self):
+        return f"uploads/{self.id}.part"
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
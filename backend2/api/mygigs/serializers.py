@@ -1,20 +1,29 @@
 
 
+from django.db import models
+from django.db.models import F
 from rest_framework import serializers
-from .models import Freelancer, Job, Profession, Review, ReviewReply, Testimonial,MpesaTransaction, FreelancerDocument
+from api.fieldsets import SparseFieldsetMixin
+from .models import Freelancer, Job, Profession, Review, ReviewReply, Testimonial,MpesaTransaction, FreelancerDocument, DocumentUpload
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.urls import reverse
 from users.models import ClerkProfile
+from .derivatives import exists as derivative_exists, image_variant_urls, preview_name
 
 class ProfessionSerializer(serializers.ModelSerializer):
     count = serializers.SerializerMethodField()
     imageUrl = serializers.SerializerMethodField()
+    imageVariants = serializers.SerializerMethodField()
     
     class Meta:
         model = Profession
-        fields = ['id', 'name', 'description', 'imageUrl', 'count']
+        fields = ['id', 'name', 'description', 'imageUrl', 'imageVariants', 'count']
     
     def get_count(self, obj):
+        # ProfessionViewSet annotates the count; nested uses fall back to a query.
+        if hasattr(obj, 'active_count'):
+            return obj.active_count
         return obj.freelancers.filter(is_active=True).count()
     
     def get_imageUrl(self, obj):
@@ -23,6 +32,16 @@ class ProfessionSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_imageVariants(self, obj):
+        """Resized WebP/JPEG copies by width, once they have been rendered."""
+        if not obj.image or not obj.image_sha256:
+            return {}
+        request = self.context.get('request')
+        return {
+            fmt: {width: request.build_absolute_uri(url) if request else url for width, url in urls.items()}
+            for fmt, urls in image_variant_urls(obj.image_sha256).items()
+        }
+
 class FreelancerCreateSerializer(serializers.ModelSerializer):
     profession = serializers.PrimaryKeyRelatedField(
         queryset=Profession.objects.all()
@@ -65,11 +84,42 @@ class FreelancerCreateSerializer(serializers.ModelSerializer):
 
 
 class FreelancerDocumentSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+
     class Meta:
         model = FreelancerDocument
-        fields = ["id", "file", "document_type", "title","is_verified", "uploaded_at"]
+        fields = ["id", "file", "download_url", "preview_url", "document_type", "title","is_verified", "uploaded_at"]
         read_only_fields = ["id","is_verified", "uploaded_at"]
 
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_download_url(self, obj):
+        return self._absolute(reverse("freelancer-documents-download", args=[obj.pk]))
+
+    def get_preview_url(self, obj):
+        if not obj.blob_id or not derivative_exists(preview_name(obj.blob.sha256)):
+            return None
+        return self._absolute(reverse("freelancer-documents-preview", args=[obj.pk]))
+
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    """Starts a chunked upload; ``offset`` is where the next chunk goes."""
+    offset = serializers.IntegerField(source="received", read_only=True)
+    checksum = serializers.RegexField(r"^[0-9a-fA-F]{64}$", max_length=64)
+
+    class Meta:
+        model = DocumentUpload
+        fields = ["id", "filename", "size", "checksum", "document_type", "title", "offset"]
+        read_only_fields = ["id", "offset"]
+
+    def validate_size(self, value):
+        from .uploads import MAX_FILE_SIZE
+        if value <= 0 or value > MAX_FILE_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {MAX_FILE_SIZE} bytes.")
+        return value
    
 
 
@@ -82,7 +132,7 @@ class FreelancerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Freelancer
-        fields ="__all__"
+        exclude = ["avatar_initials"]
             
         read_only_fields = ["rating", "review_count", "completed_jobs", "created_at", "updated_at"]
 
@@ -107,10 +157,63 @@ class FreelancerSerializer(serializers.ModelSerializer):
         return instance
 
 
-class FreelancerListSerializer(serializers.ModelSerializer):
+class FreelancerRowsSerializer(serializers.ListSerializer):
+    """
+    FreelancerListSerializer(many=True). Given rows from
+    FreelancerListSerializer.values() it builds each item straight from its
+    row, with the same output as the fields would give; model instances
+    still go through the fields.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        names = list(self.child.fields)
+        hourly_rate = self.child.fields['hourly_rate'].to_representation if 'hourly_rate' in names else None
+        if len(names) < len(self.child.Meta.fields):
+            return self.sparse_items(rows, names, {'rating': float, 'hourly_rate': hourly_rate})
+        items = []
+        for row in rows:
+            item = {'id': row['id'], 'name': row['name']}
+            # Like the profession.name source: no profession, no key.
+            if row['profession_name'] is not None:
+                item['profession_name'] = row['profession_name']
+            item['county'] = row['county']
+            item['constituency'] = row['constituency']
+            item['ward'] = row['ward']
+            item['rating'] = float(row['rating'])
+            item['review_count'] = row['review_count']
+            item['hourly_rate'] = hourly_rate(row['hourly_rate'])
+            item['years_experience'] = row['years_experience']
+            item['completed_jobs'] = row['completed_jobs']
+            item['skills'] = row['skills']
+            item['avatar'] = row['avatar']
+            item['avatar_initials'] = row['avatar_initials']
+            item['availability'] = row['availability']
+            items.append(item)
+        return items
+
+    def sparse_items(self, rows, names, converters):
+        """The same, for ?fields= lists."""
+        items = []
+        for row in rows:
+            item = {}
+            for name in names:
+                value = row[name]
+                if name in converters:
+                    value = converters[name](value)
+                elif value is None and name == 'profession_name':
+                    continue
+                item[name] = value
+            items.append(item)
+        return items
+
+
+class FreelancerListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for listing freelancers (lightweight)"""
     profession_name = serializers.CharField(source='profession.name', read_only=True)
-    avatar_initials = serializers.SerializerMethodField()
     rating = serializers.FloatField(read_only=True)
     review_count = serializers.IntegerField(read_only=True)
     class Meta:
@@ -120,35 +223,32 @@ class FreelancerListSerializer(serializers.ModelSerializer):
             'rating', 'review_count', 'hourly_rate', 'years_experience',
             'completed_jobs', 'skills', 'avatar', 'avatar_initials', 'availability'
         ]
-    
-    def get_avatar_initials(self, obj):
-        parts = obj.name.split()
-        if len(parts) >= 2:
-            return f"{parts[0][0]}{parts[1][0]}".upper()
-        return obj.name[:2].upper()
-
-    def get_rating(self, obj):
-        """
-        Returns average rating:
-        - 0.0 if no reviews
-        - Rounded to 1 decimal
-        """
-        if obj.avg_rating is None:
-            return 0.0
-        return round(float(obj.avg_rating) or 0.0, 1)
-
-
-class FreelancerDetailSerializer(serializers.ModelSerializer):
+        list_serializer_class = FreelancerRowsSerializer
+
+    @classmethod
+    def values(cls, queryset, names=None):
+        """Only the columns the list shows (or ``names`` of them), as dicts
+        for the many=True fast path."""
+        names = cls.Meta.fields if names is None else names
+        columns = [name for name in names if name != 'profession_name']
+        if 'profession_name' not in names:
+            return queryset.values(*columns)
+        return queryset.values(*columns, profession_name=F('profession__name'))
+
+
+class FreelancerDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Full serializer for freelancer detail page"""
     profession = ProfessionSerializer(read_only=True)
     reviews = serializers.SerializerMethodField()
     
     class Meta:
         model = Freelancer
-        fields = '__all__'
+        exclude = ['avatar_initials']
+        # get_reviews runs its own query (only when reviews are shown).
+        field_sources = {'reviews': []}
     
     def get_reviews(self, obj):
-        reviews = obj.review.all().order_by('-created_at')[:5]
+        reviews = obj.review.prefetch_related('replies').order_by('-created_at')[:5]
         return ReviewSerializer(reviews, many=True).data
 
 
@@ -157,7 +257,7 @@ class ReviewReplySerializer(serializers.ModelSerializer):
         model = ReviewReply
         fields = "__all__"
         read_only_fields = ("id", "review", "created_at")
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     replies = ReviewReplySerializer(many=True, read_only=True)
     content = serializers.CharField(required=True, allow_blank=False)
     class Meta:
@@ -184,13 +284,15 @@ class ReviewSerializer(serializers.ModelSerializer):
             "created_at",
             "replies",
         )
+        expandable_fields = {"freelancer": FreelancerListSerializer}
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     posted = serializers.SerializerMethodField()
     
     class Meta:
         model = Job
         fields = '__all__'
+        field_sources = {'posted': ['created_at']}
     
     def get_posted(self, obj):
         return obj.posted_time_ago()
@@ -0,0 +1,88 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import invalidate
+
+from . import catalog_engine, derivatives
+from .blobs import release_blob
+from .models import Freelancer, FreelancerDocument, Job, Profession, Review, ReviewReply, Testimonial
+
+logger = logging.getLogger(__name__)
+
+# Response cache groups (api/cache.py) showing each model's rows.
+CACHE_GROUPS = {
+    Freelancer: "freelancers",
+    Profession: "professions",
+    Review: "reviews",
+    ReviewReply: "reviews",
+    Job: "jobs",
+    Testimonial: "testimonials",
+}
+
+
+@receiver(post_delete, sender=FreelancerDocument)
+def release_document_blob(sender, instance, **kwargs):
+    """Drop the document's blob reference once the delete is committed."""
+    if instance.blob_id:
+        transaction.on_commit(lambda: release_blob(instance.blob_id))
+
+
+@receiver(post_save, sender=Profession)
+def render_profession_image(sender, instance, update_fields=None, **kwargs):
+    """Hash a new or changed profession image and render its variants."""
+    name = instance.image.name if instance.image else ""
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if not name or name == getattr(instance, "loaded_image", None):
+        return
+    try:
+        sha256 = derivatives.storage_sha256(name)
+    except OSError:
+        logger.warning("Profession image %s could not be read", name, exc_info=True)
+        return
+    instance.loaded_image = name
+    if sha256 != instance.image_sha256:
+        Profession.objects.filter(pk=instance.pk).update(image_sha256=sha256)
+        instance.image_sha256 = sha256
+    transaction.on_commit(lambda: derivatives.schedule_image_variants(name, sha256))
+
+
+@receiver(post_save, sender=FreelancerDocument)
+def render_document_preview(sender, instance, created, **kwargs):
+    if created and instance.blob_id:
+        name, sha256 = instance.blob.file.name, instance.blob.sha256
+        transaction.on_commit(lambda: derivatives.schedule_preview(name, sha256))
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    group = CACHE_GROUPS[sender]
+    invalidate(group)
+    # Readers could refill the old generation from a replica or from
+    # before the commit; invalidating again afterwards drops that too.
+    transaction.on_commit(lambda: invalidate(group))
+
+
+for model in CACHE_GROUPS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+
+
+@receiver(post_save, sender=Freelancer)
+@receiver(post_delete, sender=Freelancer)
+def log_catalog_change(sender, instance, **kwargs):
+    """Have every worker's catalog engine re-read the freelancer."""
+    if settings.CATALOG_ENGINE:
+        pk = instance.pk
+        transaction.on_commit(lambda: catalog_engine.record_change(pk))
+
+
+@receiver(post_save, sender=Profession)
+@receiver(post_delete, sender=Profession)
+def log_catalog_reload(sender, **kwargs):
+    """Searches match profession names: reload every catalog engine."""
+    if settings.CATALOG_ENGINE:
+        transaction.on_commit(catalog_engine.record_change)
@@ -1,3 +1,1130 @@
-from django.test import TestCase
+import datetime
+import gc
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from api import sqlite as api_sqlite
+from api.cache import cache_response, cached_response, generation_key, lock_key, response_key
+from api.compression import choose_coding
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from api.routers import PRIMARY, REPLICA, reads_from_replica
+from api.sqlite import serialized, serialized_write
+from api.testing import LocalJWKS, QueryBudgetMixin
+from api.throttling import buckets
+from . import blobs, catalog_engine
+from .models import (
+    DocumentBlob, DocumentUpload, Freelancer, FreelancerDocument, Job, MpesaTransaction, Profession, Review,
+    ReviewReply, Testimonial,
+)
+from .serializers import FreelancerListSerializer
+from .views.accounts import async_me, async_whoami
+from .views.catalog import FreelancerViewSet
+from .views.payments import async_stk_push
+from .views.webhooks import async_clerk_webhook_handler
 
 # Create your tests here.
+
+
+class DocumentTestCase(TestCase):
+    """Authenticated freelancer with a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.user = User.objects.create(username="user_doc")
+        self.freelancer = Freelancer.objects.create(user=self.user, name="Doc Owner", county="Nairobi")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class ChunkedDocumentUploadTests(DocumentTestCase):
+    # Size of the chunked upload test; set CHUNKED_UPLOAD_TEST_MB (256, say)
+    # to check memory over a large upload.
+    upload_mb = int(os.environ.get("CHUNKED_UPLOAD_TEST_MB", 16))
+    chunk_size = 8 * 1024 * 1024
+
+    def chunk(self, index):
+        return bytes([index % 251]) * self.chunk_size
+
+    def initiate(self, size, checksum):
+        response = self.client.post("/api/document-uploads/", {
+            "filename": "portfolio.pdf",
+            "size": size,
+            "checksum": checksum,
+            "document_type": "portfolio",
+            "title": "Portfolio",
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data["id"]
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            f"/api/document-uploads/{upload_id}/",
+            data=data,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_large_upload_keeps_rss_bounded(self):
+        chunks = self.upload_mb * 1024 * 1024 // self.chunk_size
+        digest = hashlib.sha256()
+        for i in range(chunks):
+            digest.update(self.chunk(i))
+        size = chunks * self.chunk_size
+        upload_id = self.initiate(size, digest.hexdigest())
+
+        # The first chunk warms up the request path (and the test client's
+        # own copies of the body); memory must not grow after that.
+        offset = self.put_chunk(upload_id, 0, self.chunk(0)).data["offset"]
+        peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for i in range(1, chunks):
+            response = self.put_chunk(upload_id, offset, self.chunk(i))
+            self.assertEqual(response.status_code, 200, response.content)
+            offset = response.data["offset"]
+            # The test client keeps each request body alive in a reference
+            # cycle with its response; collect it like a real worker would.
+            del response
+            gc.collect()
+        response = self.client.post(f"/api/document-uploads/{upload_id}/complete/")
+        self.assertEqual(response.status_code, 201, response.content)
+        peak_growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_before) / 1024
+
+        document = FreelancerDocument.objects.get()
+        self.assertEqual(document.file.size, size)
+        self.assertFalse(DocumentUpload.objects.exists())
+        # Chunks are streamed to disk: memory grows by less than two of
+        # them however large the upload is.
+        self.assertLess(peak_growth_mb, 2 * self.chunk_size / 2**20)
+
+    def test_resume_after_offset_mismatch(self):
+        data = b"a" * 1000 + b"b" * 1000
+        upload_id = self.initiate(len(data), hashlib.sha256(data).hexdigest())
+
+        self.assertEqual(self.put_chunk(upload_id, 0, data[:1000]).status_code, 200)
+        response = self.put_chunk(upload_id, 0, data[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 1000)
+
+        self.assertEqual(self.client.get(f"/api/document-uploads/{upload_id}/").data["offset"], 1000)
+        self.assertEqual(self.put_chunk(upload_id, 1000, data[1000:]).status_code, 200)
+        response = self.client.post(f"/api/document-uploads/{upload_id}/complete/")
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_checksum_mismatch_is_rejected(self):
+        upload_id = self.initiate(4, "0" * 64)
+        self.put_chunk(upload_id, 0, b"data")
+        response = self.client.post(f"/api/document-uploads/{upload_id}/complete/")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FreelancerDocument.objects.exists())
+
+
+class DocumentBlobTests(DocumentTestCase):
+
+    def upload(self, content, name="id.pdf"):
+        response = self.client.post("/api/freelancer-documents/", {
+            "file": SimpleUploadedFile(name, content),
+            "document_type": "id",
+        }, format="multipart")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data["id"]
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(b"same scan")
+        second = self.upload(b"same scan", name="copy.pdf")
+        self.upload(b"other scan")
+
+        self.assertEqual(DocumentBlob.objects.count(), 2)
+        blob = FreelancerDocument.objects.get(id=first).blob
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(FreelancerDocument.objects.get(id=second).file.name, blob.file.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/freelancer-documents/{first}/")
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(os.path.exists(blob.file.path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/freelancer-documents/{second}/")
+        self.assertFalse(DocumentBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(os.path.exists(blob.file.path))
+
+    def test_delete_rechecks_references(self):
+        blob = FreelancerDocument.objects.get(id=self.upload(b"scan")).blob
+        # A release that read ref_count 0 before an upload took a reference.
+        stale = DocumentBlob.objects.get(pk=blob.pk)
+        stale.ref_count = 0
+        FreelancerDocument.objects.all().delete()
+        blobs.delete_blob(stale)
+        self.assertTrue(DocumentBlob.objects.filter(pk=blob.pk).exists())
+        self.assertTrue(os.path.exists(blob.file.path))
+
+    def test_missing_files_are_stored_again(self):
+        blob = FreelancerDocument.objects.get(id=self.upload(b"scan")).blob
+        os.remove(blob.file.path)
+        document = FreelancerDocument.objects.get(id=self.upload(b"scan"))
+        self.assertEqual(document.blob, blob)
+        self.assertEqual(document.blob.ref_count, 2)
+        with document.file.open("rb") as f:
+            self.assertEqual(f.read(), b"scan")
+
+    def test_stray_file_is_not_reused(self):
+        # A file left behind by a blob row that is gone.
+        sha256 = hashlib.sha256(b"scan").hexdigest()
+        stray = os.path.join(self.media_root, DocumentBlob(sha256=sha256).storage_name("id.pdf"))
+        os.makedirs(os.path.dirname(stray))
+        with open(stray, "wb") as f:
+            f.write(b"stale")
+        document = FreelancerDocument.objects.get(id=self.upload(b"scan"))
+        self.assertEqual(document.blob.file.name, document.file.name)
+        with document.file.open("rb") as f:
+            self.assertEqual(f.read(), b"scan")
+
+    def test_gc_sweeps_orphans(self):
+        self.upload(b"kept")
+        orphan = DocumentBlob.objects.create(sha256="f" * 64, file="freelancer_documents/blobs/ff/orphan", size=1)
+        DocumentBlob.objects.filter(pk=orphan.pk).update(created_at="2000-01-01T00:00Z")
+        stray = os.path.join(self.media_root, "freelancer_documents/blobs/00/stray")
+        os.makedirs(os.path.dirname(stray))
+        open(stray, "wb").close()
+        os.utime(stray, (0, 0))
+
+        call_command("gc_document_blobs", stdout=open(os.devnull, "w"))
+
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+        self.assertFalse(os.path.exists(stray))
+
+
+class DocumentDownloadTests(DocumentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        response = self.client.post("/api/freelancer-documents/", {
+            "file": SimpleUploadedFile("cert.pdf", b"0123456789"),
+            "document_type": "certificate",
+        }, format="multipart")
+        self.url = response.data["download_url"]
+
+    def test_owner_downloads_with_range_and_conditional_requests(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-4/10")
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=20-").status_code, 416)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_other_users_cannot_download(self):
+        other = User.objects.create(username="user_other")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND="nginx", MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_hands_off_to_front_server(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response["X-Accel-Redirect"].startswith("/protected-media/freelancer_documents/blobs/"))
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(DERIVATIVES_EAGER=True)
+class DocumentPreviewTests(DocumentTestCase):
+
+    def test_image_document_gets_preview(self):
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new("RGB", (1200, 800), "red").save(image, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/freelancer-documents/", {
+                "file": SimpleUploadedFile("id.png", image.getvalue()),
+                "document_type": "id",
+            }, format="multipart")
+        document_id = response.data["id"]
+
+        response = self.client.get(f"/api/freelancer-documents/{document_id}/")
+        self.assertIsNotNone(response.data["preview_url"])
+        response = self.client.get(response.data["preview_url"])
+        self.assertEqual(response.status_code, 200)
+        preview = Image.open(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(preview.size, (320, 213))
+
+
+class ProfessionImageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch("mygigs.derivatives.schedule_image_variants")
+        self.schedule = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hashes_only_new_images(self):
+        image = SimpleUploadedFile("plumbing.png", b"not really a png")
+        with self.captureOnCommitCallbacks(execute=True):
+            profession = Profession.objects.create(name="Plumbing", slug="plumbing", image=image)
+        self.assertEqual(profession.image_sha256, hashlib.sha256(b"not really a png").hexdigest())
+        self.assertEqual(self.schedule.call_count, 1)
+
+        profession = Profession.objects.get(pk=profession.pk)
+        profession.description = "Pipes"
+        with mock.patch("mygigs.derivatives.storage_sha256") as storage_sha256:
+            profession.save()
+            profession.save(update_fields=["description"])
+        storage_sha256.assert_not_called()
+
+    def test_missing_image_file(self):
+        profession = Profession.objects.create(name="Masonry", slug="masonry")
+        profession.image = "professions/gone.png"
+        with self.assertLogs("mygigs.signals", "WARNING"):
+            profession.save()
+        self.schedule.assert_not_called()
+
+
+    def test_backfill_skips_missing_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Profession.objects.create(
+                name="Plumbing", slug="plumbing", image=SimpleUploadedFile("plumbing.png", b"png")
+            )
+        Profession.objects.filter(slug="plumbing").update(image_sha256="")
+        Profession.objects.create(name="Masonry", slug="masonry")
+        Profession.objects.filter(slug="masonry").update(image="professions/gone.png")
+        self.schedule.reset_mock()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("build_derivatives", "--skip-documents", stdout=stdout, stderr=stderr)
+        self.assertIn("(1 failed)", stdout.getvalue())
+        self.assertIn("professions/gone.png", stderr.getvalue())
+        self.assertEqual(self.schedule.call_count, 1)
+        self.assertEqual(
+            Profession.objects.get(slug="plumbing").image_sha256, hashlib.sha256(b"png").hexdigest()
+        )
+
+def try_write_lock(path):
+    """In another process: whether the write lock file is free."""
+    with open(path, "a") as f:
+        try:
+            api_sqlite.fcntl.flock(f, api_sqlite.fcntl.LOCK_EX | api_sqlite.fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        api_sqlite.fcntl.flock(f, api_sqlite.fcntl.LOCK_UN)
+        return True
+
+
+@skipUnless(api_sqlite.fcntl, "no fcntl")
+class SerializedWriteTests(TransactionTestCase):
+
+    def setUp(self):
+        # The test database is in memory; lock a file as for a file database.
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.lock_file = os.path.join(tmp, "db.sqlite3.write-lock")
+        patcher = mock.patch("api.sqlite.lock_path", return_value=self.lock_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def lock_is_free(self):
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            return pool.apply(try_write_lock, (self.lock_file,))
+
+    def test_cross_process_lock(self):
+        self.assertTrue(self.lock_is_free())
+        with serialized_write():
+            self.assertTrue(connection.in_atomic_block)
+            self.assertFalse(self.lock_is_free())
+        self.assertTrue(self.lock_is_free())
+
+    def test_reentrant(self):
+        @serialized
+        def create(slug):
+            Profession.objects.create(name=slug, slug=slug)
+
+        with serialized_write():
+            create("inner")
+            self.assertFalse(self.lock_is_free())
+        create("outer")
+        self.assertEqual(Profession.objects.filter(slug__in=["inner", "outer"]).count(), 2)
+
+    def test_other_databases(self):
+        with mock.patch("api.sqlite._is_sqlite", return_value=False), serialized_write():
+            self.assertTrue(connection.in_atomic_block)
+            self.assertFalse(api_sqlite._thread_lock.locked())
+            self.assertTrue(self.lock_is_free())
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query counts must not grow with the number of rows returned."""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = User.objects.create(username="user_client")
+        for p in range(3):
+            profession = Profession.objects.create(name=f"Profession {p}", slug=f"profession-{p}")
+            for f in range(4):
+                freelancer = Freelancer.objects.create(
+                    name=f"Free Lancer {p}{f}", email=f"{p}{f}@example.com",
+                    county="Nairobi", profession=profession,
+                )
+                for r in range(3):
+                    review = Review.objects.create(
+                        freelancer=freelancer, client=client, client_name="C L",
+                        client_avatar="CL", rating=4, content="Good",
+                    )
+                    ReviewReply.objects.create(review=review, content="Thanks")
+        cls.freelancer = freelancer
+
+    def setUp(self):
+        # A cached response would pass with no queries at all.
+        caches["default"].clear()
+
+    def test_professions_list(self):
+        with self.assertMaxQueries(2):
+            response = self.client.get("/api/professions/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_freelancers_list(self):
+        with self.assertMaxQueries(2):
+            response = self.client.get("/api/freelancers/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_freelancer_detail(self):
+        with self.assertMaxQueries(4):
+            response = self.client.get(f"/api/freelancers/{self.freelancer.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_freelancer_reviews(self):
+        with self.assertMaxQueries(3):
+            response = self.client.get(f"/api/freelancers/{self.freelancer.id}/reviews/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_reviews_list(self):
+        with self.assertMaxQueries(3):
+            response = self.client.get("/api/reviews/")
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsTests(TestCase):
+
+    def test_request_metrics_use_route_names(self):
+        profession = Profession.objects.create(name="Plumbing", slug="plumbing")
+        self.client.get("/api/professions/")
+        self.client.get(f"/api/professions/{profession.id}/")
+        with override_settings(METRICS_TOKEN="s3cret"):
+            body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('http_requests_total{route="profession-list",method="GET",status="2xx"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="profession-detail",method="GET",le="+Inf"}', body)
+        self.assertIn('http_request_db_queries_count{route="profession-list"}', body)
+        self.assertNotIn(f"/api/professions/{profession.id}/", body)
+
+    def test_multiprocess_files_are_summed(self):
+        from api.metrics import registry
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = {"outbound_request_duration_seconds": [[["clerk", "jwks", "ok"], [[1] + [0] * 11, 0.004]]]}
+        with open(os.path.join(directory, "99999999.json"), "w") as f:
+            json.dump(other, f)
+        with override_settings(METRICS_DIR=directory):
+            body = registry.render()
+        self.assertIn('outbound_request_duration_seconds_bucket{service="clerk",operation="jwks",outcome="ok",le="0.005"}', body)
+        self.assertIn(f"{os.getpid()}.json", os.listdir(directory))
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+    def test_closed_without_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+# The async views at their usual paths, as mygigs.urls mounts them under ASGI.
+urlpatterns = [
+    path("api/whoami/", async_whoami, name="whoami"),
+    path("api/me/", async_me, name="me"),
+    path("api/stk-push/", async_stk_push, name="stk_push_request"),
+    path("api/clerk/", async_clerk_webhook_handler, name="clerk-webhook"),
+]
+
+
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.jwks = LocalJWKS(bits=1024)
+        cls.jwks_url, cls.jwks_server = cls.jwks.serve()
+        cls.addClassCleanup(cls.jwks_server.shutdown)
+
+    def setUp(self):
+        self.auth = {"Authorization": f"Bearer {self.jwks.token('user_async', email='a@example.com')}"}
+        jwks_settings = override_settings(CLERK_JWKS_URL=self.jwks_url)
+        jwks_settings.enable()
+        self.addCleanup(jwks_settings.disable)
+
+    async def get_both(self, path, headers):
+        """The response of the sync view and of its async twin."""
+        sync = await sync_to_async(self.client.get)(path, headers=headers)
+        with override_settings(ROOT_URLCONF=__name__):
+            return sync, await self.async_client.get(path, headers=headers)
+
+    @override_settings(DEBUG=True)
+    async def test_same_responses_as_sync_views(self):
+        for url in ("/api/whoami/", "/api/me/"):
+            sync, response = await self.get_both(url, self.auth)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, sync.content)
+            # QueryBudgetMiddleware still sees the ORM calls made off the event loop.
+            self.assertGreater(int(response["X-DB-Queries"]), 0)
+
+    async def test_credentials_required(self):
+        for headers in ({}, {"Authorization": "Bearer not-a-jwt"}):
+            sync, response = await self.get_both("/api/me/", headers)
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.status_code, sync.status_code)
+        self.assertEqual(response.json()["detail"][:20], sync.json()["detail"][:20])
+
+    @override_settings(ROOT_URLCONF=__name__, MPESA_CONFIG=dict(
+        settings.MPESA_CONFIG, SHORTCODE="", CLERK_WEBHOOK_SECRET=""
+    ))
+    async def test_unconfigured_integrations(self):
+        with self.assertLogs("mygigs", "ERROR"):
+            response = await self.async_client.post(
+                "/api/stk-push/", {"phone_number": "254700000000", "amount": 1}, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual((await self.async_client.post("/api/clerk/", {})).status_code, 503)
+        self.assertEqual((await self.async_client.get("/api/stk-push/")).status_code, 405)
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def take_until_refused(self):
+        self.assertEqual([buckets.take("test", 3, 60) for _ in range(3)], [0, 0, 0])
+        wait = buckets.take("test", 3, 60)
+        self.assertAlmostEqual(wait, 20, delta=0.5)
+        self.assertAlmostEqual(buckets.peek("test", 3, 60), wait, delta=0.5)
+
+    def test_token_bucket(self):
+        with self.assertNoLogs("api.throttling"):
+            self.take_until_refused()
+
+    @override_settings(THROTTLE_CACHE="unreachable")
+    def test_local_fallback(self):
+        # Without a working cache each process keeps its own buckets.
+        with self.assertLogs("api.throttling", "WARNING"):
+            self.take_until_refused()
+
+    @override_settings(MPESA_CONFIG=dict(settings.MPESA_CONFIG, SHORTCODE=""))
+    def test_stk_push_per_phone_number(self):
+        rates = {"stk_push.phone": "2/hour"}
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            with self.assertLogs("mygigs", "ERROR"):
+                for phone in ("0712345678", "254712345678"):
+                    response = self.client.post("/api/stk-push/", {"phone_number": phone, "amount": 1})
+                    self.assertEqual(response.status_code, 503)
+            response = self.client.post("/api/stk-push/", {"phone_number": "+254 712 345 678", "amount": 1})
+            self.assertEqual(response.status_code, 429)
+            self.assertAlmostEqual(int(response["Retry-After"]), 1800, delta=2)
+
+    def test_search_per_ip(self):
+        rates = {"search.ip": "2/min"}
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            statuses = [self.client.get("/api/freelancers/", {"search": "wiring"}).status_code for _ in range(3)]
+            self.assertEqual(statuses, [200, 200, 429])
+            self.assertEqual(self.client.get("/api/freelancers/").status_code, 200)
+            other_client = self.client.get("/api/freelancers/", {"search": "wiring"}, REMOTE_ADDR="10.0.0.2")
+            self.assertEqual(other_client.status_code, 200)
+
+    def test_spoofed_forwarded_for(self):
+        rates = {"search.ip": "2/min"}
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            statuses = [
+                self.client.get("/api/freelancers/", {"search": "wiring"}, HTTP_X_FORWARDED_FOR=f"203.0.113.{i}").status_code
+                for i in range(3)
+            ]
+            self.assertEqual(statuses, [200, 200, 429])
+        # Behind one proxy its entry is the client's address.
+        proxied = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates, NUM_PROXIES=1)
+        with override_settings(REST_FRAMEWORK=proxied):
+            response = self.client.get("/api/freelancers/", {"search": "wiring"}, HTTP_X_FORWARDED_FOR="203.0.113.9")
+            self.assertEqual(response.status_code, 200)
+
+    def test_rejected_tokens_per_ip(self):
+        jwks = LocalJWKS(bits=1024)
+        url, server = jwks.serve()
+        self.addCleanup(server.shutdown)
+        rates = {"auth.ip": "2/min"}
+        with override_settings(CLERK_JWKS_URL=url, REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            bad = {"Authorization": "Bearer not-a-jwt"}
+            statuses = [self.client.get("/api/whoami/", headers=bad).status_code for _ in range(3)]
+            self.assertEqual(statuses, [403, 403, 429])
+            good = {"Authorization": f"Bearer {jwks.token('user_throttled')}"}
+            self.assertEqual(self.client.get("/api/whoami/", headers=good, REMOTE_ADDR="10.0.0.2").status_code, 200)
+
+
+
+@override_settings(DATABASE_ROUTERS=["api.routers.PrimaryReplicaRouter"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """A "replica" alias on the test database, as TEST MIRROR sets it up."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test runner set up its databases, so the alias
+        # is neither created nor flushed: it reads the primary's tables.
+        primary = connections[PRIMARY].settings_dict
+        cls.replica = mock.patch.dict(settings.DATABASES, {
+            REPLICA: dict(primary, TEST=dict(primary["TEST"], MIRROR=PRIMARY)),
+        })
+        cls.replica.start()
+        cls.databases = {PRIMARY, REPLICA}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        cls.replica.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create(username="writer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def queries(self):
+        """Capture the queries sent to each alias: ``(primary, replica)``."""
+        primary = CaptureQueriesContext(connections[PRIMARY])
+        replica = CaptureQueriesContext(connections[REPLICA])
+        self.enterContext(primary)
+        self.enterContext(replica)
+        return primary, replica
+
+    def test_router(self):
+        self.assertEqual(Profession.objects.all().db, PRIMARY)
+        with reads_from_replica():
+            self.assertEqual(Profession.objects.all().db, REPLICA)
+            with transaction.atomic():
+                self.assertEqual(Profession.objects.all().db, PRIMARY)
+            Profession.objects.create(name="Plumbing", slug="plumbing")
+            # Once the context writes, it reads its own writes.
+            self.assertEqual(Profession.objects.all().db, PRIMARY)
+        with reads_from_replica():
+            self.assertEqual(Profession.objects.all().db, REPLICA)
+
+    def test_safe_requests_read_the_replica(self):
+        Testimonial.objects.create(name="Amina", content="Great", rating=5, avatar="AM", is_approved=True)
+        primary, replica = self.queries()
+        response = self.client.get("/api/testimonials/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertTrue(replica.captured_queries)
+        self.assertEqual(primary.captured_queries, [])
+
+    def test_writes_go_to_the_primary_and_pin_the_client(self):
+        primary, replica = self.queries()
+        response = self.client.post("/api/testimonials/", {"content": "Great", "rating": 5}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any("INSERT" in q["sql"] for q in primary.captured_queries))
+        self.assertEqual(replica.captured_queries, [])
+
+        # The next read by the same client sees its write on the primary...
+        response = self.client.get("/api/testimonials/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica.captured_queries, [])
+        # ...while other clients keep reading the replica.
+        self.client.get("/api/testimonials/", REMOTE_ADDR="10.0.0.2")
+        self.assertTrue(replica.captured_queries)
+
+    def test_failed_writes_do_not_pin(self):
+        primary, replica = self.queries()
+        response = self.client.post("/api/testimonials/", {"content": "Great", "rating": 9}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.client.get("/api/testimonials/")
+        self.assertTrue(replica.captured_queries)
+
+class FreelancerListTests(TestCase):
+
+    def test_rows_render_like_instances(self):
+        call_command(
+            "generate_synthetic_data", seed=8, freelancers=30, clients=5, reviews_per_freelancer=2,
+            jobs=0, testimonials=0, transactions=0, stdout=io.StringIO(),
+        )
+        Freelancer.objects.create(name="straße", county="Nairobi", hourly_rate=Decimal("99.5"), avatar=None)
+        Freelancer.objects.create(name="Wanjiru  Kamau Njeri", county="Kiambu", skills=["Wiring", "Solar"])
+        queryset = FreelancerViewSet.queryset
+        with self.assertNumQueries(1):
+            rows = FreelancerListSerializer(FreelancerListSerializer.values(queryset), many=True).data
+        instances = FreelancerListSerializer(queryset, many=True).data
+        self.assertEqual(len(rows), Freelancer.objects.filter(is_active=True).count())
+        self.assertEqual(ORJSONRenderer().render(rows), JSONRenderer().render(instances))
+        self.assertNotIn("profession_name", rows[-1])
+
+    def test_stored_initials_follow_name(self):
+        freelancer = Freelancer.objects.create(name="Otieno", county="Kisumu")
+        self.assertEqual(freelancer.avatar_initials, "OT")
+        freelancer.name = "akinyi otieno"
+        freelancer.save(update_fields=["name"])
+        freelancer.refresh_from_db()
+        self.assertEqual(freelancer.avatar_initials, "AO")
+
+
+class FreelancerBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancers = [Freelancer.objects.create(name=f"Fundi {i}", county="Nairobi") for i in range(4)]
+        cls.inactive = Freelancer.objects.create(name="Away", county="Nakuru", is_active=False)
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_request_order_and_missing(self):
+        a, b, c, _ = self.freelancers
+        ids = f"{c.id},{a.id},999999,{self.inactive.id},{b.id},{a.id}"
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/freelancers/batch/", {"ids": ids})
+        body = response.json()
+        self.assertEqual([item["id"] for item in body["results"]], [c.id, a.id, b.id])
+        self.assertEqual(body["missing"], [999999, self.inactive.id])
+        self.assertEqual(body["results"][0], self.client.get("/api/freelancers/", {"search": c.name}).json()["results"][0])
+        response = self.client.get("/api/freelancers/batch/", {"ids": f"{b.id},{a.id}", "fields": "name"})
+        self.assertEqual(response.json()["results"], [{"name": b.name}, {"name": a.name}])
+
+    def test_invalid_ids(self):
+        for ids in ("", "1,x", ",".join(str(i) for i in range(FreelancerViewSet.max_batch + 1))):
+            response = self.client.get("/api/freelancers/batch/", {"ids": ids})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("ids", response.json())
+
+
+class ReviewHelpfulTests(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.freelancer = Freelancer.objects.create(name="Fundi", county="Nairobi")
+        author = User.objects.create(username="author")
+        self.review = Review.objects.create(
+            freelancer=self.freelancer, client=author, client_name="Author", client_avatar="AU", rating=5, content="Good",
+        )
+
+    def helpful_count(self):
+        response = self.client.get(f"/api/freelancers/{self.freelancer.id}/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["reviews"][0]["helpful_count"]
+
+    def test_vote_shows_in_cached_detail(self):
+        self.assertEqual(self.helpful_count(), 0)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="voter"))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f"/api/reviews/{self.review.id}/mark_helpful/")
+        self.assertEqual(response.json(), {"helpful_count": 1})
+        self.assertEqual(self.helpful_count(), 1)
+
+@skipUnless(catalog_engine.np, "numpy is not installed")
+class CatalogEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_synthetic_data", seed=11, freelancers=60, clients=5, reviews_per_freelancer=1,
+            jobs=0, testimonials=0, transactions=0, stdout=io.StringIO(),
+        )
+
+    def setUp(self):
+        caches["default"].clear()
+        catalog_engine.engine.snapshot = None
+
+    def browse(self, params, engine):
+        caches["default"].delete_many([generation_key("freelancers")])
+        with override_settings(CATALOG_ENGINE=engine):
+            return self.client.get("/api/freelancers/", params).json()
+
+    def test_same_pages_as_sql(self):
+        freelancer = Freelancer.objects.filter(is_active=True, profession__isnull=False).first()
+        for params in [
+            {},
+            {"page": 2},
+            {"county": freelancer.county.upper()},
+            {"profession": freelancer.profession_id, "min_rating": "3.5"},
+            {"ward": freelancer.ward, "constituency": freelancer.constituency.lower()},
+            {"search": freelancer.skills[0][:4].upper(), "min_experience": "2"},
+            {"search": freelancer.profession.name.lower()},
+            {"county": "Atlantis"},
+            {"search": "ri", "fields": "name,rating"},
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.browse(params, engine=True), self.browse(params, engine=False))
+
+    def test_one_query_per_page(self):
+        self.browse({}, engine=True)
+        caches["default"].delete_many([generation_key("freelancers")])
+        with override_settings(CATALOG_ENGINE=True), self.assertNumQueries(1):
+            self.client.get("/api/freelancers/", {"county": "Nairobi"})
+
+    def test_changes_reach_the_snapshot(self):
+        self.browse({}, engine=True)
+        top = Freelancer.objects.filter(is_active=True).order_by("rating").first()
+        gone = Freelancer.objects.filter(is_active=True).order_by("-rating").first()
+        with override_settings(CATALOG_ENGINE=True), self.captureOnCommitCallbacks(execute=True):
+            top.rating, top.completed_jobs, top.county = Decimal("5.00"), 10000, "Lamu"
+            top.save()
+            gone.is_active = False
+            gone.save()
+        loaded = catalog_engine.engine.snapshot.loaded
+        results = self.browse({"county": "lamu"}, engine=True)["results"]
+        self.assertEqual(results[0]["id"], top.id)
+        self.assertEqual(catalog_engine.engine.snapshot.loaded, loaded)  # no reload
+        self.assertEqual(self.browse({}, engine=True), self.browse({}, engine=False))
+
+
+class SparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_synthetic_data", seed=9, freelancers=15, clients=5, reviews_per_freelancer=3,
+            jobs=3, testimonials=0, transactions=0, stdout=io.StringIO(),
+        )
+        cls.freelancer = Freelancer.objects.filter(is_active=True, review__isnull=False).first()
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_freelancer_list_and_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/freelancers/", {"fields": "id,name,rating"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "name", "rating"})
+        self.assertNotIn("bio", queries[-1]["sql"])
+        full = self.client.get(f"/api/freelancers/{self.freelancer.id}/").json()
+        # One query: no profession join, no reviews.
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/freelancers/{self.freelancer.id}/", {"fields": "name,hourly_rate"})
+        self.assertEqual(response.json(), {"name": full["name"], "hourly_rate": full["hourly_rate"]})
+
+    def test_review_expand(self):
+        url = f"/api/freelancers/{self.freelancer.id}/reviews/"
+        with self.assertNumQueries(2):  # count and page; replies are not prefetched
+            response = self.client.get(url, {"fields": "id,rating"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "rating"})
+        response = self.client.get(url, {"fields": "id", "expand": "freelancer"})
+        review = response.json()["results"][0]
+        self.assertEqual(review["freelancer"]["name"], self.freelancer.name)
+        self.assertEqual(set(review), {"id", "freelancer"})
+
+    def test_jobs_and_errors(self):
+        response = self.client.get("/api/job/", {"fields": "title,posted"})
+        self.assertEqual(set(response.json()["results"][0]), {"title", "posted"})
+        response = self.client.get("/api/freelancers/", {"fields": "name,secret", "expand": "reviews"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"fields", "expand"})
+
+
+class JSONRenderingTests(TestCase):
+
+    def test_same_bytes_as_drf(self):
+        call_command(
+            "generate_synthetic_data", seed=4, freelancers=12, clients=5, reviews_per_freelancer=3,
+            jobs=3, testimonials=0, transactions=0, stdout=io.StringIO(),
+        )
+        payloads = [
+            self.client.get(url).data for url in ("/api/freelancers/", "/api/reviews/", "/api/job/")
+        ]
+        self.assertTrue(payloads[0]["results"])
+        payloads.append({
+            "rate": Decimal("1500.50"), "at": timezone.now(), "day": datetime.date(2025, 1, 31),
+            "label": gettext_lazy("Plumbing"), 7: "int key", "big": 2 ** 70, "text": "Nairobi \u2028 caf\u00e9",
+        })
+        for data in payloads:
+            self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(payloads[0], "application/json; indent=2"),
+                         JSONRenderer().render(payloads[0], "application/json; indent=2"))
+        with mock.patch("api.renderers.orjson", None):
+            self.assertEqual(ORJSONRenderer().render(payloads[0]), JSONRenderer().render(payloads[0]))
+
+    def test_parser(self):
+        body = '{"phone_number": "0712345678", "amount": 1.5, "note": "M-Pesa \u00e9"}'
+        expected = {"phone_number": "0712345678", "amount": 1.5, "note": "M-Pesa \u00e9"}
+        parse = ORJSONParser().parse
+        self.assertEqual(parse(io.BytesIO(body.encode()), parser_context={"encoding": "utf-8"}), expected)
+        self.assertEqual(parse(io.BytesIO(body.encode("latin-1")), parser_context={"encoding": "latin-1"}), expected)
+        for bad in (b"{", b'{"amount": NaN}'):
+            with self.assertRaises(ParseError):
+                parse(io.BytesIO(bad), parser_context={"encoding": "utf-8"})
+
+
+@override_settings(COMPRESSION_MIN_BYTES=200)
+class CompressionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Profession.objects.create(name=f"Profession {i}", slug=f"profession-{i}", description="Fundi " * 20)
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_choose_coding(self):
+        available = ("br", "gzip")
+        self.assertEqual(choose_coding("gzip, deflate, br", available), "br")
+        self.assertEqual(choose_coding("gzip;q=1.0, br;q=0.5", available), "gzip")
+        self.assertEqual(choose_coding("*;q=0.1, br;q=0", available), "gzip")
+        self.assertIsNone(choose_coding("identity", available))
+        self.assertIsNone(choose_coding("", available))
+
+    def test_gzip_above_threshold(self):
+        plain = self.client.get("/api/professions/")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        response = self.client.get("/api/professions/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        with override_settings(COMPRESSION_MIN_BYTES=len(plain.content) + 1):
+            caches["default"].clear()
+            response = self.client.get("/api/professions/", headers={"Accept-Encoding": "gzip"})
+            self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_cache_hits_are_precompressed(self):
+        first = self.client.get("/api/professions/", headers={"Accept-Encoding": "gzip"})
+        with self.assertNumQueries(0), mock.patch("api.compression.encode", side_effect=AssertionError):
+            hit = self.client.get("/api/professions/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(hit.content, first.content)
+        self.assertEqual(hit["Content-Encoding"], "gzip")
+        self.assertEqual(hit["Content-Type"], first["Content-Type"])
+
+        Profession.objects.filter(slug="profession-0").first().delete()
+        fresh = json.loads(gzip.decompress(self.client.get("/api/professions/", headers={"Accept-Encoding": "gzip"}).content))
+        self.assertEqual(fresh["count"], 4)
+
+
+class HomepageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_synthetic_data", seed=10, freelancers=20, clients=5, reviews_per_freelancer=1,
+            jobs=0, testimonials=0, transactions=0, stdout=io.StringIO(),
+        )
+        Freelancer.objects.filter(is_active=True).update(is_featured=True)
+        for i in range(6):
+            Job.objects.create(title=f"Job {i}", company="Jenga", location="Nairobi", type="contract", budget="10k",
+                               is_featured=i % 2 == 0)
+        Testimonial.objects.create(name="Amina", content="Great fundi", rating=5, avatar="AM", is_approved=True)
+        Testimonial.objects.create(name="Hidden", content="Pending", rating=4, avatar="HI")
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_sections(self):
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/home/")
+        home = response.json()
+        self.assertEqual(list(home), ["professions", "featured_freelancers", "featured_jobs", "testimonials"])
+        self.assertEqual(home["featured_freelancers"], self.client.get("/api/freelancers/featured/").json())
+        self.assertEqual([job["title"] for job in home["featured_jobs"]], ["Job 4", "Job 2", "Job 0"])
+        self.assertEqual([testimonial["name"] for testimonial in home["testimonials"]], ["Amina"])
+        self.assertEqual(len(home["professions"]), Profession.objects.filter(is_active=True).count())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/home/").content, response.content)
+
+    def test_etag_and_section_invalidation(self):
+        first = self.client.get("/api/home/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/home/", headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+        Job.objects.create(title="New", company="Jenga", location="Mombasa", type="contract", budget="5k",
+                           is_featured=True)
+        with self.assertNumQueries(1):  # only the jobs section is rebuilt
+            response = self.client.get("/api/home/", headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(response.json()["featured_jobs"][0]["title"], "New")
+        self.assertEqual(response.json()["professions"], first.json()["professions"])
+
+    def test_compressed_from_cache(self):
+        self.client.get("/api/home/", headers={"Accept-Encoding": "gzip"})
+        with mock.patch("api.compression.encode", side_effect=AssertionError):
+            response = self.client.get("/api/home/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.client.get("/api/home/").json())
+
+
+class Widgets(APIView):
+    calls = 0
+    gate = None
+
+    @cache_response("widgets")
+    def get(self, request):
+        type(self).calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        return Response({"widgets": type(self).calls})
+
+
+@override_settings(RESPONSE_CACHE_LOCK_SECONDS=0.5)
+class ResponseStampedeTests(SimpleTestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        Widgets.calls, Widgets.gate = 0, None
+        self.view = Widgets.as_view()
+        self.key = response_key(("widgets",), APIRequestFactory().get("/widgets/"))
+
+    def get(self):
+        response = self.view(APIRequestFactory().get("/widgets/"))
+        # Cache hits are plain HttpResponses.
+        return response.render() if hasattr(response, "render") else response
+
+    def test_concurrent_misses_compute_once(self):
+        Widgets.gate = threading.Event()
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(self.get) for _ in range(6)]
+            time.sleep(0.2)
+            Widgets.gate.set()
+            bodies = {future.result().content for future in futures}
+        self.assertEqual(Widgets.calls, 1)
+        self.assertEqual(bodies, {b'{"widgets":1}'})
+
+    def test_entries_keep_drf_headers(self):
+        first = self.get()
+        entry = caches["default"].get(self.key)
+        self.assertEqual(entry["headers"], {"Vary": "Accept", "Allow": first["Allow"]})
+        hit = cached_response(entry)
+        self.assertEqual((hit["Vary"], hit["Allow"]), (first["Vary"], first["Allow"]))
+        self.assertEqual(self.get().content, first.content)
+
+    def test_waits_for_other_workers_lock(self):
+        cache = caches["default"]
+        cache.add(lock_key(self.key), 1)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self.get)
+            time.sleep(0.1)
+            # The worker holding the lock stores its entry.
+            cache.set(self.key, {"content_type": "application/json", "body": b'{"widgets":0}', "encoded": {},
+                                 "delta": 0.01, "expires": time.time() + 60})
+            self.assertEqual(future.result().content, b'{"widgets":0}')
+        self.assertEqual(Widgets.calls, 0)
+
+        cache.delete(self.key)
+        # A lock that is never released only delays the request.
+        self.assertEqual(self.get().content, b'{"widgets":1}')
+
+    def test_early_refresh(self):
+        self.get()
+        entry = caches["default"].get(self.key)
+        entry["expires"] = time.time()  # due
+        caches["default"].set(self.key, entry)
+        caches["default"].add(lock_key(self.key), 1)
+        # Someone else is refreshing: the current entry is served.
+        self.assertEqual(self.get().content, b'{"widgets":1}')
+        caches["default"].delete(lock_key(self.key))
+        self.assertEqual(self.get().content, b'{"widgets":2}')
+        with override_settings(RESPONSE_CACHE_BETA=0):
+            entry = caches["default"].get(self.key)
+            entry["expires"] = time.time()
+            caches["default"].set(self.key, entry)
+            self.assertEqual(self.get().content, b'{"widgets":2}')
+        self.assertFalse(caches["default"].get(lock_key(self.key)))
+
+
+class SyntheticDataTests(TestCase):
+
+    def generate(self, seed):
+        call_command(
+            "generate_synthetic_data", seed=seed, freelancers=20, clients=15,
+            reviews_per_freelancer=5, jobs=5, testimonials=5, transactions=5,
+            batch_size=7, stdout=io.StringIO(),
+        )
+        prefix = f"freelancer-{seed}-"
+        return list(
+            Freelancer.objects.filter(email__startswith=prefix).order_by("id").values_list(
+                "name", "ward", "rating", "review_count", "created_at"
+            )
+        )
+
+    def test_consistent_data(self):
+        self.generate(seed=3)
+        self.assertEqual(Freelancer.objects.count(), 20)
+        for freelancer in Freelancer.objects.all():
+            self.assertEqual(freelancer.review_count, freelancer.review.count())
+        for review in Review.objects.all():
+            self.assertEqual(review.helpful_count, review.helpful_votes.count())
+
+    def test_same_seed_same_data(self):
+        first = self.generate(seed=5)
+        Freelancer.objects.all().delete()
+        User.objects.all().delete()
+        MpesaTransaction.objects.all().delete()
+        self.assertEqual(self.generate(seed=5), first)
+        self.assertNotEqual(self.generate(seed=6), first)
+
+
+class StartupTests(SimpleTestCase):
+
+    def test_optional_integrations_are_lazy(self):
+        out = io.StringIO()
+        call_command("bench_startup", runs=1, budget_ms=60000, stdout=out)
+        self.assertIn("Within the", out.getvalue())
+
+    def test_views_package_resolves_names(self):
+        from mygigs import views
+        from mygigs.views.payments import MpesaSTKPushAPIView
+
+        self.assertIs(views.MpesaSTKPushAPIView, MpesaSTKPushAPIView)
+        with self.assertRaises(AttributeError):
+            views.NoSuchView
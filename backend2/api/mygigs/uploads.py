@@ -0,0 +1,122 @@
+"""
+Chunked, resumable FreelancerDocument uploads.
+
+Protocol (see DocumentUploadViewSet):
+
+1. ``POST /api/document-uploads/`` with filename, size, SHA-256 checksum,
+   document_type and title. Returns the upload id and ``offset`` 0.
+2. ``PUT /api/document-uploads/<id>/`` with the raw chunk as the body and an
+   ``Upload-Offset`` header. The offset must equal the bytes received so far;
+   a mismatch returns 409 with the current offset so the client can resume.
+   ``GET`` on the same URL returns the current offset after a dropped
+   connection.
+3. ``POST /api/document-uploads/<id>/complete/`` verifies size and checksum
+   and turns the upload into a FreelancerDocument backed by a DocumentBlob
+   (the verified checksum doubles as the blob key).
+
+Chunks are copied from the request stream to the part file in small blocks,
+so a worker never holds more than ``STREAM_BLOCK_SIZE`` bytes of a chunk.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .blobs import store_local_file
+from .models import DocumentUpload, FreelancerDocument
+
+STREAM_BLOCK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = getattr(settings, "DOCUMENT_UPLOAD_MAX_CHUNK_SIZE", 16 * 1024 * 1024)
+MAX_FILE_SIZE = getattr(settings, "DOCUMENT_UPLOAD_MAX_SIZE", 1024 * 1024 * 1024)
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """The client sent a chunk for an offset other than the current one."""
+
+
+def part_path(upload):
+    return default_storage.path(upload.part_name)
+
+
+def start_upload(upload):
+    """Create the empty part file for a freshly saved DocumentUpload."""
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``.
+    Returns the new offset.
+    """
+    if offset != upload.received:
+        raise OffsetMismatch(f"Expected offset {upload.received}, got {offset}")
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks may not exceed {MAX_CHUNK_SIZE} bytes")
+    if offset + length > upload.size:
+        raise UploadError("Chunk extends past the declared file size")
+
+    written = 0
+    with open(part_path(upload), "r+b") as f:
+        f.seek(offset)
+        while written < length:
+            block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+        f.truncate()
+
+    # Only advance if nobody else moved the offset while we were writing.
+    updated = DocumentUpload.objects.filter(
+        pk=upload.pk, received=offset
+    ).update(received=offset + written)
+    if not updated:
+        upload.refresh_from_db(fields=["received"])
+        raise OffsetMismatch("Upload offset changed during the write")
+    upload.received = offset + written
+    return upload.received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload):
+    """Verify the part file and move it into blob storage as a
+    FreelancerDocument."""
+    if upload.received != upload.size:
+        raise UploadError(f"Upload incomplete: {upload.received}/{upload.size} bytes")
+    path = part_path(upload)
+    sha256 = upload.checksum.lower()
+    if file_sha256(path) != sha256:
+        raise UploadError("Checksum mismatch")
+
+    blob = store_local_file(path, sha256, upload.filename)
+    document = FreelancerDocument.objects.create(
+        freelancer=upload.freelancer,
+        blob=blob,
+        file=blob.file.name,
+        document_type=upload.document_type,
+        title=upload.title,
+    )
+    upload.delete()
+    return document
+
+
+def abort_upload(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
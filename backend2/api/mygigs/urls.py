@@ -1,28 +1,32 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedDefaultRouter
-from .views import (
-    FreelancerDocumentViewSet,
+from .views.accounts import (
     FreelancerConversionViewSet,
-    MpesaCallbackAPIView,
-    MpesaSTKPushAPIView,
-    whoami,
     FreelancerProfileUpdateView,
-    FreelancerViewSet,
-    ProfessionViewSet,
-    ReviewViewSet,
-    JobViewSet,
-    TestimonialViewSet,
-    MpesaSTKPushAPIView, 
-    MpesaCallbackAPIView, 
-    MpesaTransactionListAPIView, 
-    MpesaTransactionStatusAPIView, 
-    clerk_webhook_handler,
+    AdminOverviewView,
+    async_me,
+    async_whoami,
     me,
     me_reviews,
-    AdminOverviewView
-   
+    whoami,
 )
+from .views.catalog import FreelancerViewSet, JobViewSet, ProfessionViewSet, ReviewViewSet, TestimonialViewSet
+from .views.home import homepage
+from .views.documents import DocumentUploadViewSet, FreelancerDocumentViewSet
+from .views.payments import (
+    MpesaCallbackAPIView,
+    MpesaSTKPushAPIView,
+    MpesaTransactionListAPIView,
+    MpesaTransactionStatusAPIView,
+    async_stk_push,
+)
+from .views.webhooks import async_clerk_webhook_handler, clerk_webhook_handler
+
+# Under ASGI the endpoints that wait on Clerk or Safaricom are async, so a
+# slow upstream does not tie up a thread per request.
+ASYNC = settings.ASYNC_VIEWS
 
 router = DefaultRouter()
 router.register(r'freelancers', FreelancerViewSet, basename='freelancer')
@@ -45,21 +49,27 @@ router.register(
     FreelancerDocumentViewSet,
     basename="freelancer-documents"
 )
+router.register(
+    r"document-uploads",
+    DocumentUploadViewSet,
+    basename="document-uploads"
+)
 
 
 urlpatterns = [
     path("freelancers/me/", FreelancerProfileUpdateView.as_view(), name="freelancer-profile-update"),
     path('freelancers/me/reviews/', me_reviews, name="freelancer-me-reviews"),
-    path("whoami/", whoami, name="whoami"),
+    path("home/", homepage, name="homepage"),
+    path("whoami/", async_whoami if ASYNC else whoami, name="whoami"),
     path("", include(router.urls)),
     path("", include(freelancer_router.urls)),
-    path('stk-push/', MpesaSTKPushAPIView.as_view(), name='stk_push_request'),
+    path('stk-push/', async_stk_push if ASYNC else MpesaSTKPushAPIView.as_view(), name='stk_push_request'),
     path('callback/', MpesaCallbackAPIView.as_view(), name='mpesa_callback'),
     path('transactions-api/', MpesaTransactionListAPIView.as_view(), name='transaction_list_api'),
     # NEW: API endpoint for the frontend to check transaction status
     path('check-status/<str:checkout_request_id>/', MpesaTransactionStatusAPIView.as_view(), name='transaction_status'),
-    path('clerk/', clerk_webhook_handler, name='clerk-webhook'),
-    path('me/',me, name="me"),
+    path('clerk/', async_clerk_webhook_handler if ASYNC else clerk_webhook_handler, name='clerk-webhook'),
+    path('me/', async_me if ASYNC else me, name="me"),
     path('admin-overview/', AdminOverviewView.as_view(), name='admin-overview'),  # Added
 
     
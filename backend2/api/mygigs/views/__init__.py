@@ -0,0 +1,45 @@
+"""
+The API views, split by area so each loads only what it needs:
+
+* ``catalog``: professions, freelancers, reviews, jobs, testimonials
+* ``home``: the landing page's sections in one response
+* ``documents``: document uploads and downloads
+* ``accounts``: the signed-in user's profile, admin views
+* ``payments``: M-Pesa
+* ``webhooks``: Clerk webhooks
+
+``from mygigs.views import X`` still works; the submodule is imported on
+first access.
+"""
+import importlib
+
+_MODULES = {
+    "catalog": (
+        "ProfessionViewSet", "FreelancerViewSet", "ReviewViewSet", "TestimonialViewSet", "JobViewSet",
+    ),
+    "home": ("homepage",),
+    "documents": ("FreelancerDocumentViewSet", "DocumentUploadViewSet"),
+    "accounts": (
+        "FreelancerProfileUpdateView", "FreelancerConversionViewSet", "me_reviews", "whoami", "me",
+        "async_whoami", "async_me",
+        "AdminOverviewView", "SalesPersonListView", "ToggleSalesPersonStatusView", "LeaderboardView",
+    ),
+    "payments": (
+        "check_subscription", "transaction_status", "get_access_token", "MpesaSTKPushAPIView",
+        "MpesaCallbackAPIView", "MpesaTransactionListAPIView", "MpesaTransactionStatusAPIView",
+        "update_clerk_role_to_freelancer", "aget_access_token", "async_stk_push",
+    ),
+    "webhooks": ("clerk_webhook_handler", "async_clerk_webhook_handler"),
+}
+_LOCATIONS = {name: module for module, names in _MODULES.items() for name in names}
+
+
+def __getattr__(name):
+    module = _LOCATIONS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LOCATIONS))
@@ -0,0 +1,245 @@
+"""The signed-in user's own profile, reviews and identity, plus admin views."""
+import logging
+import os
+
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.asyncviews import async_api_view, json_response
+from users.authentication import ClerkAuthentication
+from users.utils import get_or_create_freelancer
+
+from ..models import Freelancer, Review
+from ..serializers import FreelancerCreateSerializer, FreelancerSerializer, ReviewReplySerializer, ReviewSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class FreelancerProfileUpdateView(APIView):
+    authentication_classes = [ClerkAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        freelancer = get_or_create_freelancer(request.user)
+        serializer = FreelancerSerializer(freelancer)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def put(self, request):
+        freelancer = get_or_create_freelancer(request.user)
+        serializer = FreelancerSerializer(freelancer, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+    serializer_class = ReviewSerializer
+    authentication_classes = [ClerkAuthentication]
+
+    # def get_permissions(self):
+    #     # Allow anyone to view reviews
+    #     if self.action in ["list", "retrieve"]:
+    #         return [AllowAny()]
+
+    #     # Only authenticated users can create reviews
+    #     if self.action in ["create", "perform_create", "mark_helpful", "add_reply"]:
+    #         return [IsAuthenticated()]
+
+    #     return [AllowAny()]
+
+    def get_queryset(self):
+        freelancer_id = self.kwargs.get('freelancer_id')
+        return Review.objects.filter(freelancer_id=freelancer_id).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        logger.debug("Creating review for freelancer %s", self.kwargs.get("freelancer_id"))
+
+        user = self.request.user
+        if not user.is_authenticated:
+            raise PermissionDenied("Authentication required")
+
+        freelancer_id = self.kwargs.get('freelancer_id')
+        freelancer = get_object_or_404(Freelancer, id=freelancer_id)
+
+        # Compute client name & avatar
+        client_name = f"{user.first_name} {user.last_name}".strip() or user.username
+        client_avatar = "".join([part[0].upper() for part in client_name.split()[:2]])
+
+        serializer.save(
+            freelancer=freelancer,
+            client=user,
+            client_name=client_name,
+            client_avatar=client_avatar,
+            helpful_count=0
+        )
+
+    @action(detail=True, methods=['post'])
+    def mark_helpful(self, request, pk=None):
+        review = self.get_object()
+        review.helpful_count += 1
+        review.save()
+        return Response({'helpful_count': review.helpful_count})
+
+    @action(detail=True, methods=['post'])
+    def add_reply(self, request, pk=None):
+        review = self.get_object()
+        serializer = ReviewReplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(review=review)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class FreelancerConversionViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=["post"])
+    def convert(self, request):
+        serializer = FreelancerCreateSerializer(
+            data=request.data,
+            context={"request": request}
+        )
+
+        serializer.is_valid(raise_exception=True)
+        freelancer = serializer.save()
+
+        return Response(
+            {
+                "message": "Freelancer profile created successfully",
+                "freelancer_id": freelancer.id,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+# class FreelancerDocumentUploadViewSet(viewsets.ViewSet):
+#     permission_classes = [IsAuthenticated]
+#     parser_classes = [MultiPartParser, FormParser]
+
+#     def create(self, request):
+#         user = request.user
+
+#         if not hasattr(user, "freelancer_profile"):
+#             return Response(
+#                 {"detail": "You must create a freelancer profile first."},
+#                 status=400,
+#             )
+
+#         serializer = FreelancerDocumentSerializer(data=request.data)
+#         serializer.is_valid(raise_exception=True)
+
+#         serializer.save(freelancer=user.freelancer_profile)
+
+#         return Response(serializer.data, status=201)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def me_reviews(request):
+    freelancer = request.user.freelancer_profile
+    reviews = Review.objects.filter(freelancer=freelancer).prefetch_related("replies")
+    serializer = ReviewSerializer(reviews, many=True)
+    return Response(serializer.data)
+
+@api_view(["GET"])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([IsAuthenticated])
+def whoami(request):
+    user = request.user
+    return Response({
+        "id": user.id,
+        "email": user.email,
+        "name": user.first_name,
+        "clerk_id": user.username
+    })
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def me(request):
+    user = request.user
+
+    return Response({
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "is_freelancer": hasattr(user, "freelancer_profile"),
+    })
+
+
+# Async versions of whoami and me, used under ASGI (settings.ASYNC_VIEWS):
+# the Clerk JWKS fetch no longer holds a worker thread.
+
+@async_api_view(["GET"], authenticated=True, session=False)
+async def async_whoami(request):
+    user = request.user
+    return json_response({
+        "id": user.id,
+        "email": user.email,
+        "name": user.first_name,
+        "clerk_id": user.username
+    })
+
+
+@async_api_view(["GET"], authenticated=True)
+async def async_me(request):
+    user = request.user
+
+    return json_response({
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "is_freelancer": await Freelancer.objects.filter(user=user).aexists(),
+    })
+
+class AdminOverviewView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from django.db.models import Sum, Count
+
+        return Response({
+            'total_sales_people': SalesPerson.objects.filter(is_active=True).count(),
+            'total_referrals': Referral.objects.count(),
+            'pending_referrals': Referral.objects.filter(status='pending').count(),
+            'approved_referrals': Referral.objects.filter(status='approved').count(),
+            'confirmed_referrals': Referral.objects.filter(status='confirmed').count(),
+            'total_revenue': Referral.objects.filter(status='confirmed').aggregate(
+                total=Sum('payment_amount'))['total'] or 0,
+            'total_commissions': Referral.objects.filter(status='confirmed').aggregate(
+                total=Sum('commission_earned'))['total'] or 0,
+        })
+
+class SalesPersonListView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        sales_people = SalesPerson.objects.all().order_by('-created_at')
+        return Response(SalesPersonSerializer(sales_people, many=True).data)
+
+class ToggleSalesPersonStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        try:
+            sales_person = SalesPerson.objects.get(pk=pk)
+            sales_person.is_active = not sales_person.is_active
+            sales_person.save()
+
+            # Optionally update Clerk user metadata
+            clerk = Clerk(bearer_auth=os.environ.get('CLERK_SECRET_KEY'))
+            clerk.users.update(
+                user_id=sales_person.clerk_user_id,
+                public_metadata={'is_active': sales_person.is_active}
+            )
+
+            return Response({'is_active': sales_person.is_active})
+        except SalesPerson.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+class LeaderboardView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        sales_people = SalesPerson.objects.filter(is_active=True).order_by('-total_earnings')[:10]
+        return Response(SalesPersonSerializer(sales_people, many=True).data)
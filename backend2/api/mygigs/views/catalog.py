@@ -0,0 +1,347 @@
+"""Public catalog: professions, freelancers, reviews, jobs and testimonials."""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from api.cache import cache_response, invalidate
+from api.fieldsets import fieldset, shown_queryset
+from api.sqlite import serialized, serialized_write
+from api.throttling import ClerkUserThrottle, SearchThrottle
+from users.authentication import ClerkAuthentication
+
+from .. import catalog_engine
+from ..models import Freelancer, Job, Profession, Review, ReviewHelpful, Testimonial
+from ..serializers import (
+    FreelancerDetailSerializer,
+    FreelancerListSerializer,
+    JobSerializer,
+    ProfessionSerializer,
+    ReviewReplySerializer,
+    ReviewSerializer,
+    TestimonialSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ProfessionViewSet(viewsets.ReadOnlyModelViewSet):
+    """List and retrieve professions"""
+    queryset = Profession.objects.filter(is_active=True).annotate(
+        active_count=Count("freelancers", filter=Q(freelancers__is_active=True))
+    )
+    serializer_class = ProfessionSerializer
+
+    @cache_response("professions", "freelancers")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response("professions", "freelancers")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @action(detail=True, methods=['get'])
+    @cache_response("professions", "freelancers")
+    def freelancers(self, request, pk=None):
+        """Get all freelancers for a specific profession"""
+        profession = self.get_object()
+        freelancers = profession.freelancers.filter(is_active=True)
+        
+        # Apply filters
+        county = request.query_params.get('county')
+        constituency = request.query_params.get('constituency')
+        ward = request.query_params.get('ward')
+        min_rating = request.query_params.get('min_rating')
+        min_experience = request.query_params.get('min_experience')
+        search = request.query_params.get('search')
+        
+        if county:
+            freelancers = freelancers.filter(county__iexact=county)
+        if constituency:
+            freelancers = freelancers.filter(constituency__iexact=constituency)
+        if ward:
+            freelancers = freelancers.filter(ward__iexact=ward)
+        if min_rating:
+            freelancers = freelancers.filter(rating__gte=float(min_rating))
+        if min_experience:
+            freelancers = freelancers.filter(years_experience__gte=int(min_experience))
+        if search:
+            freelancers = freelancers.filter(
+                Q(name__icontains=search) | 
+                Q(skills__icontains=search)
+            )
+        
+        context = self.get_serializer_context()
+        names = list(FreelancerListSerializer(context=context).fields)
+        page = self.paginate_queryset(FreelancerListSerializer.values(freelancers, names))
+        serializer = FreelancerListSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+class FreelancerViewSet(viewsets.ReadOnlyModelViewSet):
+    """List and retrieve freelancers"""
+    throttle_scope = "search"
+    throttle_classes = [SearchThrottle, ClerkUserThrottle]
+    # Lists read FreelancerListSerializer.values() rows; no serializer uses
+    # aggregates over reviews (rating and review_count are stored).
+    queryset = (
+        Freelancer.objects
+        .filter(is_active=True)
+        .select_related("profession")
+        .order_by("-rating", "-completed_jobs", "id")
+    )
+    # Most ids one batch() request may ask for.
+    max_batch = 50
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return FreelancerDetailSerializer
+        return FreelancerListSerializer
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filters
+        profession = self.request.query_params.get('profession')
+        county = self.request.query_params.get('county')
+        constituency = self.request.query_params.get('constituency')
+        ward = self.request.query_params.get('ward')
+        min_rating = self.request.query_params.get('min_rating')
+        min_experience = self.request.query_params.get('min_experience')
+        search = self.request.query_params.get('search')
+        
+        if profession:
+            queryset = queryset.filter(profession__id=profession)
+        if county:
+            queryset = queryset.filter(county__iexact=county)
+        if constituency:
+            queryset = queryset.filter(constituency__iexact=constituency)
+        if ward:
+            queryset = queryset.filter(ward__iexact=ward)
+        if min_rating:
+            queryset = queryset.filter(rating__gte=float(min_rating))
+        if min_experience:
+            queryset = queryset.filter(years_experience__gte=int(min_experience))
+        if search:
+            queryset = queryset.filter(
+                Q(name__icontains=search) | 
+                Q(skills__icontains=search) |
+                Q(profession__name__icontains=search)
+            )
+
+        if self.action == "retrieve":
+            # ?fields= / ?expand=: load only what the shown fields read.
+            queryset = shown_queryset(queryset, self.get_serializer())
+        return queryset
+
+    def list_values(self, queryset):
+        """``queryset`` as FreelancerListSerializer.values() rows of the shown fields."""
+        return FreelancerListSerializer.values(queryset, list(self.get_serializer().fields))
+
+    def rows_by_id(self, ids):
+        """``{id: row}`` of the shown fields for the active freelancers ``ids``."""
+        names = list(self.get_serializer().fields)
+        if "id" not in names:
+            names.append("id")
+        # Not get_queryset(): its filters are for searching the list.
+        rows = FreelancerListSerializer.values(self.queryset.filter(id__in=ids).order_by(), names)
+        return {row["id"]: row for row in rows}
+
+    @cache_response("freelancers", "professions")
+    def list(self, request, *args, **kwargs):
+        ids = catalog_engine.engine.search(request.query_params)
+        if ids is not None:
+            queryset = catalog_engine.Hits(ids, self.rows_by_id)
+        else:
+            queryset = self.list_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @cache_response("freelancers", "professions", "reviews")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'])
+    @cache_response("freelancers", "professions")
+    def featured(self, request):
+        """Get featured freelancers for homepage"""
+        featured = self.list_values(self.get_queryset().filter(is_featured=True))[:8]
+        serializer = self.get_serializer(featured, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    @cache_response("freelancers", "professions")
+    def batch(self, request):
+        """Freelancers by id in one query: ``?ids=3,1,2``. Results keep the
+        order asked for; ids that are unknown or inactive are listed under
+        ``missing``."""
+        ids = self.batch_ids(request)
+        by_id = self.rows_by_id(ids)
+        return Response({
+            "results": self.get_serializer([by_id[pk] for pk in ids if pk in by_id], many=True).data,
+            "missing": [pk for pk in ids if pk not in by_id],
+        })
+
+    def batch_ids(self, request):
+        values = [value.strip() for value in request.query_params.get("ids", "").split(",") if value.strip()]
+        if not values:
+            raise ValidationError({"ids": ["A comma-separated list of freelancer ids is required."]})
+        if len(values) > self.max_batch:
+            raise ValidationError({"ids": [f"At most {self.max_batch} ids per request."]})
+        try:
+            ids = [int(value) for value in values]
+        except ValueError:
+            raise ValidationError({"ids": ["Ids must be integers."]})
+        return list(dict.fromkeys(ids))
+
+class ReviewViewSet(viewsets.ModelViewSet):
+    serializer_class = ReviewSerializer
+    authentication_classes = [ClerkAuthentication]
+
+    def get_permissions(self):
+        if self.action in ["list", "retrieve"]:
+            return [AllowAny()]
+        return [IsAuthenticated()]
+
+    def get_queryset(self):
+        freelancer_id = (
+            self.kwargs.get("freelancer_pk")
+            or self.kwargs.get("freelancer_id")
+        )
+
+        reviews = Review.objects.prefetch_related("replies").order_by("-created_at")
+        if self.action in ["list", "retrieve"]:
+            if "freelancer" in fieldset(self.request)[1]:
+                reviews = reviews.select_related("freelancer__profession")
+            reviews = shown_queryset(reviews, self.get_serializer())
+        if freelancer_id:
+            return reviews.filter(freelancer_id=freelancer_id)
+
+        return reviews
+
+    @serialized
+    def perform_create(self, serializer):
+        user = self.request.user
+        freelancer_id = (
+            self.kwargs.get("freelancer_pk")
+            or self.kwargs.get("freelancer_id")
+        )
+
+        freelancer = get_object_or_404(Freelancer, id=freelancer_id)
+
+        client_name = (
+            f"{user.first_name} {user.last_name}".strip()
+            or user.username
+        )
+        client_avatar = "".join(
+            part[0].upper() for part in client_name.split()[:2]
+        )
+
+        serializer.save(
+            freelancer=freelancer,
+            client=user,
+            client_name=client_name,
+            client_avatar=client_avatar,
+            helpful_count=0,
+        )
+
+    @action(detail=True, methods=["post"])
+    def add_reply(self, request, pk=None):
+        review = self.get_object()
+        serializer = ReviewReplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with serialized_write():
+            serializer.save(review=review)
+        return Response(serializer.data, status=201)
+
+    @action(detail=True, methods=["post"])
+    def mark_helpful(self, request, pk=None):
+        review = self.get_object()
+        user = request.user
+
+        with serialized_write():
+            helpful, created = ReviewHelpful.objects.get_or_create(
+                review=review,
+                user=user
+            )
+            if created:
+                # Increment in SQL so concurrent votes are not lost. update()
+                # sends no post_save, so drop the cached counts here.
+                Review.objects.filter(pk=review.pk).update(helpful_count=F("helpful_count") + 1)
+                transaction.on_commit(lambda: invalidate("reviews"))
+
+        if not created:
+            return Response(
+                {"detail": "You already marked this review as helpful."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        review.refresh_from_db(fields=["helpful_count"])
+        return Response(
+            {"helpful_count": review.helpful_count},
+            status=status.HTTP_200_OK
+        )
+
+class TestimonialViewSet(viewsets.ModelViewSet):
+    serializer_class = TestimonialSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        # Public users only see approved testimonials
+        if self.request.user.is_staff:
+            return Testimonial.objects.all().order_by("-created_at")
+        if self.action in ["update", "partial_update", "destroy"]:
+            return Testimonial.objects.filter(user=user)
+        return Testimonial.objects.filter(is_approved=True).order_by("-created_at")
+
+    def get_permissions(self):
+        if self.action in ["list", "retrieve"]:
+            return [AllowAny()]
+        elif self.action == "create":
+            return [IsAuthenticated()]
+        return [IsAdminUser()]
+    # def create(self, request, *args, **kwargs):
+    #     user = request.user
+
+    #     # 🚫 Rate-limit: only one testimonial per user
+    #     if Testimonial.objects.filter(name__iexact=user.get_full_name()).exists():
+    #         raise ValidationError({
+    #             "detail": "You have already submitted a testimonial."
+    #         })
+
+    #     return super().create(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        user = self.request.user
+
+        name = f"{user.first_name} {user.last_name}".strip() or user.username
+        avatar = "".join(part[0].upper() for part in name.split()[:2])
+
+        serializer.save(
+            user=user,
+            name=name,
+            avatar=avatar,
+            is_approved=False  # always require moderation
+        )
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return shown_queryset(super().get_queryset(), self.get_serializer())
+
+    @cache_response("jobs")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response("jobs")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
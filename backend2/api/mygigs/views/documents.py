@@ -0,0 +1,137 @@
+"""Freelancer documents: multipart uploads, resumable chunked uploads and
+protected downloads/previews."""
+import os
+
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .. import blobs, uploads
+from ..blobs import HashingUploadHandler
+from ..derivatives import preview_name
+from ..media import serve_file
+from ..models import DocumentUpload, Freelancer, FreelancerDocument
+from ..serializers import DocumentUploadSerializer, FreelancerDocumentSerializer
+
+
+class FreelancerDocumentViewSet(viewsets.ModelViewSet):
+    serializer_class = FreelancerDocumentSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get_queryset(self):
+        """
+        Only return documents belonging to the logged-in freelancer
+        (staff can read everyone's documents for verification)
+        """
+        documents = FreelancerDocument.objects.select_related("blob")
+        if self.request.user.is_staff and self.action in ("download", "preview"):
+            return documents
+        return documents.filter(freelancer__user=self.request.user)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """Send the document file after the ownership check in get_queryset."""
+        document = self.get_object()
+        filename = os.path.basename(document.file.name)
+        if document.title:
+            filename = document.title + os.path.splitext(filename)[1]
+        return serve_file(request, document.file.name, filename=filename)
+
+    @action(detail=True, methods=["get"])
+    def preview(self, request, pk=None):
+        """Send the rendered preview image, if there is one yet."""
+        document = self.get_object()
+        if not document.blob_id:
+            raise Http404("No preview available")
+        return serve_file(request, preview_name(document.blob.sha256))
+
+    def initial(self, request, *args, **kwargs):
+        # Hash uploads as they stream in, before DRF parses the body.
+        self.hashing_handler = HashingUploadHandler(request)
+        request.upload_handlers.insert(0, self.hashing_handler)
+        super().initial(request, *args, **kwargs)
+
+    def save_with_blob(self, serializer, **kwargs):
+        uploaded = serializer.validated_data.pop("file", None)
+        if uploaded is not None:
+            blob = blobs.store_uploaded_file(
+                uploaded, self.hashing_handler.digests.get("file")
+            )
+            kwargs.update(blob=blob, file=blob.file.name)
+        return serializer.save(**kwargs)
+
+    def perform_create(self, serializer):
+        """
+        Automatically attach document to the logged-in freelancer
+        """
+        freelancer = Freelancer.objects.get(user=self.request.user)
+        self.save_with_blob(serializer, freelancer=freelancer)
+
+    def perform_update(self, serializer):
+        old_blob_id = serializer.instance.blob_id
+        document = self.save_with_blob(serializer)
+        if old_blob_id and document.blob_id != old_blob_id:
+            blobs.release_blob(old_blob_id)
+
+class DocumentUploadViewSet(viewsets.GenericViewSet):
+    """
+    Chunked, resumable document uploads. See mygigs/uploads.py for the
+    protocol. Chunk bodies are read straight from the request stream and are
+    never parsed by DRF.
+    """
+    serializer_class = DocumentUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return DocumentUpload.objects.filter(freelancer__user=self.request.user)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        freelancer = get_object_or_404(Freelancer, user=request.user)
+        upload = serializer.save(freelancer=freelancer)
+        uploads.start_upload(upload)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def update(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            length = int(request.headers.get("Content-Length") or 0)
+        except ValueError:
+            return Response(
+                {"detail": "Upload-Offset and Content-Length headers are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            new_offset = uploads.write_chunk(upload, offset, request.stream, length)
+        except uploads.OffsetMismatch as e:
+            return Response(
+                {"detail": str(e), "offset": upload.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        except uploads.UploadError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"offset": new_offset})
+
+    def destroy(self, request, pk=None):
+        uploads.abort_upload(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            document = uploads.complete_upload(upload)
+        except uploads.UploadError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = FreelancerDocumentSerializer(document, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
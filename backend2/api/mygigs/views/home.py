@@ -0,0 +1,76 @@
+"""
+The landing page's data in one response: professions, featured
+freelancers, featured jobs and approved testimonials.
+
+Each section is cached on its own (api.cache.cached_sections), so saving a
+job only rebuilds the jobs section. A cold cache costs one query per
+section, a warm one none. The ETag is derived from the sections' digests,
+so clients revalidate without the body being assembled or sent.
+"""
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.decorators import api_view
+
+from api.cache import cached_encodings, cached_sections
+from api.renderers import dumps
+
+from ..models import Job, Testimonial
+from ..serializers import FreelancerListSerializer, JobSerializer, ProfessionSerializer, TestimonialSerializer
+from .catalog import FreelancerViewSet, ProfessionViewSet
+
+FEATURED_FREELANCERS = 8
+FEATURED_JOBS = 4
+TESTIMONIALS = 12
+
+
+def professions(request):
+    queryset = ProfessionViewSet.queryset.order_by("name")
+    return ProfessionSerializer(queryset, many=True, context={"request": request}).data
+
+
+# No request in the contexts below: ?fields= on this URL is not meant for
+# the sections' serializers.
+def featured_freelancers(request):
+    rows = FreelancerListSerializer.values(FreelancerViewSet.queryset.filter(is_featured=True))
+    return FreelancerListSerializer(rows[:FEATURED_FREELANCERS], many=True).data
+
+
+def featured_jobs(request):
+    queryset = Job.objects.filter(is_featured=True).order_by("-created_at")[:FEATURED_JOBS]
+    return JobSerializer(queryset, many=True).data
+
+
+def testimonials(request):
+    queryset = Testimonial.objects.filter(is_approved=True).order_by("-created_at")[:TESTIMONIALS]
+    return TestimonialSerializer(queryset, many=True).data
+
+
+# name: (response cache groups, builder)
+SECTIONS = {
+    "professions": (("professions", "freelancers"), professions),
+    "featured_freelancers": (("freelancers", "professions"), featured_freelancers),
+    "featured_jobs": (("jobs",), featured_jobs),
+    "testimonials": (("testimonials",), testimonials),
+}
+
+
+@api_view(["GET"])
+def homepage(request):
+    """Everything the landing page shows."""
+    sections = cached_sections(request, SECTIONS)
+    etag = quote_etag(hashlib.sha1(":".join(digest for _, digest in sections.values()).encode()).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    body = b"{" + b",".join(dumps(name) + b":" + section for name, (section, _) in sections.items()) + b"}"
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    # Cache, but revalidate: a 304 costs two cache reads.
+    response["Cache-Control"] = "no-cache"
+    response.precompressed = cached_encodings(etag, body)
+    return response
@@ -0,0 +1,432 @@
+"""
+M-Pesa (Daraja) payments: STK push, the payment callback and status checks.
+
+``requests`` (and, for the async STK push used under ASGI, ``httpx``) is
+imported inside the functions that call Daraja or Clerk so that workers
+which never take payments do not pay for importing it.
+"""
+import base64
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.asyncviews import async_api_view, json_response
+from api.http import async_client
+from api.metrics import observe_outbound
+from api.sqlite import serialized_write
+from api.throttling import IPThrottle, PhoneThrottle
+from users.models import ClerkProfile
+
+from ..models import MpesaTransaction
+from ..serializers import MpesaTransactionSerializer
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(["GET"])
+def check_subscription(request):
+    clerk_id = request.query_params.get("clerk_id")
+    has_subscription = MpesaTransaction.objects.filter(
+        clerk_id=clerk_id, status="successful"
+    ).exists()
+    return Response({"has_subscription": has_subscription})
+
+
+@api_view(["GET"])
+def transaction_status(request):
+    transaction_id = request.query_params.get("transaction_id")
+    transaction = MpesaTransaction.objects.filter(id=transaction_id).first()
+    if transaction:
+        return Response({"status": transaction.status})
+    return Response({"status": "not_found"}, status=status.HTTP_404_NOT_FOUND)
+
+MPESA_OAUTH_URL = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
+MPESA_STK_PUSH_URL = "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest"
+
+
+def get_access_token():
+    """
+    Fetches a new M-Pesa API access token using the consumer key and secret.
+    """
+    import requests
+    from requests.auth import HTTPBasicAuth
+
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    try:
+        consumer_key = settings.MPESA_CONFIG['CONSUMER_KEY']
+        consumer_secret = settings.MPESA_CONFIG['CONSUMER_SECRET']
+
+        if not consumer_key or not consumer_secret:
+            raise ValueError("CONSUMER_KEY or CONSUMER_SECRET not found in settings.")
+
+        # Use HTTP Basic Authentication to send the consumer key and secret
+        with observe_outbound("safaricom", "oauth_token"):
+            response = requests.get(MPESA_OAUTH_URL, auth=HTTPBasicAuth(consumer_key, consumer_secret))
+        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+
+        access_token = response.json().get('access_token')
+        if not access_token:
+            raise ValueError("Access token not found in API response.")
+
+        return access_token
+
+    except requests.exceptions.RequestException as e:
+        logger.error("Failed to get M-Pesa access token: %s", e)
+        return None
+    except ValueError as e:
+        logger.error("Error getting M-Pesa access token: %s", e)
+        return None
+
+
+async def aget_access_token():
+    """get_access_token() for async views, over the shared httpx client."""
+    import httpx
+
+    try:
+        consumer_key = settings.MPESA_CONFIG['CONSUMER_KEY']
+        consumer_secret = settings.MPESA_CONFIG['CONSUMER_SECRET']
+
+        if not consumer_key or not consumer_secret:
+            raise ValueError("CONSUMER_KEY or CONSUMER_SECRET not found in settings.")
+
+        with observe_outbound("safaricom", "oauth_token"):
+            response = await async_client().get(MPESA_OAUTH_URL, auth=(consumer_key, consumer_secret))
+        response.raise_for_status()
+
+        access_token = response.json().get('access_token')
+        if not access_token:
+            raise ValueError("Access token not found in API response.")
+
+        return access_token
+
+    except httpx.HTTPError as e:
+        logger.error("Failed to get M-Pesa access token: %s", e)
+        return None
+    except ValueError as e:
+        logger.error("Error getting M-Pesa access token: %s", e)
+        return None
+
+
+def mpesa_configured():
+    if all(settings.MPESA_CONFIG[key] for key in ("SHORTCODE", "PASSKEY", "CALLBACK_URL")):
+        return True
+    logger.error("M-Pesa STK push requested but MPESA_SHORTCODE/PASSKEY/CALLBACK_URL are not set")
+    return False
+
+
+def parse_stk_request(data):
+    """
+    ``(phone_number, amount, error)`` from an STK push request body; error
+    is the message for a 400 response, or None.
+    """
+    phone_number = data.get('phone_number')
+    amount = data.get('amount')
+    if not phone_number or not amount:
+        return None, None, "Missing phone_number or amount in request body."
+    try:
+        return phone_number, int(amount), None
+    except (ValueError, TypeError):
+        return None, None, "Invalid amount provided."
+
+
+def stk_push_payload(phone_number, amount):
+    """The Daraja STK push request body, with its timestamped password."""
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    password = base64.b64encode(
+        f"{settings.MPESA_CONFIG['SHORTCODE']}{settings.MPESA_CONFIG['PASSKEY']}{timestamp}".encode('utf-8')
+    ).decode('utf-8')
+
+    return {
+        "BusinessShortCode": settings.MPESA_CONFIG['SHORTCODE'],
+        "Password": password,
+        "Timestamp": timestamp,
+        "TransactionType": "CustomerPayBillOnline",
+        "Amount": amount,
+        "PartyA": phone_number,
+        "PartyB": settings.MPESA_CONFIG['SHORTCODE'],
+        "PhoneNumber": phone_number,
+        "CallBackURL": settings.MPESA_CONFIG['CALLBACK_URL'],
+        "AccountReference": "MyCompany",
+        "TransactionDesc": "Payment for an item"
+    }
+
+
+class MpesaSTKPushAPIView(APIView):
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    # Every call costs a Safaricom request and prompts a handset.
+    throttle_scope = "stk_push"
+    throttle_classes = [IPThrottle, PhoneThrottle]
+
+    def post(self, request, *args, **kwargs):
+        import requests
+
+        if not mpesa_configured():
+            return Response(
+                {"error": "M-Pesa payments are not configured."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        # 1. First, get a new access token
+        access_token = get_access_token()
+        if not access_token:
+            return Response(
+                {"error": "Could not get an M-Pesa access token."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        clerk_id = request.data.get('clerk_id')
+
+        # 2. Validate incoming data from the frontend
+        phone_number, amount, error = parse_stk_request(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 3. Make the STK Push API request with the fetched access token
+        try:
+            with observe_outbound("safaricom", "stk_push"):
+                response = requests.post(
+                    MPESA_STK_PUSH_URL,
+                    json=stk_push_payload(phone_number, amount),
+                    headers={"Authorization": f"Bearer {access_token}"}
+                )
+            response.raise_for_status()
+            
+            response_data = response.json()
+            MpesaTransaction.objects.create(
+                merchant_request_id=response_data.get('MerchantRequestID'),
+                checkout_request_id=response_data.get('CheckoutRequestID'),
+                phone_number=phone_number,
+                amount=amount,
+                clerk_id=clerk_id
+
+            )
+            return Response(response_data, status=response.status_code)
+
+        except requests.exceptions.RequestException as e:
+            logger.error("M-Pesa STK Push request failed: %s", e)
+            return Response(
+                {"error": "Failed to connect to M-Pesa API. Check your network or API keys."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        except Exception as e:
+            logger.exception("Unexpected error during M-Pesa STK Push")
+            return Response(
+                {"error": "An internal server error occurred."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@async_api_view(["POST"], throttle_scope="stk_push", throttles=[IPThrottle, PhoneThrottle])
+async def async_stk_push(request):
+    """MpesaSTKPushAPIView for ASGI: waits on Daraja without holding a thread."""
+    import httpx
+
+    if not mpesa_configured():
+        return json_response({"error": "M-Pesa payments are not configured."}, status=503)
+
+    access_token = await aget_access_token()
+    if not access_token:
+        return json_response({"error": "Could not get an M-Pesa access token."}, status=503)
+    clerk_id = request.data.get('clerk_id')
+
+    phone_number, amount, error = parse_stk_request(request.data)
+    if error:
+        return json_response({"error": error}, status=400)
+
+    try:
+        with observe_outbound("safaricom", "stk_push"):
+            response = await async_client().post(
+                MPESA_STK_PUSH_URL,
+                json=stk_push_payload(phone_number, amount),
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+        response.raise_for_status()
+
+        response_data = response.json()
+        await MpesaTransaction.objects.acreate(
+            merchant_request_id=response_data.get('MerchantRequestID'),
+            checkout_request_id=response_data.get('CheckoutRequestID'),
+            phone_number=phone_number,
+            amount=amount,
+            clerk_id=clerk_id
+        )
+        return json_response(response_data, status=response.status_code)
+
+    except httpx.HTTPError as e:
+        logger.error("M-Pesa STK Push request failed: %s", e)
+        return json_response(
+            {"error": "Failed to connect to M-Pesa API. Check your network or API keys."}, status=503
+        )
+
+    except Exception:
+        logger.exception("Unexpected error during M-Pesa STK Push")
+        return json_response({"error": "An internal server error occurred."}, status=500)
+
+class MpesaCallbackAPIView(APIView):
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    def post(self, request, *args, **kwargs):
+        callback_data = request.data.get('Body', {}).get('stkCallback', {})
+        merchant_request_id = callback_data.get('MerchantRequestID')
+        checkout_request_id = callback_data.get('CheckoutRequestID')
+        result_code = callback_data.get('ResultCode')
+        result_desc = callback_data.get('ResultDesc')
+        logger.info(
+            "M-Pesa callback received",
+            extra={"checkout_request_id": checkout_request_id, "result_code": result_code},
+        )
+
+        try:
+            transaction = MpesaTransaction.objects.get(
+                merchant_request_id=merchant_request_id,
+                checkout_request_id=checkout_request_id
+            )
+        except MpesaTransaction.DoesNotExist:
+            logger.warning("M-Pesa callback for unknown transaction %s / %s", merchant_request_id, checkout_request_id)
+            return Response({"ResultCode": 0, "ResultDesc": "Success"}, status=status.HTTP_200_OK)
+
+        
+        if result_code == 0:
+            callback_metadata = callback_data.get('CallbackMetadata', {}).get('Item', [])
+            
+            amount = None
+            mpesa_receipt_number = None
+            transaction_date = None
+            phone_number = None
+
+            for item in callback_metadata:
+                if item['Name'] == 'Amount':
+                    amount = item['Value']
+                elif item['Name'] == 'MpesaReceiptNumber':
+                    mpesa_receipt_number = item['Value']
+                elif item['Name'] == 'TransactionDate':
+                    transaction_date = datetime.strptime(str(item['Value']), '%Y%m%d%H%M%S')
+                elif item['Name'] == 'PhoneNumber':
+                    phone_number = item['Value']
+
+            try:
+                transaction = MpesaTransaction.objects.get(
+                    merchant_request_id=merchant_request_id,
+                    checkout_request_id=checkout_request_id
+                )
+                
+                transaction.result_code = result_code
+                transaction.result_desc = result_desc
+                transaction.amount = amount
+                transaction.mpesa_receipt_number = mpesa_receipt_number
+                transaction.transaction_date = transaction_date
+                transaction.phone_number = phone_number
+                with serialized_write():
+                    transaction.save()
+
+                clerk_id = transaction.clerk_id
+
+                if clerk_id:
+                    try:
+                        user = ClerkProfile.objects.get(clerk_id=clerk_id)
+                        user.role = 'freelancer'  # or user.is_freelancer = True
+                        with serialized_write():
+                            user.save(update_fields=["role"])
+                        update_clerk_role_to_freelancer(clerk_id)
+                    except ClerkProfile.DoesNotExist:
+                        logger.warning("No ClerkProfile for clerk_id %s in M-Pesa callback", clerk_id)
+                
+                logger.info("M-Pesa transaction %s completed", mpesa_receipt_number)
+
+            except MpesaTransaction.DoesNotExist:
+                logger.warning("M-Pesa transaction %s disappeared during callback", checkout_request_id)
+
+        else:
+            logger.info("M-Pesa transaction %s failed: %s %s", checkout_request_id, result_code, result_desc)
+            try:
+                transaction = MpesaTransaction.objects.get(
+                    merchant_request_id=merchant_request_id,
+                    checkout_request_id=checkout_request_id
+                )
+                transaction.result_code = result_code
+                transaction.result_desc = result_desc
+                with serialized_write():
+                    transaction.save(update_fields=["result_code", "result_desc", "updated_at"])
+            except MpesaTransaction.DoesNotExist:
+                logger.warning("M-Pesa transaction %s disappeared during callback", checkout_request_id)
+
+        return Response({"ResultCode": 0, "ResultDesc": "Success"}, status=status.HTTP_200_OK)
+
+
+class MpesaTransactionListAPIView(ListAPIView):
+    """
+    API view to list all M-Pesa transactions.
+    """
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    queryset = MpesaTransaction.objects.all().order_by('-created_at')
+    serializer_class = MpesaTransactionSerializer
+
+class MpesaTransactionStatusAPIView(APIView):
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    authentication_classes = []  # ✅ Disable Clerk auth for this view
+    permission_classes = [AllowAny]
+    def get(self, request, checkout_request_id, *args, **kwargs):
+        try:
+            # Find the transaction by its CheckoutRequestID
+            mpesa_transaction = MpesaTransaction.objects.get(checkout_request_id=checkout_request_id)
+            
+            # Return the status based on the ResultCode
+            if mpesa_transaction.result_code == "0":
+                return Response({"status": "success"}, status=status.HTTP_200_OK)
+            elif mpesa_transaction.result_code:
+                # If there is a ResultCode, but it's not "0", it's a failure
+                return Response({"status": "failed"}, status=status.HTTP_200_OK)
+            else:
+                # Still pending if no ResultCode is available
+                return Response({"status": "pending"}, status=status.HTTP_200_OK)
+        
+        except MpesaTransaction.DoesNotExist:
+            return Response({"status": "pending"}, status=status.HTTP_200_OK)
+        except Exception as e:
+            # Catch-all for any other unexpected error
+            logger.exception("Error checking transaction status for %s", checkout_request_id)
+            return Response({"status": "error", "message": "An internal server error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+
+def update_clerk_role_to_freelancer(clerk_id):
+    import requests
+
+    CLERK_API_KEY = settings.MPESA_CONFIG['CLERK_SECRET_KEY']   
+    if not CLERK_API_KEY:
+        logger.error("CLERK_SECRET_KEY not set; cannot update role for %s", clerk_id)
+        return
+
+    headers = {
+        "Authorization": f"Bearer {CLERK_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    data = {
+        "public_metadata": {
+            "role": "freelancer"
+        }
+    }
+    with observe_outbound("clerk", "update_user"):
+        resp = requests.patch(
+            f"https://api.clerk.com/v1/users/{clerk_id}",
+            headers=headers,
+            json=data
+        )
+    if resp.ok:
+        logger.info("Clerk role updated to freelancer for %s", clerk_id)
+    else:
+        logger.error("Clerk role update for %s failed: %s %s", clerk_id, resp.status_code, resp.text[:500])
@@ -0,0 +1,68 @@
+"""Clerk webhooks. svix is imported on first delivery; it is slow to import."""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from users.webhooks import ingest_event
+
+logger = logging.getLogger(__name__)
+
+
+def verify_clerk_webhook(request):
+    """
+    Check the svix signature. Returns ``(event, None)`` for a genuine
+    delivery, else ``(None, response)`` with the response to send.
+    """
+    # Get the webhook signing secret from your environment variables
+    # This secret is configured in your Clerk Dashboard
+    webhook_secret = settings.MPESA_CONFIG['CLERK_WEBHOOK_SECRET']
+    if not webhook_secret:
+        logger.error("Clerk webhook received but CLERK_WEBHOOK_SECRET is not set.")
+        return None, HttpResponse(status=503)
+
+    from svix.webhooks import Webhook, WebhookVerificationError
+
+    # Get webhook headers and payload from the request
+    headers = request.headers
+    payload = request.body.decode('utf-8')
+
+    try:
+        # Verify the webhook signature
+        wh = Webhook(webhook_secret)
+        wh.verify(payload, headers)
+    except WebhookVerificationError:
+        logger.warning("Clerk webhook verification failed.")
+        return None, HttpResponse(status=400)
+
+    # Newer svix releases return None from verify(), so parse the body here.
+    return json.loads(payload), None
+
+
+@csrf_exempt
+def clerk_webhook_handler(request):
+    """
+    Verify a Clerk webhook and store it in the inbox.
+
+    Processing happens in the ``process_clerk_webhooks`` worker so Clerk
+    gets its 200 straight away; retries with an svix-id we already hold are
+    acknowledged without storing anything.
+    """
+    evt, error = verify_clerk_webhook(request)
+    if error:
+        return error
+    ingest_event(request.headers.get("svix-id"), request.headers.get("svix-timestamp"), evt)
+    return HttpResponse(status=200)
+
+
+@csrf_exempt
+async def async_clerk_webhook_handler(request):
+    """clerk_webhook_handler for ASGI; only the inbox insert needs a thread."""
+    evt, error = verify_clerk_webhook(request)
+    if error:
+        return error
+    await sync_to_async(ingest_event)(request.headers.get("svix-id"), request.headers.get("svix-timestamp"), evt)
+    return HttpResponse(status=200)
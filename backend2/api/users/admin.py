@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import ClerkProfile
+from .models import ClerkProfile, ClerkWebhookEvent
 
 # Register your models here.
-admin.site.register(ClerkProfile)
\ No newline at end of file
+admin.site.register(ClerkProfile)
+
+class ClerkWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('svix_id', 'event_type', 'clerk_id', 'svix_timestamp', 'processed_at', 'attempts')
+    list_filter = ('event_type', 'processed_at')
+    search_fields = ('svix_id', 'clerk_id')
+admin.site.register(ClerkWebhookEvent, ClerkWebhookEventAdmin)
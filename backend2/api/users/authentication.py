@@ -1,56 +1,107 @@
+import logging
 
-
-import requests
-from jose import jwt
-from jose.utils import base64url_decode
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from rest_framework import authentication, exceptions
+from api.metrics import observe_outbound
+from api.throttling import check_auth_failures, record_auth_failure
 from users.utils import get_or_create_user_from_clerk
 
+logger = logging.getLogger(__name__)
+
 
 class ClerkAuthentication(authentication.BaseAuthentication):
 
     def authenticate(self, request):
+        token = self.get_token(request)
+        if token is None:
+            return None
+
+        # Imported here rather than at module level: it is slow to import
+        # and only needed once a bearer token actually shows up.
+        import requests
+
+        check_auth_failures(request)
+        try:
+            # Step 1 — load JWKS from Clerk
+            with observe_outbound("clerk", "jwks"):
+                jwks = requests.get(settings.CLERK_JWKS_URL).json()["keys"]
+        except Exception as e:
+            raise self.rejected(e)
+
+        try:
+            payload = self.decode(token, jwks)
+        except Exception as e:
+            # Only bad tokens count towards the per-IP limit, not Clerk outages.
+            record_auth_failure(request)
+            raise self.rejected(e)
+
+        return (self.get_user(payload), None)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views: the JWKS is fetched without blocking
+        the event loop and the user lookup runs on the request's sync thread.
+        """
+        token = self.get_token(request)
+        if token is None:
+            return None
+
+        from api.http import async_client
+
+        await sync_to_async(check_auth_failures)(request)
+        try:
+            with observe_outbound("clerk", "jwks"):
+                response = await async_client().get(settings.CLERK_JWKS_URL)
+                jwks = response.json()["keys"]
+        except Exception as e:
+            raise self.rejected(e)
+
+        try:
+            payload = self.decode(token, jwks)
+        except Exception as e:
+            await sync_to_async(record_auth_failure)(request)
+            raise self.rejected(e)
+
+        return (await sync_to_async(self.get_user)(payload), None)
+
+    def get_token(self, request):
         auth_header = request.headers.get("Authorization")
 
         if not auth_header or not auth_header.startswith("Bearer "):
             return None
 
-        token = auth_header.split(" ")[1]
-        print("\n============== Clerk Authentication Debug ==============")
-        print("Incoming Token:", token[:50] + "..." if token else "None")
+        return auth_header.split(" ")[1]
 
-        try:
-            # Step 1 — load JWKS from Clerk
-            jwks_url = f"https://{settings.CLERK_DOMAIN}/.well-known/jwks.json"
-            jwks = requests.get(jwks_url).json()["keys"]
+    def decode(self, token, jwks):
+        from jose import jwt
 
-            # Step 2 — get KID from the token header
-            headers = jwt.get_unverified_header(token)
-            kid = headers.get("kid")
+        # Step 2 — get KID from the token header
+        headers = jwt.get_unverified_header(token)
+        kid = headers.get("kid")
 
-            if not kid:
-                raise exceptions.AuthenticationFailed("Missing KID in token header")
+        if not kid:
+            raise exceptions.AuthenticationFailed("Missing KID in token header")
 
-            # Step 3 — find matching public key
-            public_key = next((key for key in jwks if key["kid"] == kid), None)
+        # Step 3 — find matching public key
+        public_key = next((key for key in jwks if key["kid"] == kid), None)
 
-            if not public_key:
-                raise exceptions.AuthenticationFailed("Matching JWKS key not found")
+        if not public_key:
+            raise exceptions.AuthenticationFailed("Matching JWKS key not found")
 
-            # Step 4 — verify token using the correct key
-            payload = jwt.decode(
-                token,
-                public_key,
-                algorithms=["RS256"],
-                options={"verify_aud": False},
-            )
-            print("Decoded Payload:", payload)
+        # Step 4 — verify token using the correct key
+        return jwt.decode(
+            token,
+            public_key,
+            algorithms=["RS256"],
+            options={"verify_aud": False},
+        )
 
-        except Exception as e:
-            print("JWT Verification Error:", e)
-            raise exceptions.AuthenticationFailed(f"Invalid Clerk token: {str(e)}")
+    def rejected(self, e):
+        logger.info("Clerk token rejected: %s", e)
+        return exceptions.AuthenticationFailed(f"Invalid Clerk token: {str(e)}")
 
+    def get_user(self, payload):
         clerk_id = payload.get("sub")
         email = payload.get("email")
         full_name = payload.get("full_name", "")
@@ -60,12 +111,6 @@ class ClerkAuthentication(authentication.BaseAuthentication):
         if not clerk_id:
             raise exceptions.AuthenticationFailed("Token missing Clerk user ID")
 
-        print("Clerk ID:", clerk_id)
-        print("Email:", email)
-        print("Name:", full_name)
-        print("Role:", role)
-        print("=======================================================\n")
-
         user = get_or_create_user_from_clerk(
             clerk_id,
             email,
@@ -74,6 +119,6 @@ class ClerkAuthentication(authentication.BaseAuthentication):
             role
         )
 
-        print("Authenticated Django User:", user.id, user.username, "\n")
+        logger.debug("Clerk user %s authenticated as user %s", clerk_id, user.id)
 
-        return (user, None)
+        return user
@@ -0,0 +1,101 @@
+import json
+import random
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from svix.webhooks import Webhook
+
+from api.benchmarking import rate, stopwatch, throwaway_database
+from users.models import ClerkProfile, ClerkWebhookEvent
+from users.webhooks import apply_events, process_pending_events
+
+
+def fake_user_event(clerk_id, event_type, n):
+    return {
+        "type": event_type,
+        "object": "event",
+        "data": {
+            "id": clerk_id,
+            "first_name": f"First{n}",
+            "last_name": f"Last{n}",
+            "image_url": f"https://img.clerk.com/{clerk_id}.png",
+            "primary_email_address_id": f"idn_{clerk_id}",
+            "email_addresses": [
+                {"id": f"idn_{clerk_id}", "email_address": f"{clerk_id}@example.com"}
+            ],
+            "public_metadata": {"role": "user"},
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Clerk webhook ingestion and batched processing against "
+        "per-event processing, on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument(
+            "--duplicates", type=float, default=0.1,
+            help="Fraction of deliveries that are retries of an earlier svix-id.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        wh = Webhook(settings.MPESA_CONFIG["CLERK_WEBHOOK_SECRET"])
+
+        deliveries = []
+        for n in range(options["events"]):
+            if deliveries and rng.random() < options["duplicates"]:
+                deliveries.append(rng.choice(deliveries))
+                continue
+            clerk_id = f"user_bench{rng.randrange(options['users'])}"
+            event_type = "user.created" if n < options["users"] else "user.updated"
+            body = json.dumps(fake_user_event(clerk_id, event_type, n))
+            msg_id = f"msg_{uuid.uuid4().hex}"
+            now = timezone.now()
+            deliveries.append((body, {
+                "HTTP_SVIX_ID": msg_id,
+                "HTTP_SVIX_TIMESTAMP": str(int(now.timestamp())),
+                "HTTP_SVIX_SIGNATURE": wh.sign(msg_id, now, body),
+            }))
+
+        with throwaway_database():
+            client = Client()
+            url = reverse("clerk-webhook")
+            with stopwatch() as ingest:
+                for body, headers in deliveries:
+                    client.post(url, body, content_type="application/json", **headers)
+            stored = ClerkWebhookEvent.objects.count()
+
+            with stopwatch() as batched:
+                while process_pending_events(batch_size=options["batch_size"]):
+                    pass
+            profiles = ClerkProfile.objects.count()
+
+            # Same events applied one at a time, as the old inline handler did.
+            ClerkWebhookEvent.objects.update(processed_at=None)
+            events = list(ClerkWebhookEvent.objects.order_by("svix_timestamp", "id"))
+            with stopwatch() as single:
+                for event in events:
+                    apply_events([event])
+
+        self.stdout.write(
+            f"ingest:      {len(deliveries)} deliveries, {stored} stored, "
+            f"{rate(len(deliveries), ingest['seconds']):.0f} req/s"
+        )
+        self.stdout.write(
+            f"batched:     {stored} events -> {profiles} profiles, "
+            f"{rate(stored, batched['seconds']):.0f} events/s"
+        )
+        self.stdout.write(
+            f"per-event:   {rate(stored, single['seconds']):.0f} events/s"
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply stored Clerk webhook events to User and ClerkProfile rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval", type=float, default=1.0,
+            help="Seconds to sleep when the inbox is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Drain the inbox and exit instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            handled = process_pending_events(batch_size=batch_size)
+            total += handled
+            if handled:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} webhook events."))
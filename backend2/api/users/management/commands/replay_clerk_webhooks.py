@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from users.models import ClerkWebhookEvent
+from users.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark stored Clerk webhook events as pending again so the worker "
+        "re-applies them in their original order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("svix_ids", nargs="*", help="Replay only these svix ids.")
+        parser.add_argument("--clerk-id", help="Replay events for one Clerk user.")
+        parser.add_argument("--since", help="Replay events sent at or after this ISO datetime.")
+        parser.add_argument(
+            "--failed", action="store_true",
+            help="Replay only events that gave up after repeated errors.",
+        )
+        parser.add_argument(
+            "--apply", action="store_true",
+            help="Process the replayed events now instead of leaving them to the worker.",
+        )
+
+    def handle(self, *args, **options):
+        events = ClerkWebhookEvent.objects.all()
+        if options["svix_ids"]:
+            events = events.filter(svix_id__in=options["svix_ids"])
+        if options["clerk_id"]:
+            events = events.filter(clerk_id=options["clerk_id"])
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError(f"Invalid --since datetime: {options['since']}")
+            events = events.filter(svix_timestamp__gte=since)
+        if options["failed"]:
+            events = events.filter(processed_at__isnull=True).exclude(last_error="")
+
+        count = events.update(processed_at=None, attempts=0, last_error="")
+        self.stdout.write(f"Queued {count} events for replay.")
+
+        if options["apply"]:
+            total = 0
+            while handled := process_pending_events():
+                total += handled
+            self.stdout.write(self.style.SUCCESS(f"Processed {total} webhook events."))
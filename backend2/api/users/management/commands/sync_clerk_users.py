@@ -0,0 +1,106 @@
+import json
+import os
+from itertools import islice
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.utils import bulk_upsert_clerk_users, clerk_user_record
+
+CLERK_USERS_URL = "https://api.clerk.com/v1/users"
+
+
+def iter_api_users(offset, page_size, timeout=30):
+    """Page through the Clerk users API in creation order."""
+    secret_key = settings.MPESA_CONFIG['CLERK_SECRET_KEY']
+    if not secret_key:
+        raise CommandError("CLERK_SECRET_KEY is not configured.")
+
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {secret_key}"
+    while True:
+        resp = session.get(
+            CLERK_USERS_URL,
+            params={"limit": page_size, "offset": offset, "order_by": "+created_at"},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        page = resp.json()
+        if isinstance(page, dict):
+            page = page.get("data", [])
+        yield from page
+        if len(page) < page_size:
+            return
+        offset += len(page)
+
+
+def iter_file_users(path, offset):
+    """
+    Read users from a local dump: either a JSON array as returned by the
+    users API, or one user object per line (JSON Lines), which is streamed.
+    """
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            users = iter(json.load(f))
+        else:
+            users = (json.loads(line) for line in f if line.strip())
+        yield from islice(users, offset, None)
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill User and ClerkProfile rows from the Clerk users API or a "
+        "local JSON dump, in batched upserts. Progress is checkpointed so an "
+        "interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", help="Read users from a JSON / JSON Lines dump instead of the API.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--page-size", type=int, default=500, help="Clerk API page size (max 500).")
+        parser.add_argument(
+            "--checkpoint", default="clerk_sync.checkpoint.json",
+            help="File recording how many users have been synced.",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint.")
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"]
+        offset = 0
+        if os.path.exists(checkpoint) and not options["restart"]:
+            with open(checkpoint) as f:
+                offset = json.load(f).get("offset", 0)
+            self.stdout.write(f"Resuming from offset {offset}.")
+
+        if options["file"]:
+            users = iter_file_users(options["file"], offset)
+        else:
+            users = iter_api_users(offset, min(options["page_size"], 500))
+
+        synced = 0
+        for batch in batched(users, options["batch_size"]):
+            with transaction.atomic():
+                synced += bulk_upsert_clerk_users(
+                    clerk_user_record(u) for u in batch
+                )
+            offset += len(batch)
+            with open(f"{checkpoint}.tmp", "w") as f:
+                json.dump({"offset": offset}, f)
+            os.replace(f"{checkpoint}.tmp", checkpoint)
+            self.stdout.write(f"Synced {offset} users...")
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} Clerk users."))
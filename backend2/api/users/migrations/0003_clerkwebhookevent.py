@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_clerkprofile_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClerkWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('svix_id', models.CharField(max_length=255, unique=True)),
+                ('svix_timestamp', models.DateTimeField()),
+                ('event_type', models.CharField(max_length=100)),
+                ('clerk_id', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['svix_timestamp', 'id'],
+                'indexes': [models.Index(fields=['processed_at', 'svix_timestamp'], name='users_clerk_process_ec1049_idx')],
+            },
+        ),
+    ]
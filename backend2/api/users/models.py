@@ -9,3 +9,30 @@ class ClerkProfile(models.Model):
 
     def __str__(self):
         return f"Clerk profile for {self.user.username}"
+
+
+class ClerkWebhookEvent(models.Model):
+    """Raw Clerk webhook delivery, stored before it is applied.
+
+    Deliveries are keyed by the ``svix-id`` header so retries and replays of
+    the same message are stored once. ``process_clerk_webhooks`` applies them
+    in ``svix-timestamp`` order.
+    """
+    svix_id = models.CharField(max_length=255, unique=True)
+    svix_timestamp = models.DateTimeField()
+    event_type = models.CharField(max_length=100)
+    clerk_id = models.CharField(max_length=255, blank=True, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['svix_timestamp', 'id']
+        indexes = [
+            models.Index(fields=['processed_at', 'svix_timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.svix_id}"
@@ -1,3 +1,181 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import logging
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from svix.webhooks import Webhook
+
+from api.log import BackgroundHandler, SamplingFilter, redact
+
+from .models import ClerkProfile, ClerkWebhookEvent
+from .utils import bulk_upsert_clerk_users, clerk_user_record, get_or_create_user_from_clerk
+
+WEBHOOK_SECRET = "whsec_" + base64.b64encode(b"users-tests-webhook-secret").decode()
+
+
+def clerk_user(clerk_id, first_name="Amina", role="user"):
+    """A Clerk user object, as in webhook ``data`` and the users API."""
+    return {
+        "id": clerk_id,
+        "first_name": first_name,
+        "last_name": "Otieno",
+        "image_url": f"https://img.clerk.com/{clerk_id}.png",
+        "primary_email_address_id": "idn_1",
+        "email_addresses": [{"id": "idn_1", "email_address": f"{clerk_id}@example.com"}],
+        "public_metadata": {"role": role},
+    }
+
+
+class LoggingTests(SimpleTestCase):
+
+    def test_redacts_tokens_and_phone_numbers(self):
+        text = redact(
+            "Authorization: Bearer abc.def-ghi token=s3cret "
+            "jwt eyJhbGciOi.eyJzdWIiOi.sig phone 254712345678 or 0712345678"
+        )
+        self.assertNotIn("abc.def-ghi", text)
+        self.assertNotIn("s3cret", text)
+        self.assertNotIn("eyJzdWIiOi", text)
+        self.assertNotIn("254712345678", text)
+        self.assertNotIn("0712345678", text)
+        self.assertIn("[PHONE]***678", text)
+
+    def test_redacts_spaced_phone_numbers(self):
+        for phone in ("+254 712 345 678", "254-712-345-678", "0712 345 678", "0112-345678"):
+            self.assertEqual(redact(f"STK push for {phone}"), "STK push for [PHONE]***678", phone)
+
+    def test_sampling_applies_to_info_only(self):
+        sampler = SamplingFilter({"users.authentication": 0.0})
+        info = logging.makeLogRecord({"name": "users.authentication.sub", "levelno": logging.INFO})
+        warning = logging.makeLogRecord({"name": "users.authentication", "levelno": logging.WARNING})
+        other = logging.makeLogRecord({"name": "mygigs.views", "levelno": logging.INFO})
+        self.assertFalse(sampler.filter(info))
+        self.assertTrue(sampler.filter(warning))
+        self.assertTrue(sampler.filter(other))
+
+    def test_background_handler_writes_redacted_json(self):
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream)
+        logger = logging.getLogger("users.tests.background")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning("STK push for %s", "254712345678", extra={"checkout_request_id": "ws_CO_1"})
+        finally:
+            handler.stop()
+            logger.removeHandler(handler)
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["message"], "STK push for [PHONE]***678")
+        self.assertEqual(entry["checkout_request_id"], "ws_CO_1")
+
+
+@override_settings(MPESA_CONFIG=dict(settings.MPESA_CONFIG, CLERK_WEBHOOK_SECRET=WEBHOOK_SECRET))
+class ClerkWebhookTests(TestCase):
+
+    def deliver(self, msg_id, evt):
+        body = json.dumps(evt)
+        now = timezone.now()
+        return self.client.post(
+            reverse("clerk-webhook"), body, content_type="application/json",
+            HTTP_SVIX_ID=msg_id,
+            HTTP_SVIX_TIMESTAMP=str(int(now.timestamp())),
+            HTTP_SVIX_SIGNATURE=Webhook(WEBHOOK_SECRET).sign(msg_id, now, body),
+        )
+
+    def test_retries_are_stored_once_and_applied(self):
+        evt = {"type": "user.created", "object": "event", "data": clerk_user("user_abc")}
+        self.assertEqual(self.deliver("msg_1", evt).status_code, 200)
+        self.assertEqual(self.deliver("msg_1", evt).status_code, 200)
+        self.assertEqual(ClerkWebhookEvent.objects.count(), 1)
+        self.assertFalse(User.objects.filter(username="user_user_abc").exists())
+
+        call_command("process_clerk_webhooks", "--once", stdout=io.StringIO())
+        user = User.objects.get(username="user_user_abc")
+        self.assertEqual((user.first_name, user.email), ("Amina", "user_abc@example.com"))
+        self.assertEqual(user.clerk_profile.clerk_id, "user_abc")
+        event = ClerkWebhookEvent.objects.get()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(event.last_error, "")
+
+    def test_update_and_replay(self):
+        self.deliver("msg_1", {"type": "user.created", "data": clerk_user("user_abc")})
+        self.deliver("msg_2", {"type": "user.updated", "data": clerk_user("user_abc", "Wanjiru", "admin")})
+        call_command("process_clerk_webhooks", "--once", stdout=io.StringIO())
+        profile = ClerkProfile.objects.select_related("user").get(clerk_id="user_abc")
+        self.assertEqual((profile.user.first_name, profile.role), ("Wanjiru", "admin"))
+        self.assertEqual(User.objects.filter(username="user_user_abc").count(), 1)
+
+        # A replay re-applies the stored events in order: the last one wins.
+        User.objects.filter(pk=profile.user_id).update(first_name="Changed")
+        call_command("replay_clerk_webhooks", "--clerk-id", "user_abc", "--apply", stdout=io.StringIO())
+        profile.user.refresh_from_db()
+        self.assertEqual(profile.user.first_name, "Wanjiru")
+        self.assertFalse(ClerkWebhookEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_bad_signature_is_not_stored(self):
+        with self.assertLogs("mygigs.views.webhooks", "WARNING"):
+            response = self.client.post(
+                reverse("clerk-webhook"), json.dumps({"type": "user.created", "data": clerk_user("user_abc")}),
+                content_type="application/json",
+                HTTP_SVIX_ID="msg_1",
+                HTTP_SVIX_TIMESTAMP=str(int(timezone.now().timestamp())),
+                HTTP_SVIX_SIGNATURE="v1,bm90IGEgc2lnbmF0dXJl",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClerkWebhookEvent.objects.exists())
+
+
+class ClerkUserSyncTests(TestCase):
+
+    def test_upserting_twice_updates_in_place(self):
+        first = [clerk_user_record(clerk_user(f"user_{n}")) for n in range(3)]
+        self.assertEqual(bulk_upsert_clerk_users(first), 3)
+        second = [clerk_user_record(clerk_user(f"user_{n}", "Wanjiru", "admin")) for n in range(3)]
+        self.assertEqual(bulk_upsert_clerk_users(second), 3)
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(ClerkProfile.objects.count(), 3)
+        self.assertEqual(set(User.objects.values_list("first_name", flat=True)), {"Wanjiru"})
+        self.assertEqual(set(ClerkProfile.objects.values_list("role", flat=True)), {"admin"})
+
+    def test_updates_users_created_on_login(self):
+        user = get_or_create_user_from_clerk("user_1", "old@example.com", "Old")
+        bulk_upsert_clerk_users([clerk_user_record(clerk_user("user_1"))])
+        user.refresh_from_db()
+        self.assertEqual((user.first_name, user.email), ("Amina", "user_1@example.com"))
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(user.clerk_profile.clerk_id, "user_1")
+
+    def test_sync_command_is_idempotent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dump = os.path.join(tmp, "users.jsonl")
+            with open(dump, "w") as f:
+                for n in range(5):
+                    f.write(json.dumps(clerk_user(f"user_{n}")) + "\n")
+            checkpoint = os.path.join(tmp, "checkpoint.json")
+            for _ in range(2):
+                call_command(
+                    "sync_clerk_users", "--file", dump, "--batch-size", "2",
+                    "--checkpoint", checkpoint, stdout=io.StringIO(),
+                )
+            self.assertFalse(os.path.exists(checkpoint))
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(ClerkProfile.objects.count(), 5)
+
+    def test_login_rechecks_the_primary(self):
+        # The profile exists on the primary, but the replica has not caught up.
+        user = get_or_create_user_from_clerk("user_1", "user_1@example.com")
+        with mock.patch.object(ClerkProfile.objects, "get", side_effect=ClerkProfile.DoesNotExist):
+            self.assertEqual(get_or_create_user_from_clerk("user_1", "user_1@example.com"), user)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(ClerkProfile.objects.count(), 1)
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.db import router
 from .models import ClerkProfile
 from mygigs.models import Freelancer
 
@@ -22,7 +23,12 @@ def get_or_create_user_from_clerk(clerk_id, email, first_name="", last_name="",
         return profile.user
 
     except ClerkProfile.DoesNotExist:
-        pass
+        # A replica may not have the profile yet; check the primary before
+        # creating a duplicate user.
+        primary = router.db_for_write(ClerkProfile)
+        profile = ClerkProfile.objects.db_manager(primary).filter(clerk_id=clerk_id).first()
+        if profile is not None:
+            return profile.user
 
     # Create new Django user
     username = f"user_{clerk_id}"
@@ -50,3 +56,76 @@ def get_or_create_freelancer(user):
     """
     freelancer, created = Freelancer.objects.get_or_create(user=user)
     return freelancer
+
+
+def clerk_user_record(data):
+    """
+    Flatten a Clerk user object (webhook ``data`` or users API item)
+    into the fields we keep on User and ClerkProfile.
+    """
+    emails = data.get("email_addresses") or [{}]
+    primary_id = data.get("primary_email_address_id")
+    email = next(
+        (e.get("email_address") for e in emails if e.get("id") == primary_id),
+        emails[0].get("email_address"),
+    )
+    public_metadata = data.get("public_metadata") or {}
+    return {
+        "clerk_id": data.get("id"),
+        "email": email or "",
+        "first_name": data.get("first_name") or "",
+        "last_name": data.get("last_name") or "",
+        "image_url": data.get("image_url"),
+        "role": public_metadata.get("role", "user"),
+    }
+
+
+def bulk_upsert_clerk_users(records, batch_size=1000):
+    """
+    Insert or update User and ClerkProfile rows for many Clerk users at once.
+    Usernames follow the same ``user_<clerk_id>`` scheme as
+    get_or_create_user_from_clerk, so rows created on first login are updated
+    in place. Returns the number of records written.
+    """
+    records = {r["clerk_id"]: r for r in records if r.get("clerk_id")}
+    if not records:
+        return 0
+
+    users = [
+        User(
+            username=f"user_{clerk_id}",
+            email=r["email"],
+            first_name=r["first_name"],
+            last_name=r["last_name"],
+        )
+        for clerk_id, r in records.items()
+    ]
+    User.objects.bulk_create(
+        users,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["username"],
+        update_fields=["email", "first_name", "last_name"],
+    )
+
+    user_ids = dict(
+        User.objects.filter(username__in=[u.username for u in users])
+        .values_list("username", "id")
+    )
+    profiles = [
+        ClerkProfile(
+            user_id=user_ids[f"user_{clerk_id}"],
+            clerk_id=clerk_id,
+            profile_image=r["image_url"],
+            role=r["role"],
+        )
+        for clerk_id, r in records.items()
+    ]
+    ClerkProfile.objects.bulk_create(
+        profiles,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["clerk_id"],
+        update_fields=["profile_image", "role"],
+    )
+    return len(records)
@@ -0,0 +1,128 @@
+"""
+Clerk webhook inbox.
+
+The HTTP handler only verifies the svix signature and stores the raw event
+(``ingest_event``). ``process_pending_events`` is run by the
+``process_clerk_webhooks`` worker: it takes unprocessed events in
+svix-timestamp order, folds them per Clerk user so only the final state of
+each user is written, and applies the whole batch with bulk upserts.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from api.sqlite import serialized_write
+
+from .models import ClerkProfile, ClerkWebhookEvent
+from .utils import bulk_upsert_clerk_users, clerk_user_record
+
+logger = logging.getLogger(__name__)
+
+USER_UPSERT_EVENTS = ("user.created", "user.updated")
+USER_DELETE_EVENTS = ("user.deleted",)
+
+# Events that keep failing are left in the inbox for inspection/replay
+# instead of blocking the queue forever.
+MAX_ATTEMPTS = 5
+
+
+def ingest_event(svix_id, svix_timestamp, evt):
+    """
+    Store a verified webhook event. Returns False when this svix-id was
+    already received (a Clerk retry or a replay), True otherwise.
+    """
+    if isinstance(svix_timestamp, (str, int)):
+        svix_timestamp = datetime.fromtimestamp(int(svix_timestamp), tz=dt_timezone.utc)
+
+    data = evt.get("data") or {}
+    try:
+        with serialized_write():
+            ClerkWebhookEvent.objects.create(
+                svix_id=svix_id,
+                svix_timestamp=svix_timestamp,
+                event_type=evt.get("type", ""),
+                clerk_id=data.get("id") or "",
+                payload=evt,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def fold_events(events):
+    """
+    Reduce an ordered list of events to one action per Clerk user.
+    Returns ``(upserts, deletes)``: a dict of clerk_id -> user record and a
+    set of clerk_ids to delete.
+    """
+    upserts, deletes = {}, set()
+    for event in events:
+        if not event.clerk_id:
+            continue
+        if event.event_type in USER_UPSERT_EVENTS:
+            upserts[event.clerk_id] = clerk_user_record(event.payload.get("data") or {})
+            deletes.discard(event.clerk_id)
+        elif event.event_type in USER_DELETE_EVENTS:
+            upserts.pop(event.clerk_id, None)
+            deletes.add(event.clerk_id)
+    return upserts, deletes
+
+
+def apply_events(events):
+    """Apply a batch of events in a single transaction."""
+    upserts, deletes = fold_events(events)
+    with transaction.atomic():
+        bulk_upsert_clerk_users(upserts.values())
+        if deletes:
+            ClerkProfile.objects.filter(clerk_id__in=deletes).delete()
+        ClerkWebhookEvent.objects.filter(id__in=[e.id for e in events]).update(
+            processed_at=timezone.now(), last_error=""
+        )
+    return len(upserts), len(deletes)
+
+
+def _record_failure(events, error):
+    for event in events:
+        event.attempts += 1
+        event.last_error = str(error)
+    ClerkWebhookEvent.objects.bulk_update(events, ["attempts", "last_error"])
+
+
+def pending_events():
+    return ClerkWebhookEvent.objects.filter(
+        processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS
+    ).order_by("svix_timestamp", "id")
+
+
+def process_pending_events(batch_size=500):
+    """
+    Apply one batch of pending events. Returns the number of events handled
+    (processed or failed); 0 means the inbox is drained.
+
+    If the batch as a whole fails, each user's events are retried on their
+    own so a single bad event cannot hold back everyone else.
+    """
+    with serialized_write():
+        events = list(pending_events().select_for_update(skip_locked=True)[:batch_size])
+        if not events:
+            return 0
+        try:
+            with transaction.atomic():
+                apply_events(events)
+            return len(events)
+        except Exception:
+            logger.exception("Clerk webhook batch failed, retrying per user")
+
+        by_user = {}
+        for event in events:
+            by_user.setdefault(event.clerk_id, []).append(event)
+        for user_events in by_user.values():
+            try:
+                with transaction.atomic():
+                    apply_events(user_events)
+            except Exception as e:
+                logger.warning("Clerk webhook events failed for %s: %s", user_events[0].clerk_id, e)
+                _record_failure(user_events, e)
+    return len(events)